@@ -0,0 +1,235 @@
+"""性能基准测试
+
+用法:
+    python bench.py hash [--files 400] [--size-kb 512] [--max-workers 8]
+    python bench.py startup [--runs 10]
+    python bench.py repos [--token TOKEN] [--runs 3]
+    python bench.py git [--files 2000] [--size-kb 8] [--changed 20]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from file_index import FileHashIndex, DEFAULT_HASH_WORKERS
+
+
+def bench_hash(args) -> None:
+    """本地文件并行哈希吞吐量：1 到 N 个线程"""
+    work_dir = tempfile.mkdtemp(prefix='bench_hash_')
+    try:
+        items = []
+        block = os.urandom(args.size_kb * 1024)
+        for i in range(args.files):
+            rel_path = f"dir{i % 16}/file{i}.bin"
+            file_path = os.path.join(work_dir, rel_path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'wb') as f:
+                f.write(block)
+            items.append((rel_path, file_path, os.stat(file_path)))
+
+        total_mb = args.files * args.size_kb / 1024
+        print(f"文件数: {args.files}，单个大小: {args.size_kb} KB，总计: {total_mb:.1f} MB")
+
+        workers = 1
+        baseline = None
+        while workers <= args.max_workers:
+            # 每轮使用空索引，保证所有文件都被实际读取和计算
+            hash_index = FileHashIndex(work_dir)
+            hash_index.entries = {}
+            start = time.perf_counter()
+            hash_index.hash_files(items, workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"workers={workers:<3} {elapsed:7.3f}s  {total_mb / elapsed:8.1f} MB/s  加速比 {baseline / elapsed:.2f}x")
+            workers *= 2
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_startup(args) -> None:
+    """命令行模式启动耗时：python cli.py --help，以及导入 cli 时是否加载了 tkinter"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    cli_path = os.path.join(base_dir, 'cli.py')
+
+    probe = ("import sys, time; start = time.perf_counter(); import cli; "
+             "print(time.perf_counter() - start, 'tkinter' in sys.modules, 'github' in sys.modules)")
+    output = subprocess.run([sys.executable, '-c', probe], cwd=base_dir,
+                            capture_output=True, text=True, check=True).stdout.split()
+    print(f"import cli: {float(output[0]) * 1000:.1f} ms  加载 tkinter: {output[1]}  加载 PyGithub: {output[2]}")
+
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, cli_path, '--help'], cwd=base_dir,
+                       stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    print(f"cli.py --help x{args.runs}: 中位数 {statistics.median(timings) * 1000:.1f} ms  "
+          f"最小 {min(timings) * 1000:.1f} ms  最大 {max(timings) * 1000:.1f} ms")
+
+
+def bench_repos(args) -> None:
+    """仓库列表：REST（冷缓存 / 条件请求热缓存）与 GraphQL 的请求数和耗时"""
+    from config import Config
+    from github_manager import GitHubManager
+
+    token = args.token or os.environ.get('GITHUB_TOKEN') or Config().get_token()
+    if not token:
+        print("需要 GitHub Token：使用 --token、GITHUB_TOKEN 环境变量或 config.json 配置")
+        return
+
+    work_dir = tempfile.mkdtemp(prefix='bench_repos_')
+    try:
+        def list_once(backend, http_cache_dir):
+            manager = GitHubManager(token, http_cache_dir=http_cache_dir)
+            responses = []
+            manager.get_http_session().hooks['response'].append(lambda response, *a, **kw: responses.append(1))
+            start = time.perf_counter()
+            if backend == 'graphql':
+                count = len(manager.list_repository_summaries_graphql())
+            else:
+                count = len([manager.summarize_repository(repo) for repo in manager.list_repositories()])
+            return count, len(responses), time.perf_counter() - start
+
+        def run(label, backend, warm):
+            warm_dir = os.path.join(work_dir, f"{backend}-warm")
+            if warm:
+                list_once(backend, warm_dir)  # 预热：缓存所有分页的 ETag
+            results = []
+            for i in range(args.runs):
+                # 冷缓存每轮使用新的缓存目录
+                results.append(list_once(backend, warm_dir if warm else os.path.join(work_dir, f"{backend}-{i}")))
+            count, requests_made, _ = results[-1]
+            elapsed = statistics.median(result[2] for result in results)
+            print(f"{label:<20} 仓库 {count:<5} 请求 {requests_made:<4} 中位数 {elapsed * 1000:8.1f} ms")
+
+        run("REST (冷缓存)", 'rest', warm=False)
+        run("REST (304 热缓存)", 'rest', warm=True)
+        run("GraphQL", 'graphql', warm=False)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_git(args) -> None:
+    """git 浅克隆/浅获取与 tarball 全量下载的传输字节数和耗时
+
+    在临时目录中建立本地裸仓库，通过 file:// 协议访问（走与 HTTP 相同的 pack
+    协议）。tarball 路径用 git archive 生成与 GitHub 相同的归档，再用全量下载的
+    流式解压代码写入暂存目录；两边的耗时都包含服务端打包和本地写盘。
+    """
+    import io
+    import random
+    from git_transport import GitTransport
+    from github_manager import GitHubManager
+
+    git = GitTransport()
+    if not git.available:
+        print("未找到 git 程序")
+        return
+
+    work_dir = tempfile.mkdtemp(prefix='bench_git_')
+    try:
+        source = os.path.join(work_dir, 'source')
+        bare = os.path.join(work_dir, 'bare.git')
+        mirror = os.path.join(work_dir, 'mirror')
+        identity = ['-c', 'user.name=bench', '-c', 'user.email=bench@localhost']
+
+        # 由常见单词组成的文本文件，压缩率与源代码接近
+        rng = random.Random(0)
+        words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 10)))
+                 for _ in range(2000)]
+
+        def write_file(i):
+            file_path = os.path.join(source, f"dir{i % 32}", f"file{i}.txt")
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            lines, size = [], 0
+            while size < args.size_kb * 1024:
+                line = ' '.join(rng.choice(words) for _ in range(12))
+                lines.append(line)
+                size += len(line) + 1
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+
+        os.makedirs(source)
+        git.run(['init', '--quiet', '--initial-branch=main'], cwd=source)
+        for i in range(args.files):
+            write_file(i)
+        git.run(['add', '-A'], cwd=source)
+        git.run(identity + ['commit', '--quiet', '-m', 'initial'], cwd=source)
+        git.run(['clone', '--quiet', '--bare', source, bare])
+        url = 'file://' + os.path.abspath(bare).replace('\\', '/')
+
+        # 只用到解压代码，不访问 GitHub
+        manager = GitHubManager('bench', http_cache_dir=os.path.join(work_dir, 'http_cache'))
+
+        def tarball():
+            start = time.perf_counter()
+            data = subprocess.run([git.git, 'archive', '--format=tar.gz', '--prefix=repo/', 'main'],
+                                  cwd=bare, capture_output=True, check=True).stdout
+            staging = os.path.join(work_dir, 'tarball')
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            manager.extract_tarball_stream(io.BytesIO(data), staging, FileHashIndex(staging), len(data))
+            return len(data), time.perf_counter() - start
+
+        def report(label, size, elapsed):
+            print(f"{label:<24} {size / 1024:10.1f} KB  {elapsed * 1000:8.1f} ms")
+
+        total_mb = args.files * args.size_kb / 1024
+        print(f"文件数: {args.files}，单个大小: {args.size_kb} KB，总计: {total_mb:.1f} MB，"
+              f"更新时修改 {args.changed} 个文件")
+
+        start = time.perf_counter()
+        git.clone(url, mirror, 'main')
+        report("git clone --depth=1", git.objects_size(mirror), time.perf_counter() - start)
+        report("tarball (首次)", *tarball())
+
+        for i in rng.sample(range(args.files), min(args.changed, args.files)):
+            write_file(i)
+        git.run(identity + ['commit', '--quiet', '-a', '-m', 'update'], cwd=source)
+        git.run(['push', '--quiet', bare, 'main'], cwd=source)
+
+        before = git.objects_size(mirror)
+        start = time.perf_counter()
+        git.fetch(mirror, 'main')
+        report("git fetch --depth=1", git.objects_size(mirror) - before, time.perf_counter() - start)
+        report("tarball (更新)", *tarball())
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GitHub 仓库管理工具性能基准测试")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    hash_parser = subparsers.add_parser('hash', help='本地并行哈希吞吐量')
+    hash_parser.add_argument('--files', type=int, default=400)
+    hash_parser.add_argument('--size-kb', type=int, default=512)
+    hash_parser.add_argument('--max-workers', type=int, default=DEFAULT_HASH_WORKERS)
+    hash_parser.set_defaults(func=bench_hash)
+
+    startup_parser = subparsers.add_parser('startup', help='命令行模式启动耗时')
+    startup_parser.add_argument('--runs', type=int, default=10)
+    startup_parser.set_defaults(func=bench_startup)
+
+    repos_parser = subparsers.add_parser('repos', help='仓库列表：REST 与 GraphQL 对比')
+    repos_parser.add_argument('--token', help='GitHub Token（默认读取 GITHUB_TOKEN 或 config.json）')
+    repos_parser.add_argument('--runs', type=int, default=3)
+    repos_parser.set_defaults(func=bench_repos)
+
+    git_parser = subparsers.add_parser('git', help='git 浅克隆/浅获取与 tarball 下载对比')
+    git_parser.add_argument('--files', type=int, default=2000)
+    git_parser.add_argument('--size-kb', type=int, default=8)
+    git_parser.add_argument('--changed', type=int, default=20, help='更新时修改的文件数')
+    git_parser.set_defaults(func=bench_git)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
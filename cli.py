@@ -0,0 +1,361 @@
+"""GitHub 仓库管理工具 - 命令行模式（无需图形界面）
+
+所有进度和结果以 JSON Lines 输出到标准输出，每行一个事件：
+    {"event": "progress", "message": "...", "ts": 1700000000.0}
+    {"event": "progress", "current": 3, "total": 10, "path": "a.txt", "ts": ...}
+    {"event": "result", ...}
+    {"event": "error", "message": "..."}
+其他提示信息输出到标准错误。本模块不导入 tkinter；PyGithub 在执行具体命令时才导入，
+保证 --help 等操作启动迅速。
+
+用法:
+    python cli.py list
+    python cli.py download <repo> [--mode smart|incremental|full|git] [--dest DIR]
+    python cli.py sync <repo> [--direction local_to_remote|remote_to_local|bidirectional]
+                              [--mode smart|force] [--dry-run] [--ignore PATTERN ...]
+    python cli.py upload-dir <repo> <local_dir> [--remote-path PATH]
+    python cli.py execute <repo> [file] [--cmd COMMAND] [--mode smart|incremental|full|git]
+
+Token 依次从 --token、环境变量 GITHUB_TOKEN、config.json 中读取。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from config import Config
+
+
+# 与同步对话框中的默认忽略规则一致
+DEFAULT_IGNORE_PATTERNS = ["*.pyc", "__pycache__/", "*.log", ".DS_Store", ".vscode/", ".idea/",
+                           "node_modules/", "*.tmp", "*.bak"]
+
+# 本工具自己写入仓库目录的文件，同步时始终跳过
+TOOL_FILES = ('.repo_cache.json', '.repo_index.json')
+
+# 事件写入的原始标准输出；执行命令期间 sys.stdout 被重定向到 stderr，
+# 避免库代码中的 print 混入 JSON 流
+_event_stream = sys.stdout
+
+
+def emit(event: str, **fields) -> None:
+    """输出一行 JSON 事件"""
+    fields = {'event': event, **fields, 'ts': round(time.time(), 3)}
+    _event_stream.write(json.dumps(fields, ensure_ascii=False) + '\n')
+    _event_stream.flush()
+
+
+def emit_message(message: str) -> None:
+    """供 GitHubManager 下载方法使用的文本进度回调"""
+    emit('progress', message=message)
+
+
+def emit_file_progress(current: int, total: int, path: str) -> None:
+    """供 commit_batch 使用的逐文件进度回调"""
+    emit('progress', current=current, total=total, path=path)
+
+
+def default_local_path(repo_name: str) -> str:
+    """与图形界面相同的本地仓库目录：./执行代码/<仓库名>"""
+    return os.path.join(os.getcwd(), "执行代码", repo_name)
+
+
+def create_manager(args):
+    """按需导入并创建 GitHubManager"""
+    from github_manager import GitHubManager
+
+    config = Config(args.config)
+    token = args.token or os.environ.get('GITHUB_TOKEN') or config.get_token()
+    if not token:
+        raise Exception("未找到 GitHub Token，请使用 --token、GITHUB_TOKEN 环境变量或 config.json 配置")
+    manager = GitHubManager(token,
+                            hash_workers=config.get_hash_workers(),
+                            download_workers=config.get_download_workers(),
+                            use_graphql=config.get_use_graphql(),
+                            use_git_transport=config.get_use_git_transport())
+    manager.rate_limiter.add_listener(emit_rate_limit_wait)
+    return manager
+
+
+def emit_rate_limit_wait(status) -> None:
+    """限流等待开始时输出一条事件，便于在构建日志中区分卡住和等待额度"""
+    if status['waiting_until']:
+        emit('rate_limit', remaining=status['remaining'], limit=status['limit'],
+             reset_at=status['reset_at'], waiting_until=round(status['waiting_until'], 3))
+
+
+def download_with_mode(manager, repo, local_path: str, mode: str) -> None:
+    """按下载模式下载仓库（smart / incremental / full 与执行代码对话框的三种模式对应）"""
+    if mode == "smart":
+        manager.download_repository(repo, local_path, emit_message)
+    elif mode == "incremental":
+        manager.download_repository_incremental(repo, local_path, emit_message)
+    elif mode == "git":
+        manager.download_repository_git(repo, local_path, emit_message)
+    else:
+        manager.download_repository_full(repo, local_path, emit_message)
+
+
+def cmd_list(args) -> None:
+    """列出仓库"""
+    manager = create_manager(args)
+    repos = manager.list_repository_summaries()
+    for repo in repos:
+        emit('repo', **repo)
+    emit('result', count=len(repos), http_cache=manager.get_http_cache_stats())
+
+
+def cmd_download(args) -> None:
+    """下载仓库到本地"""
+    manager = create_manager(args)
+    repo = manager.get_repository(args.repo)
+    local_path = os.path.abspath(args.dest or default_local_path(repo.name))
+
+    start = time.perf_counter()
+    download_with_mode(manager, repo, local_path, args.mode)
+    emit('result', repo=repo.full_name, path=local_path, mode=args.mode,
+         elapsed=round(time.perf_counter() - start, 3))
+
+
+def scan_sync_plan(manager, repo, local_path: str, patterns, direction: str, mode: str):
+    """对比本地与远程文件，返回 (uploads, downloads, unchanged)
+
+    与同步对话框的规则一致：双向同步时两边都有但内容不同的文件上传本地版本；
+    smart 模式跳过内容相同的文件，force 模式按方向同步所有文件。
+    """
+    from file_index import FileHashIndex
+    from ignore_rules import IgnoreMatcher
+
+    emit_message("🔍 获取远程文件列表...")
+    remote_files = manager.list_remote_tree(repo)
+
+    emit_message(f"🔍 扫描本地文件... (远程 {len(remote_files)} 个)")
+    # 忽略规则（gitignore 语义）加上仓库自己的 .gitignore，被忽略的目录不会进入
+    ignore_matcher = IgnoreMatcher(patterns)
+    local_candidates = []
+    if os.path.exists(local_path):
+        for root, rel_dir, files in ignore_matcher.walk(local_path):
+            for file in files:
+                local_file_path = os.path.join(root, file)
+                relative_path = f"{rel_dir}/{file}" if rel_dir else file
+                if relative_path in TOOL_FILES:
+                    continue
+                try:
+                    local_candidates.append((relative_path, local_file_path, os.stat(local_file_path)))
+                except OSError as e:
+                    print(f"处理本地文件 {relative_path} 时出错: {e}", file=sys.stderr)
+
+    hash_index = FileHashIndex(local_path)
+    local_shas = hash_index.hash_files(local_candidates, workers=manager.hash_workers)
+    hash_index.prune(local_shas)
+    hash_index.save()
+    emit_message(f"🔍 本地文件 {len(local_candidates)} 个 (哈希缓存命中 {hash_index.hits})")
+
+    uploads = []
+    downloads = []
+    unchanged = 0
+    for relative_path, local_file_path, _ in local_candidates:
+        remote_entry = remote_files.get(relative_path)
+        if remote_entry and remote_entry['sha'] == local_shas.get(relative_path) and mode == "smart":
+            unchanged += 1
+        elif direction == "remote_to_local":
+            if remote_entry:
+                downloads.append((relative_path, remote_entry['sha']))
+        else:
+            upload = {'path': relative_path, 'local_path': local_file_path}
+            if remote_entry and remote_entry['mode'] in ('100644', '100755'):
+                upload['mode'] = remote_entry['mode']
+            uploads.append(upload)
+
+    if direction != "local_to_remote":
+        local_paths = set(local_shas)
+        for remote_path, remote_entry in remote_files.items():
+            if remote_path not in local_paths and not ignore_matcher.is_ignored(remote_path):
+                downloads.append((remote_path, remote_entry['sha']))
+
+    return uploads, downloads, unchanged
+
+
+def cmd_sync(args) -> None:
+    """同步本地目录与远程仓库"""
+    manager = create_manager(args)
+    repo = manager.get_repository(args.repo)
+    local_path = os.path.abspath(args.dest or default_local_path(repo.name))
+    patterns = DEFAULT_IGNORE_PATTERNS if args.ignore is None else args.ignore
+
+    uploads, downloads, unchanged = scan_sync_plan(manager, repo, local_path, patterns,
+                                                   args.direction, args.mode)
+
+    if args.dry_run:
+        for upload in uploads:
+            emit('plan', action='upload', path=upload['path'])
+        for path, _ in downloads:
+            emit('plan', action='download', path=path)
+        emit('result', repo=repo.full_name, path=local_path, dry_run=True,
+             uploads=len(uploads), downloads=len(downloads), unchanged=unchanged)
+        return
+
+    failed = []
+    if downloads:
+        emit_message(f"📥 下载 {len(downloads)} 个文件...")
+        failed = manager.download_files_concurrently(repo, downloads, local_path, emit_message)
+
+    commit_sha = None
+    if uploads:
+        emit_message(f"📤 提交 {len(uploads)} 个文件...")
+        commit_sha = manager.commit_batch(repo, uploads,
+                                          args.message or f"Sync {len(uploads)} files from local via CLI",
+                                          progress_callback=emit_file_progress)
+
+    # 无法读取的本地文件未提交，与下载失败的文件一起报告
+    failed_uploads = [upload['path'] for upload in uploads if upload.get('error')]
+    emit('result', repo=repo.full_name, path=local_path, direction=args.direction,
+         uploaded=len(uploads) - len(failed_uploads), downloaded=len(downloads) - len(failed),
+         failed=failed + failed_uploads, unchanged=unchanged, commit=commit_sha)
+    if failed or failed_uploads:
+        sys.exit(1)
+
+
+def cmd_upload_dir(args) -> None:
+    """上传本地文件夹（保持目录结构，合并为一次提交，跳过与远程相同的文件）"""
+    manager = create_manager(args)
+    repo = manager.get_repository(args.repo)
+    base_path = os.path.abspath(args.local_dir)
+    if not os.path.isdir(base_path):
+        raise Exception(f"本地目录不存在: {base_path}")
+
+    remote_dir = os.path.basename(base_path) if args.remote_path is None else args.remote_path.strip('/')
+    changes = []
+    for root, dirs, files in os.walk(base_path):
+        for file in files:
+            file_path = os.path.join(root, file)
+            rel_path = os.path.relpath(file_path, base_path).replace('\\', '/')
+            target_path = f"{remote_dir}/{rel_path}" if remote_dir else rel_path
+            changes.append({'path': target_path, 'local_path': file_path})
+
+    emit_message(f"🔍 预检 {len(changes)} 个文件...")
+    manager.preflight_uploads(repo, changes, remote_dir)
+    skipped = sum(1 for change in changes if change['status'] == 'identical')
+    changes = [change for change in changes if change['status'] != 'identical']
+
+    commit_sha = None
+    if changes:
+        commit_sha = manager.commit_batch(repo, changes,
+                                          args.message or f"Upload folder {os.path.basename(base_path)} ({len(changes)} files) via CLI",
+                                          progress_callback=emit_file_progress)
+    failed = [change['path'] for change in changes if change.get('error')]
+    emit('result', repo=repo.full_name, uploaded=len(changes) - len(failed), skipped=skipped,
+         failed=failed, commit=commit_sha)
+    if failed:
+        sys.exit(1)
+
+
+def default_execute_command(file_path: str) -> str:
+    """按扩展名生成默认执行命令（与执行代码对话框一致）"""
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext == '.py':
+        return f'"{sys.executable}" "{file_path}"'
+    if file_ext == '.js':
+        return f'node "{file_path}"'
+    if file_ext == '.sh':
+        return f'bash "{file_path}"'
+    if file_ext in ['.bat', '.cmd']:
+        return f'"{file_path}"'
+    raise Exception(f"不支持的文件类型 {file_ext}，请使用 --cmd 指定命令")
+
+
+def cmd_execute(args) -> None:
+    """下载仓库并执行其中的文件；未指定文件时列出可执行文件"""
+    manager = create_manager(args)
+    repo = manager.get_repository(args.repo)
+    local_path = os.path.abspath(args.dest or default_local_path(repo.name))
+    download_with_mode(manager, repo, local_path, args.mode)
+
+    if not args.file:
+        executable_files = manager.get_executable_files(local_path)
+        for file_path in executable_files:
+            emit('file', path=file_path.replace('\\', '/'))
+        emit('result', repo=repo.full_name, path=local_path, count=len(executable_files))
+        return
+
+    file_path = os.path.join(local_path, args.file)
+    if not os.path.exists(file_path):
+        raise Exception(f"文件不存在: {file_path}")
+
+    if args.cmd:
+        command = args.cmd.replace("{file}", f'"{file_path}"')
+    else:
+        command = default_execute_command(file_path)
+
+    emit_message(f"🚀 开始执行命令: {command}")
+    # 子进程的输出写到标准错误，标准输出只保留 JSON 事件
+    process = subprocess.run(command, shell=True, cwd=local_path, stdout=sys.stderr)
+    emit('result', repo=repo.full_name, path=local_path, command=command, returncode=process.returncode)
+    if process.returncode:
+        sys.exit(process.returncode)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="GitHub 仓库管理工具（命令行模式，输出 JSON Lines）")
+    parser.add_argument('--token', help='GitHub Token（默认读取 GITHUB_TOKEN 或 config.json）')
+    parser.add_argument('--config', default='config.json', help='配置文件路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help='列出仓库')
+    list_parser.set_defaults(func=cmd_list)
+
+    download_parser = subparsers.add_parser('download', help='下载仓库')
+    download_parser.add_argument('repo')
+    download_parser.add_argument('--mode', choices=['smart', 'incremental', 'full', 'git'], default='smart')
+    download_parser.add_argument('--dest', help='本地目录（默认 ./执行代码/<仓库名>）')
+    download_parser.set_defaults(func=cmd_download)
+
+    sync_parser = subparsers.add_parser('sync', help='同步本地目录与远程仓库')
+    sync_parser.add_argument('repo')
+    sync_parser.add_argument('--direction', choices=['local_to_remote', 'remote_to_local', 'bidirectional'],
+                             default='local_to_remote')
+    sync_parser.add_argument('--mode', choices=['smart', 'force'], default='smart',
+                             help='smart: 只同步有差异的文件；force: 同步所有文件')
+    sync_parser.add_argument('--dry-run', action='store_true', help='只输出同步计划，不修改任何文件')
+    sync_parser.add_argument('--ignore', action='append', metavar='PATTERN',
+                             help='忽略规则（.gitignore 语法），可重复指定（默认使用同步对话框的默认规则）；仓库中的 .gitignore 总是生效')
+    sync_parser.add_argument('--dest', help='本地目录（默认 ./执行代码/<仓库名>）')
+    sync_parser.add_argument('--message', help='提交信息')
+    sync_parser.set_defaults(func=cmd_sync)
+
+    upload_parser = subparsers.add_parser('upload-dir', help='上传本地文件夹')
+    upload_parser.add_argument('repo')
+    upload_parser.add_argument('local_dir')
+    upload_parser.add_argument('--remote-path', help='远程目标目录（默认使用文件夹名，"" 表示仓库根目录）')
+    upload_parser.add_argument('--message', help='提交信息')
+    upload_parser.set_defaults(func=cmd_upload_dir)
+
+    execute_parser = subparsers.add_parser('execute', help='下载仓库并执行文件')
+    execute_parser.add_argument('repo')
+    execute_parser.add_argument('file', nargs='?', help='相对仓库根目录的文件路径；省略时列出可执行文件')
+    execute_parser.add_argument('--cmd', help='自定义命令，{file} 会被替换为文件路径')
+    execute_parser.add_argument('--mode', choices=['smart', 'incremental', 'full', 'git'], default='smart')
+    execute_parser.add_argument('--dest', help='本地目录（默认 ./执行代码/<仓库名>）')
+    execute_parser.set_defaults(func=cmd_execute)
+
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+
+    # 库代码中的 print 输出转到标准错误
+    sys.stdout = sys.stderr
+    try:
+        args.func(args)
+    except Exception as e:
+        emit('error', message=str(e))
+        sys.exit(1)
+    finally:
+        sys.stdout = _event_stream
+
+
+if __name__ == '__main__':
+    main()
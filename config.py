@@ -35,6 +35,22 @@ class Config:
         self.config['github_token'] = token
         self.save_config()
     
+    def get_hash_workers(self) -> Optional[int]:
+        """获取本地文件并行哈希线程数（未配置时返回 None，表示自动）"""
+        return self.config.get('hash_workers')
+    
+    def get_download_workers(self) -> Optional[int]:
+        """获取并发下载线程数（未配置时返回 None，使用默认值）"""
+        return self.config.get('download_workers')
+    
+    def get_use_graphql(self) -> bool:
+        """仓库列表是否使用 GraphQL 批量获取（默认使用 REST）"""
+        return bool(self.config.get('use_graphql', False))
+    
+    def get_use_git_transport(self) -> bool:
+        """本地有 git 程序时，智能下载是否使用 git 协议维护浅克隆镜像（默认使用）"""
+        return bool(self.config.get('use_git_transport', True))
+    
     def get_recent_repos(self) -> list:
         """获取最近访问的仓库列表"""
         return self.config.get('recent_repos', [])
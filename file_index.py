@@ -0,0 +1,182 @@
+import os
+import json
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Optional, Tuple
+
+
+INDEX_FILENAME = '.repo_index.json'
+
+# 分块读取大小，避免把大文件整个读入内存
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 修改时间距哈希时刻太近的文件不写入索引：同一时间粒度内的再次修改
+# 不会改变 mtime，缓存它的 SHA 可能漏掉变更（即 git 的 "racy clean" 问题）
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+# 默认并行哈希线程数；hashlib 处理大块数据时会释放 GIL，线程即可利用多核
+DEFAULT_HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def calculate_blob_sha_of_file(file_path: str) -> str:
+    """分块计算文件的 git blob SHA（sha1("blob <len>\\0" + content)）"""
+    while True:
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            sha = hashlib.sha1(f"blob {size}\0".encode())
+            read = 0
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                read += len(chunk)
+        # 读取过程中文件被改写，长度与头部不一致时重新计算
+        if read == size:
+            return sha.hexdigest()
+
+
+class FileHashIndex:
+    """本地文件哈希索引（类似 git index）
+
+    按相对路径记录 (size, mtime_ns, inode) 及对应的 blob SHA，保存在仓库目录下的
+    .repo_index.json 中。stat 信息未变化的文件直接返回缓存的 SHA，不再读取内容。
+    """
+
+    def __init__(self, root_path: str):
+        self.root_path = root_path
+        self.index_file = os.path.join(root_path, INDEX_FILENAME)
+        self.entries: Dict[str, list] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """加载索引文件"""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('entries', {})
+            except (json.JSONDecodeError, IOError, AttributeError):
+                self.entries = {}
+
+    def save(self) -> None:
+        """保存索引文件（先写临时文件再替换，避免中途退出损坏索引）"""
+        with self._lock:
+            if not self._dirty or not os.path.isdir(self.root_path):
+                return
+            data = {'version': 1, 'entries': self.entries}
+            self._dirty = False
+        temp_file = self.index_file + '.tmp'
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_file, self.index_file)
+        except IOError as e:
+            print(f"保存哈希索引失败: {e}")
+
+    def lookup(self, rel_path: str, stat_result: os.stat_result) -> Optional[str]:
+        """stat 信息与索引一致时返回缓存的 SHA，否则返回 None"""
+        entry = self.entries.get(rel_path)
+        if entry and entry[:3] == [stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino]:
+            return entry[3]
+        return None
+
+    def update(self, rel_path: str, stat_result: os.stat_result, sha: str) -> None:
+        """记录文件的 SHA；刚被修改过的文件不缓存"""
+        with self._lock:
+            if time.time_ns() - stat_result.st_mtime_ns < RACY_WINDOW_NS:
+                if self.entries.pop(rel_path, None) is not None:
+                    self._dirty = True
+                return
+            self.entries[rel_path] = [stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino, sha]
+            self._dirty = True
+
+    def get_sha(self, rel_path: str, file_path: Optional[str] = None,
+                stat_result: Optional[os.stat_result] = None) -> str:
+        """获取文件的 blob SHA，仅在 stat 信息变化时重新计算"""
+        file_path = file_path or os.path.join(self.root_path, rel_path)
+        stat_result = stat_result or os.stat(file_path)
+
+        sha = self.lookup(rel_path, stat_result)
+        if sha:
+            self.hits += 1
+            return sha
+
+        self.misses += 1
+        sha = calculate_blob_sha_of_file(file_path)
+        self.update(rel_path, stat_result, sha)
+        return sha
+
+    def prune(self, existing_paths) -> None:
+        """移除已不存在的文件记录"""
+        existing_paths = set(existing_paths)
+        with self._lock:
+            for rel_path in list(self.entries):
+                if rel_path not in existing_paths:
+                    del self.entries[rel_path]
+                    self._dirty = True
+
+    def hash_files(self, items: Iterable[Tuple[str, str, os.stat_result]], workers: Optional[int] = None,
+                   cancel_event=None, progress_callback=None) -> Dict[str, Optional[str]]:
+        """并行计算一批文件的 blob SHA，返回 {rel_path: sha}
+
+        items 为 (rel_path, file_path, stat_result)。索引命中的文件直接返回，其余
+        交给线程池计算；读取失败的文件 SHA 为 None。workers 为 None 或 0 时使用
+        DEFAULT_HASH_WORKERS。progress_callback(done, total) 在每个文件完成后调用。
+        cancel_event 被设置后不再提交新任务，已返回的结果只包含完成的部分。
+        """
+        results: Dict[str, Optional[str]] = {}
+        pending = []
+        for rel_path, file_path, stat_result in items:
+            sha = self.lookup(rel_path, stat_result)
+            if sha:
+                self.hits += 1
+                results[rel_path] = sha
+            else:
+                pending.append((rel_path, file_path, stat_result))
+
+        total = len(results) + len(pending)
+        done = len(results)
+        if progress_callback and done:
+            progress_callback(done, total)
+        if not pending:
+            return results
+
+        self.misses += len(pending)
+        workers = workers or DEFAULT_HASH_WORKERS
+
+        def hash_one(rel_path, file_path, stat_result):
+            if cancel_event is not None and cancel_event.is_set():
+                return rel_path, None, False
+            try:
+                sha = calculate_blob_sha_of_file(file_path)
+            except OSError:
+                return rel_path, None, True
+            self.update(rel_path, stat_result, sha)
+            return rel_path, sha, True
+
+        if workers <= 1:
+            outcomes = (hash_one(*item) for item in pending)
+            for rel_path, sha, finished in outcomes:
+                if finished:
+                    results[rel_path] = sha
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total)
+            return results
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(hash_one, *item) for item in pending]
+            for future in as_completed(futures):
+                rel_path, sha, finished = future.result()
+                if finished:
+                    results[rel_path] = sha
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total)
+        return results
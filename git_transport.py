@@ -0,0 +1,160 @@
+import base64
+import os
+import shutil
+import subprocess
+import time
+from typing import Callable, Dict, List, Optional
+
+
+# git 进度行（以 \r 刷新）最多每隔该时间（秒）转发一次
+PROGRESS_INTERVAL = 1.0
+
+# 镜像工作区中不属于仓库、不应出现在 git status 中的文件
+MIRROR_EXCLUDES = ('.repo_cache.json', '.repo_index.json')
+
+
+class GitTransportError(Exception):
+    """git 命令执行失败"""
+
+
+class GitTransport:
+    """用本地 git 程序维护仓库的浅克隆镜像
+
+    首次下载执行 clone --depth=1，之后每次只 fetch --depth=1 默认分支并强制
+    检出，传输的是 packfile 增量而不是整个归档。Token 通过环境变量中的 git
+    配置以 HTTP 头的形式传递，不会写入远程地址或镜像的配置文件。
+    找不到 git 程序时 available 为 False，调用方应改用 REST 下载。
+    """
+
+    def __init__(self, git_executable: Optional[str] = None, token: Optional[str] = None):
+        self.git = git_executable or shutil.which('git')
+        self.token = token
+
+    @property
+    def available(self) -> bool:
+        return bool(self.git)
+
+    @staticmethod
+    def is_mirror(local_path: str) -> bool:
+        """local_path 是否为本工具维护的 git 镜像"""
+        return os.path.isdir(os.path.join(local_path, '.git'))
+
+    def _env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env['GIT_TERMINAL_PROMPT'] = '0'  # 认证失败时直接报错，不等待输入
+        env['LC_ALL'] = 'C'
+        if self.token:
+            credentials = base64.b64encode(f"x-access-token:{self.token}".encode()).decode()
+            env['GIT_CONFIG_COUNT'] = '1'
+            env['GIT_CONFIG_KEY_0'] = 'http.extraHeader'
+            env['GIT_CONFIG_VALUE_0'] = f"Authorization: Basic {credentials}"
+        return env
+
+    def run(self, args: List[str], cwd: Optional[str] = None) -> str:
+        """执行 git 命令并返回标准输出"""
+        if not self.available:
+            raise GitTransportError("未找到 git 程序")
+        result = subprocess.run([self.git] + args, cwd=cwd, env=self._env(), capture_output=True)
+        if result.returncode != 0:
+            message = result.stderr.decode('utf-8', errors='replace').strip().splitlines()
+            raise GitTransportError(f"git {args[0]} 失败: {message[-1] if message else result.returncode}")
+        return result.stdout.decode('utf-8', errors='replace')
+
+    def run_with_progress(self, args: List[str], cwd: Optional[str] = None,
+                          progress_callback: Optional[Callable[[str], None]] = None) -> None:
+        """执行传输数据的 git 命令（clone / fetch），把节流后的进度行交给 progress_callback"""
+        if not self.available:
+            raise GitTransportError("未找到 git 程序")
+
+        process = subprocess.Popen([self.git] + args, cwd=cwd, env=self._env(),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        last_line = ''
+        buffer = b''
+        last_report = 0.0
+        while True:
+            chunk = process.stderr.read1(4096)
+            if not chunk:
+                break
+            buffer += chunk
+            # 进度行以 \r 刷新，阶段结束时以 \n 结束
+            while True:
+                positions = [p for p in (buffer.find(b'\r'), buffer.find(b'\n')) if p != -1]
+                if not positions:
+                    break
+                end = min(positions)
+                line = buffer[:end].decode('utf-8', errors='replace').strip()
+                final = buffer[end:end + 1] == b'\n'
+                buffer = buffer[end + 1:]
+                if not line:
+                    continue
+                last_line = line
+                now = time.monotonic()
+                if progress_callback and (final or now - last_report >= PROGRESS_INTERVAL):
+                    last_report = now
+                    progress_callback(line)
+        last_line = buffer.decode('utf-8', errors='replace').strip() or last_line
+
+        if process.wait() != 0:
+            raise GitTransportError(f"git {args[0]} 失败: {last_line or process.returncode}")
+
+    def clone(self, url: str, local_path: str, branch: str,
+              progress_callback: Optional[Callable[[str], None]] = None) -> str:
+        """浅克隆 branch 到 local_path（目录不能已存在），返回检出的提交 SHA"""
+        self.run_with_progress(['clone', '--depth=1', '--single-branch', '--no-tags', '--progress',
+                                '--branch', branch, '-c', 'core.logAllRefUpdates=false', url, local_path],
+                               progress_callback=progress_callback)
+        self._write_excludes(local_path)
+        return self.head(local_path)
+
+    def fetch(self, local_path: str, branch: str,
+              progress_callback: Optional[Callable[[str], None]] = None) -> str:
+        """获取 branch 的最新提交（深度 1）并强制检出，返回检出的提交 SHA
+
+        工作区中被跟踪文件的修改会被丢弃，未跟踪的文件（例如执行产生的输出）保留。
+        """
+        self.run_with_progress(['fetch', '--depth=1', '--no-tags', '--progress', 'origin', branch],
+                               cwd=local_path, progress_callback=progress_callback)
+        self.run(['reset', '--hard', '--quiet', 'FETCH_HEAD'], cwd=local_path)
+        # 浅获取后旧提交不再被引用，由 gc 按需清理
+        self.run(['gc', '--auto', '--quiet'], cwd=local_path)
+        return self.head(local_path)
+
+    def head(self, local_path: str) -> str:
+        """镜像当前检出的提交 SHA"""
+        return self.run(['rev-parse', 'HEAD'], cwd=local_path).strip()
+
+    def list_blobs(self, local_path: str) -> Dict[str, str]:
+        """当前提交中的所有文件：{相对路径: blob SHA}，与 REST 下载的清单格式相同"""
+        output = self.run(['ls-tree', '-r', '-z', '--full-tree', 'HEAD'], cwd=local_path)
+        files_sha = {}
+        for entry in output.split('\0'):
+            if not entry:
+                continue
+            meta, path = entry.split('\t', 1)
+            _, object_type, sha = meta.split()
+            if object_type == 'blob':
+                files_sha[path] = sha
+        return files_sha
+
+    def _write_excludes(self, local_path: str) -> None:
+        exclude_path = os.path.join(local_path, '.git', 'info', 'exclude')
+        os.makedirs(os.path.dirname(exclude_path), exist_ok=True)
+        with open(exclude_path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(MIRROR_EXCLUDES) + '\n')
+
+    @staticmethod
+    def objects_size(local_path: str) -> int:
+        """镜像对象库中 pack 和松散对象的字节数（近似为通过 git 协议传输的数据量）
+
+        本地生成的索引文件（.idx 等）不计入。
+        """
+        total = 0
+        for dirpath, _, files in os.walk(os.path.join(local_path, '.git', 'objects')):
+            for name in files:
+                if name.endswith(('.idx', '.rev', '.bitmap', '.keep')) or dirpath.endswith('info'):
+                    continue
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
@@ -1,18 +1,175 @@
-from github import Github
+from github import Github, GithubException, UnknownObjectException
 from github.Repository import Repository
 from github.ContentFile import ContentFile
+from github.InputGitTreeElement import InputGitTreeElement
 from typing import List, Optional, Tuple, Dict, Any
 import base64
 from datetime import datetime
 import json
 import hashlib
+import os
+import urllib.parse
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from file_index import FileHashIndex, calculate_blob_sha_of_file
+from git_transport import GitTransport
+from http_cache import HttpCache, DEFAULT_CACHE_DIR
+from rate_limiter import RateLimitScheduler, ScheduledSession, RateLimitRetry
 
 
 class GitHubManager:
-    def __init__(self, token: str):
-        self.github = Github(token)
+    # 本地缓存清单 (.repo_cache.json) 的格式版本
+    # 1: files_sha 为文件内容的普通 SHA-1（旧格式）
+    # 2: files_sha 为 git blob SHA，可直接与 get_git_tree 返回的 sha 比较
+    MANIFEST_VERSION = 2
+    
+    # 并发下载的默认线程数和单个文件的最大尝试次数
+    DEFAULT_DOWNLOAD_WORKERS = 8
+    DOWNLOAD_MAX_ATTEMPTS = 3
+    
+    # 流式写盘时每次读取的字节数
+    BLOB_CHUNK_SIZE = 1024 * 1024
+    # 不超过该大小的 UTF-8 文本文件直接内联到 tree 中，省去创建 blob 的请求
+    INLINE_TEXT_MAX_SIZE = 64 * 1024
+    # compare 接口最多返回 300 个变更文件，达到该数量时结果可能不完整
+    COMPARE_MAX_FILES = 300
+    # 写文件遇到 SHA 冲突（409/422）时重新获取 SHA 并重试的次数
+    WRITE_CONFLICT_RETRIES = 2
+    # 新鲜度检查得到的分支头在该时间（秒）内供随后的下载直接使用，不再重复请求
+    MIRROR_HEAD_MAX_AGE = 60
+    
+    # 上次获取的仓库列表（按 Token 区分），启动时先显示它再后台刷新
+    REPO_LIST_CACHE_FILE = '.repo_list_cache.json'
+    
+    API_BASE_URL = "https://api.github.com"
+    API_ACCEPT = "application/vnd.github+json"
+    GRAPHQL_URL = "https://api.github.com/graphql"
+    
+    # 仓库列表只取界面需要的字段，每次 100 个（GraphQL 单页上限）
+    REPO_LIST_QUERY = """
+    query($cursor: String) {
+      viewer {
+        repositories(first: 100, after: $cursor,
+                     ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER],
+                     orderBy: {field: UPDATED_AT, direction: DESC}) {
+          nodes {
+            name
+            nameWithOwner
+            description
+            isPrivate
+            updatedAt
+            diskUsage
+            primaryLanguage { name }
+            defaultBranchRef { name target { oid } }
+          }
+          pageInfo { hasNextPage endCursor }
+        }
+      }
+    }
+    """
+    
+    def __init__(self, token: str, hash_workers: Optional[int] = None,
+                 download_workers: Optional[int] = None, http_cache_dir: str = DEFAULT_CACHE_DIR,
+                 use_graphql: bool = False, use_git_transport: bool = True):
+        self.token = token
+        # 本工具自己的请求和 PyGithub 的请求共用一个限流调度器
+        self.rate_limiter = RateLimitScheduler()
+        self.github = Github(token, retry=RateLimitRetry(scheduler=self.rate_limiter))
         self.user = self.github.get_user()
+        self.hash_workers = hash_workers  # 本地并行哈希线程数，None 为自动
+        self.download_workers = download_workers or self.DEFAULT_DOWNLOAD_WORKERS
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        self.http_cache = HttpCache(http_cache_dir)
+        self.use_graphql = use_graphql  # 仓库列表是否使用 GraphQL 一次取 100 个
+        # 本地有 git 程序时，智能下载用 git 协议维护浅克隆镜像
+        self.git_transport = GitTransport(token=token) if use_git_transport else None
+        # 每个仓库的目录列表：{full_name: {'head': 提交 SHA, 'dirs': {目录路径: [ContentFile]} 或 None}}
+        self._listing_cache: Dict[str, Dict[str, Any]] = {}
+        self._listing_lock = threading.Lock()
+        # 本工具写入/删除文件后得到的 SHA：{(full_name, path): SHA，None 表示已删除}
+        self._written_shas: Dict[Tuple[str, str], Optional[str]] = {}
+        # 每个本地镜像最近一次新鲜度检查得到的分支头：{本地路径: (提交 SHA, 检查时间)}
+        self._mirror_heads: Dict[str, Tuple[str, float]] = {}
+    
+    def get_http_session(self) -> requests.Session:
+        """获取共享的 HTTP 会话（keep-alive 连接池，大小与并发下载数一致）"""
+        with self._session_lock:
+            if self._session is None:
+                session = ScheduledSession(self.rate_limiter)
+                session.headers.update({
+                    'Authorization': f'token {self.token}',
+                    'User-Agent': 'github-repo-manager'
+                })
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4,
+                                                        pool_maxsize=max(self.download_workers, 10))
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+    
+    def _cached_get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                    immutable: bool = False) -> Tuple[Any, Optional[str]]:
+        """带 ETag / Last-Modified 条件请求的 GET，返回 (JSON 数据, 下一页 URL)
+
+        缓存的内容未变化时服务器返回 304，直接使用磁盘缓存且不消耗速率限制。
+        immutable 表示 URL 的内容永远不变（如按提交 SHA 获取的 tree），有缓存时
+        不发请求。404 抛出 UnknownObjectException，其他错误抛出 GithubException。
+        """
+        if params:
+            url = f"{url}?{urllib.parse.urlencode(params)}"
+        key = HttpCache.make_key(self.token, url, self.API_ACCEPT)
+        entry = self.http_cache.get(key)
+        if immutable and entry:
+            self.http_cache.record(hit=True)
+            return entry['body']['data'], entry['body']['next']
+        headers = {'Accept': self.API_ACCEPT}
+        headers.update(self.http_cache.conditional_headers(entry))
+        
+        response = self.get_http_session().get(url, headers=headers, timeout=30)
+        if response.status_code == 304 and entry:
+            self.http_cache.record(hit=True)
+            return entry['body']['data'], entry['body']['next']
+        
+        if response.status_code >= 400:
+            try:
+                data = response.json()
+            except ValueError:
+                data = {'message': response.text}
+            if response.status_code == 404:
+                raise UnknownObjectException(404, data, dict(response.headers))
+            raise GithubException(response.status_code, data, dict(response.headers))
+        
+        self.http_cache.record(hit=False)
+        data = response.json()
+        next_url = response.links.get('next', {}).get('url')
+        self.http_cache.put(key, url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                            {'data': data, 'next': next_url})
+        return data, next_url
+    
+    def _cached_get_all(self, url: str, params: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """按 Link 头逐页获取列表接口的全部结果，每一页单独缓存"""
+        items, next_url = self._cached_get(url, params)
+        while next_url:
+            page, next_url = self._cached_get(next_url)
+            items.extend(page)
+        return items
+    
+    def get_rate_limit_status(self) -> Dict[str, Any]:
+        """最近一次响应报告的 API 剩余额度及限流等待状态"""
+        return self.rate_limiter.get_status()
+    
+    def _before_write(self) -> None:
+        """PyGithub 发出写请求前排队，避免触发次级限流"""
+        self.rate_limiter.before_request('POST')
+    
+    def get_http_cache_stats(self) -> Dict[str, int]:
+        """HTTP 缓存命中/未命中统计"""
+        return self.http_cache.get_stats()
     
     def get_user_info(self) -> Dict[str, Any]:
         """获取用户信息"""
@@ -69,18 +226,122 @@ class GitHubManager:
     def list_repositories(self) -> List[Repository]:
         """获取用户所有仓库"""
         try:
-            repos = []
-            # 获取用户自己的仓库
-            for repo in self.user.get_repos():
-                repos.append(repo)
+            # 获取用户自己的仓库（每页 100 个，未变化的页面返回 304）
+            repos = [self.github.create_from_raw_data(Repository, data)
+                     for data in self._cached_get_all(f"{self.API_BASE_URL}/user/repos", {'per_page': 100})]
             return sorted(repos, key=lambda x: x.updated_at, reverse=True)
         except Exception as e:
             raise Exception(f"获取仓库列表失败: {e}")
     
+    @staticmethod
+    def summarize_repository(repo: Repository) -> Dict[str, Any]:
+        """仓库列表需要显示的字段（REST 列表不含默认分支的提交 SHA）"""
+        return {
+            'name': repo.name,
+            'full_name': repo.full_name,
+            'description': repo.description or "",
+            'private': repo.private,
+            'updated_at': repo.updated_at.isoformat() if repo.updated_at else "",
+            'size': repo.size,
+            'language': repo.language,
+            'default_branch': repo.default_branch,
+            'head_sha': None
+        }
+    
+    @staticmethod
+    def summarize_graphql_repository(node: Dict[str, Any]) -> Dict[str, Any]:
+        """把 GraphQL 仓库节点转换为与 summarize_repository 相同的格式"""
+        branch = node.get('defaultBranchRef') or {}
+        return {
+            'name': node['name'],
+            'full_name': node['nameWithOwner'],
+            'description': node.get('description') or "",
+            'private': node['isPrivate'],
+            # 与 PyGithub 的 datetime.isoformat() 保持一致（不带 Z）
+            'updated_at': (node.get('updatedAt') or "").rstrip('Z'),
+            'size': node.get('diskUsage') or 0,
+            'language': (node.get('primaryLanguage') or {}).get('name'),
+            'default_branch': branch.get('name'),
+            'head_sha': (branch.get('target') or {}).get('oid')
+        }
+    
+    def graphql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """执行 GraphQL 查询，返回 data 部分"""
+        response = self.get_http_session().post(self.GRAPHQL_URL,
+                                                json={'query': query, 'variables': variables or {}},
+                                                timeout=30)
+        response.raise_for_status()
+        result = response.json()
+        if result.get('errors'):
+            raise Exception(result['errors'][0].get('message', result['errors']))
+        return result['data']
+    
+    def list_repository_summaries_graphql(self) -> List[Dict[str, Any]]:
+        """用 GraphQL 获取仓库列表摘要，每个请求 100 个仓库，只取显示需要的字段"""
+        try:
+            summaries = []
+            cursor = None
+            while True:
+                page = self.graphql(self.REPO_LIST_QUERY, {'cursor': cursor})['viewer']['repositories']
+                summaries.extend(self.summarize_graphql_repository(node) for node in page['nodes'] if node)
+                if not page['pageInfo']['hasNextPage']:
+                    break
+                cursor = page['pageInfo']['endCursor']
+            return sorted(summaries, key=lambda x: x['updated_at'], reverse=True)
+        except Exception as e:
+            raise Exception(f"GraphQL 获取仓库列表失败: {e}")
+    
+    def list_repository_summaries(self) -> List[Dict[str, Any]]:
+        """获取仓库列表摘要（按更新时间倒序），并保存到本地供下次启动立即显示
+
+        启用 use_graphql 时优先使用 GraphQL，失败（例如 Token 无 GraphQL 权限）时回退到 REST。
+        """
+        summaries = None
+        if self.use_graphql:
+            try:
+                summaries = self.list_repository_summaries_graphql()
+            except Exception as e:
+                print(f"{e}，改用 REST 接口")
+        if summaries is None:
+            summaries = [self.summarize_repository(repo) for repo in self.list_repositories()]
+        self.save_repository_summaries(summaries)
+        return summaries
+    
+    def _repo_list_cache_key(self) -> str:
+        return hashlib.sha256(self.token.encode()).hexdigest()
+    
+    def get_cached_repository_summaries(self) -> Optional[List[Dict[str, Any]]]:
+        """读取上次保存的仓库列表，没有缓存时返回 None"""
+        try:
+            with open(self.REPO_LIST_CACHE_FILE, 'r', encoding='utf-8') as f:
+                account = json.load(f).get('accounts', {}).get(self._repo_list_cache_key())
+            return account['repos'] if account else None
+        except (json.JSONDecodeError, IOError, AttributeError, KeyError, TypeError):
+            return None
+    
+    def save_repository_summaries(self, summaries: List[Dict[str, Any]]) -> None:
+        """保存仓库列表（先写临时文件再替换）"""
+        data = {'version': 1, 'accounts': {}}
+        try:
+            with open(self.REPO_LIST_CACHE_FILE, 'r', encoding='utf-8') as f:
+                data['accounts'] = json.load(f).get('accounts', {})
+        except (json.JSONDecodeError, IOError, AttributeError):
+            pass
+        data['accounts'][self._repo_list_cache_key()] = {'saved_at': time.time(), 'repos': summaries}
+        temp_file = self.REPO_LIST_CACHE_FILE + '.tmp'
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_file, self.REPO_LIST_CACHE_FILE)
+        except IOError as e:
+            print(f"保存仓库列表缓存失败: {e}")
+    
     def get_repository(self, repo_name: str) -> Repository:
         """获取指定仓库"""
         try:
-            return self.user.get_repo(repo_name)
+            full_name = repo_name if '/' in repo_name else f"{self.user.login}/{repo_name}"
+            data, _ = self._cached_get(f"{self.API_BASE_URL}/repos/{full_name}")
+            return self.github.create_from_raw_data(Repository, data)
         except Exception as e:
             raise Exception(f"获取仓库失败: {e}")
     
@@ -88,6 +349,7 @@ class GitHubManager:
                          auto_init: bool = True) -> Repository:
         """创建新仓库"""
         try:
+            self._before_write()
             return self.user.create_repo(
                 name=name,
                 description=description,
@@ -101,6 +363,7 @@ class GitHubManager:
         """删除仓库"""
         try:
             repo = self.get_repository(repo_name)
+            self._before_write()
             repo.delete()
             return True
         except Exception as e:
@@ -110,67 +373,489 @@ class GitHubManager:
         """更新仓库信息"""
         try:
             repo = self.get_repository(repo_name)
+            self._before_write()
             repo.edit(**kwargs)
             return repo
         except Exception as e:
             raise Exception(f"更新仓库失败: {e}")
     
-    def list_files(self, repo: Repository, path: str = "") -> List[ContentFile]:
-        """列出仓库文件"""
+    def list_files(self, repo: Repository, path: str = "", revalidate: bool = False) -> List[ContentFile]:
+        """列出仓库文件
+
+        目录列表优先取自按提交缓存的整个仓库树（见 get_directory_listings）：
+        同一提交下浏览任意目录都不发请求。revalidate 为 True 时先检查分支头是否
+        移动（一次条件请求），移动了才重新获取树。树被截断或 path 不是目录时
+        回退到 contents 接口。
+        """
         try:
-            contents = repo.get_contents(path)
+            try:
+                listings = self.get_directory_listings(repo, revalidate=revalidate)
+            except UnknownObjectException:
+                listings = None  # 空仓库没有分支
+            path = path.strip('/')
+            if listings is not None and path in listings:
+                return list(listings[path])
+            
+            contents = self._get_contents_data(repo, path)
             if isinstance(contents, list):
-                return contents
+                return [self.github.create_from_raw_data(ContentFile, item) for item in contents]
             else:
-                return [contents]
+                return [self.github.create_from_raw_data(ContentFile, contents)]
         except Exception as e:
             raise Exception(f"获取文件列表失败: {e}")
     
+    def _get_contents_data(self, repo: Repository, path: str = "") -> Any:
+        """通过条件请求缓存获取 contents 接口的原始数据（目录为列表，文件为字典）"""
+        url = f"{repo.url}/contents/{urllib.parse.quote(path.strip('/'))}"
+        data, _ = self._cached_get(url)
+        return data
+    
+    def get_branch_head(self, repo: Repository, branch: Optional[str] = None) -> str:
+        """分支头的提交 SHA（条件请求，未变化时返回 304，不消耗速率限制）
+
+        网络不可用时使用上次缓存的结果，以便离线浏览。
+        """
+        branch = branch or repo.default_branch
+        url = f"{repo.url}/git/ref/heads/{urllib.parse.quote(branch)}"
+        try:
+            data, _ = self._cached_get(url)
+        except requests.RequestException:
+            entry = self.http_cache.get(HttpCache.make_key(self.token, url, self.API_ACCEPT))
+            if not entry:
+                raise
+            data = entry['body']['data']
+        return data['object']['sha']
+    
+    def get_cached_directory_listings(self, repo: Repository) -> Optional[Dict[str, List[ContentFile]]]:
+        """已缓存的目录列表，不发请求；尚未加载或树被截断时返回 None"""
+        with self._listing_lock:
+            cached = self._listing_cache.get(repo.full_name)
+        return cached['dirs'] if cached else None
+    
+    def get_directory_listings(self, repo: Repository,
+                               revalidate: bool = False) -> Optional[Dict[str, List[ContentFile]]]:
+        """按分支头提交缓存的目录列表 {目录路径: [ContentFile]}，根目录为 ""
+
+        首次调用或 revalidate 时获取分支头；分支头未移动则直接使用缓存。需要
+        重新加载时用一次递归 tree 请求填满所有目录（按提交 SHA 获取的 tree 不会
+        变化，也保存在 HTTP 缓存中，可离线使用）。树被截断时返回 None。
+        """
+        with self._listing_lock:
+            cached = self._listing_cache.get(repo.full_name)
+        if cached and not revalidate:
+            return cached['dirs']
+        
+        head = self.get_branch_head(repo)
+        if cached and cached['head'] == head:
+            return cached['dirs']
+        
+        data, _ = self._cached_get(f"{repo.url}/git/trees/{head}", {'recursive': 1}, immutable=True)
+        dirs = None
+        if not data.get('truncated'):
+            dirs = {"": []}
+            for item in data['tree']:
+                item_path = item['path']
+                parent, _, name = item_path.rpartition('/')
+                if item['type'] == 'tree':
+                    dirs.setdefault(item_path, [])
+                    content_type = 'dir'
+                elif item['type'] == 'commit':
+                    content_type = 'submodule'
+                else:
+                    content_type = 'file'
+                raw_data = {'type': content_type, 'name': name, 'path': item_path,
+                            'sha': item['sha'], 'size': item.get('size', 0)}
+                dirs.setdefault(parent, []).append(self.github.create_from_raw_data(ContentFile, raw_data))
+        
+        with self._listing_lock:
+            self._listing_cache[repo.full_name] = {'head': head, 'dirs': dirs}
+        return dirs
+    
+    def list_remote_tree(self, repo: Repository, ref: Optional[str] = None,
+                         path: str = "") -> Dict[str, Dict[str, Any]]:
+        """一次性获取仓库的全部文件（递归 tree），返回 {path: {path, sha, size, mode}}
+
+        正常情况下只需一次 get_git_tree(recursive=True) 请求；仓库过大导致结果被
+        截断时，改为逐层获取子树，每个子树同样先尝试递归获取。
+        指定 path 时只获取该目录（"<ref>:<path>" 形式的 tree），返回的路径仍是
+        仓库内完整路径；目录不存在或仓库为空（还没有任何提交）时返回空字典。
+        """
+        try:
+            ref = ref or repo.default_branch
+            path = path.strip('/')
+            entries = {}
+            try:
+                if not path:
+                    self._collect_tree_entries(repo, ref, "", entries)
+                else:
+                    self._collect_tree_entries(repo, f"{ref}:{path}", path + '/', entries)
+            except GithubException as e:
+                # 409：空仓库；404：指定的目录不存在
+                if e.status == 409 or (path and e.status == 404):
+                    return {}
+                raise
+            return entries
+        except Exception as e:
+            raise Exception(f"获取远程文件树失败: {e}")
+    
+    def preflight_uploads(self, repo: Repository, uploads: List[Dict[str, Any]],
+                          base_path: str = "") -> List[Dict[str, Any]]:
+        """上传前检查：一次获取目标目录的 tree，按 blob SHA 把文件分为新建/覆盖/相同
+
+        uploads 为 commit_batch 格式的条目（含 'path' 和 'local_path'），就地补充：
+            'status': 'new' | 'overwrite' | 'identical'
+            'local_sha' / 'remote_sha'
+        覆盖已有文件时沿用远程的文件模式（如可执行位）。返回 uploads。
+        """
+        remote_entries = self.list_remote_tree(repo, path=base_path)
+        for upload in uploads:
+            local_sha = self.calculate_file_sha(upload['local_path'])
+            remote_entry = remote_entries.get(upload['path'].strip('/'))
+            upload['local_sha'] = local_sha
+            upload['remote_sha'] = remote_entry['sha'] if remote_entry else None
+            if not remote_entry:
+                upload['status'] = 'new'
+            elif remote_entry['sha'] == local_sha:
+                upload['status'] = 'identical'
+            else:
+                upload['status'] = 'overwrite'
+                if remote_entry['mode'] in ('100644', '100755'):
+                    upload.setdefault('mode', remote_entry['mode'])
+        return uploads
+    
+    def _collect_tree_entries(self, repo: Repository, tree_sha: str, prefix: str,
+                              entries: Dict[str, Dict[str, Any]]) -> None:
+        """收集 tree_sha 下的所有 blob；递归结果被截断时按子树分页获取"""
+        tree = repo.get_git_tree(sha=tree_sha, recursive=True)
+        if not tree.raw_data.get('truncated'):
+            for item in tree.tree:
+                if item.type == 'blob':
+                    path = prefix + item.path
+                    entries[path] = {'path': path, 'sha': item.sha, 'size': item.size or 0, 'mode': item.mode}
+            return
+        
+        # 被截断：只取当前一层，子目录逐个展开
+        tree = repo.get_git_tree(sha=tree_sha)
+        for item in tree.tree:
+            path = prefix + item.path
+            if item.type == 'blob':
+                entries[path] = {'path': path, 'sha': item.sha, 'size': item.size or 0, 'mode': item.mode}
+            elif item.type == 'tree':
+                self._collect_tree_entries(repo, item.sha, path + '/', entries)
+    
     def get_file_content(self, repo: Repository, path: str) -> Tuple[str, str]:
-        """获取文件内容"""
+        """获取文本文件内容（用于编辑器）"""
         try:
-            file = repo.get_contents(path)
+            data = self._get_contents_data(repo, path)
+            if isinstance(data, list):
+                raise Exception("不是文件类型")
+            file = self.github.create_from_raw_data(ContentFile, data)
             if file.type == "file":
-                content = base64.b64decode(file.content).decode('utf-8')
-                return content, file.sha
+                # 超过 1MB 的文件 contents 接口不返回内容，改用 blob 接口读取
+                data = file.decoded_content if file.content else self.read_blob(repo, sha=file.sha)
+                return data.decode('utf-8'), file.sha
             else:
                 raise Exception("不是文件类型")
         except Exception as e:
             raise Exception(f"获取文件内容失败: {e}")
     
+    def _open_blob_stream(self, repo: Repository, sha: Optional[str] = None, path: Optional[str] = None,
+                          ref: Optional[str] = None) -> requests.Response:
+        """以原始字节流方式打开文件：给出 sha 时走 blob 接口，给出 path 时走 contents raw 接口"""
+        if (sha is None) == (path is None):
+            raise Exception("sha 和 path 必须且只能指定一个")
+        if sha is not None:
+            url = f"{repo.url}/git/blobs/{sha}"
+            params = None
+        else:
+            url = f"{repo.url}/contents/{urllib.parse.quote(path.lstrip('/'))}"
+            params = {'ref': ref} if ref else None
+        response = self.get_http_session().get(url, params=params,
+                                               headers={'Accept': 'application/vnd.github.raw'},
+                                               stream=True, timeout=60)
+        response.raise_for_status()
+        return response
+    
+    def read_blob(self, repo: Repository, sha: Optional[str] = None, path: Optional[str] = None,
+                  ref: Optional[str] = None) -> bytes:
+        """按 blob SHA 或路径（二选一）读取文件的原始字节（支持二进制和超过 1MB 的文件）"""
+        try:
+            with self._open_blob_stream(repo, sha=sha, path=path, ref=ref) as response:
+                return response.content
+        except Exception as e:
+            raise Exception(f"读取文件失败: {e}")
+    
+    def read_blob_to_file(self, repo: Repository, dest_path: str, sha: Optional[str] = None,
+                          path: Optional[str] = None, ref: Optional[str] = None) -> int:
+        """按 blob SHA 或路径（二选一）把文件分块写入磁盘，内存占用与文件大小无关，返回写入字节数"""
+        temp_path = dest_path + '.part'
+        try:
+            dest_dir = os.path.dirname(dest_path)
+            if dest_dir:
+                os.makedirs(dest_dir, exist_ok=True)
+            written = 0
+            with self._open_blob_stream(repo, sha=sha, path=path, ref=ref) as response:
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self.BLOB_CHUNK_SIZE):
+                        f.write(chunk)
+                        written += len(chunk)
+            os.replace(temp_path, dest_path)
+            return written
+        except Exception as e:
+            try:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+            except OSError:
+                pass
+            raise Exception(f"下载文件失败: {e}")
+    
     def create_file(self, repo: Repository, path: str, content: str, 
-                   message: str = "Add new file") -> bool:
+                   message: str = "Add new file", expected_sha: Optional[str] = None) -> bool:
         """创建新文件，如果文件已存在则更新"""
         try:
-            repo.create_file(path, message, content)
+            self._put_file(repo, path, content, message, expected_sha)
             return True
         except Exception as e:
-            # 如果文件已存在，尝试更新
-            if "already exists" in str(e) or "sha" in str(e).lower():
-                try:
-                    return self.create_or_update_file(repo, path, content, message)
-                except Exception as update_e:
-                    raise Exception(f"创建/更新文件失败: {update_e}")
-            else:
-                raise Exception(f"创建文件失败: {e}")
+            raise Exception(f"创建文件失败: {e}")
     
     def create_or_update_file(self, repo: Repository, path: str, content: str, 
-                             message: str = "Create or update file") -> bool:
+                             message: str = "Create or update file", expected_sha: Optional[str] = None) -> bool:
         """创建或更新文件（智能判断）"""
         try:
-            # 先尝试获取现有文件
-            try:
-                existing_file = repo.get_contents(path)
-                # 文件存在，进行更新
-                repo.update_file(path, message, content, existing_file.sha)
-                return True
-            except Exception:
-                # 文件不存在，创建新文件
-                repo.create_file(path, message, content)
-                return True
+            self._put_file(repo, path, content, message, expected_sha)
+            return True
         except Exception as e:
             raise Exception(f"创建/更新文件失败: {e}")
     
+    def put_file(self, repo: Repository, path: str, content: str,
+                 message: str = "Update file", expected_sha: Optional[str] = None) -> str:
+        """写入文件（创建或更新），返回写入后的 blob SHA，供下次写入时作为 expected_sha"""
+        try:
+            return self._put_file(repo, path, content, message, expected_sha)
+        except Exception as e:
+            raise Exception(f"写入文件失败: {e}")
+    
+    def _put_file(self, repo: Repository, path: str, content: str, message: str,
+                  expected_sha: Optional[str] = None, retry_on_conflict: Optional[bool] = None) -> str:
+        """乐观并发写入：按预期的 SHA 直接 PUT，通常只需一次请求
+
+        未给出 expected_sha 时使用本地已知的 SHA（本工具上次写入的结果或按提交
+        缓存的目录列表）；都不知道时按新文件创建。retry_on_conflict 为 True 时，
+        SHA 与远程不一致（409/422）就重新获取当前 SHA 再重试；默认只在 SHA 是
+        猜测的（未给出 expected_sha）时重试。调用方给出的 SHA 冲突说明远程文件
+        已被别人修改，直接报错，不覆盖远程版本。
+        """
+        path = path.strip('/')
+        if retry_on_conflict is None:
+            retry_on_conflict = expected_sha is None
+        if expected_sha is None:
+            expected_sha = self._known_file_sha(repo, path)
+        
+        def write(sha):
+            self._before_write()
+            if sha:
+                result = repo.update_file(path, message, content, sha)
+            else:
+                result = repo.create_file(path, message, content)
+            return result['content'].sha
+        
+        return self._write_with_conflict_retry(repo, path, expected_sha, write, retry_on_conflict)
+    
+    def _write_with_conflict_retry(self, repo: Repository, path: str, expected_sha: Optional[str], write,
+                                   retry_on_conflict: bool = True):
+        """执行 write(expected_sha)，冲突时重新获取文件 SHA 后重试；记录写入后的 SHA
+
+        retry_on_conflict 为 False 时冲突直接报错（乐观并发：远程版本已变化）。
+        """
+        for attempt in range(self.WRITE_CONFLICT_RETRIES + 1):
+            try:
+                new_sha = write(expected_sha)
+                break
+            except GithubException as e:
+                if e.status == 409 and not retry_on_conflict:
+                    raise Exception(f"远程文件 {path} 已被修改，为避免覆盖他人的更改未写入，请刷新后重试") from e
+                if e.status not in (409, 422) or not retry_on_conflict or attempt == self.WRITE_CONFLICT_RETRIES:
+                    raise
+                current_sha = self._fetch_file_sha(repo, path)
+                if current_sha == expected_sha:
+                    raise  # SHA 没有变化，不是并发冲突（例如路径无效）
+                expected_sha = current_sha
+        with self._listing_lock:
+            self._written_shas[(repo.full_name, path)] = new_sha
+        return new_sha
+    
+    def _known_file_sha(self, repo: Repository, path: str) -> Optional[str]:
+        """不发请求、本地已知的文件 SHA；不知道或文件不存在时返回 None"""
+        with self._listing_lock:
+            if (repo.full_name, path) in self._written_shas:
+                return self._written_shas[(repo.full_name, path)]
+        listings = self.get_cached_directory_listings(repo)
+        if not listings:
+            return None
+        parent = path.rpartition('/')[0]
+        for file in listings.get(parent, []):
+            if file.path == path:
+                return file.sha if file.type == 'file' else None
+        return None
+    
+    def _fetch_file_sha(self, repo: Repository, path: str) -> Optional[str]:
+        """从服务器获取文件当前的 SHA（条件请求），文件不存在时返回 None"""
+        try:
+            data = self._get_contents_data(repo, path)
+        except UnknownObjectException:
+            return None
+        return data.get('sha') if isinstance(data, dict) else None
+    
+    def commit_batch(self, repo: Repository, changes: List[Dict[str, Any]],
+                     message: str = "Batch update files", branch: Optional[str] = None,
+                     progress_callback=None) -> str:
+        """批量提交文件（Git Data API：创建 blob -> 一个 tree -> 一个 commit -> 更新一次 ref）
+
+        changes 中每一项为字典：
+            {'path': 仓库内路径, 'content': str 或 bytes}
+            {'path': 仓库内路径, 'local_path': 本地文件路径}
+            {'path': 仓库内路径, 'delete': True}
+        bytes 和本地文件均按原始字节上传，内容不做任何编码转换。
+        可选键 'mode' 指定文件模式，默认 '100644'。
+        progress_callback(current, total, path) 在每个文件处理后调用。
+        无法读取的本地文件不提交，就地写入 change['error']，其余文件照常提交；
+        全部无法读取时抛出异常。返回新提交的 SHA。
+        """
+        if not changes:
+            raise Exception("批量提交失败: 没有需要提交的文件")
+        
+        try:
+            # 先确认本地文件都能读取，一个文件出错不影响整批提交
+            for change in changes:
+                change.pop('error', None)
+                if 'local_path' in change and not change.get('delete'):
+                    try:
+                        with open(change['local_path'], 'rb'):
+                            pass
+                    except OSError as e:
+                        change['error'] = f"无法读取: {e}"
+            if all(change.get('error') for change in changes):
+                raise Exception("所有文件都无法读取")
+            
+            branch = branch or repo.default_branch
+            total = len(changes)
+            initial = None
+            try:
+                ref = repo.get_git_ref(f"heads/{branch}")
+            except GithubException as e:
+                if e.status not in (404, 409):
+                    raise
+                # 空仓库（409）或分支不存在（404）时 Git Data API 无法使用：先用内容 API
+                # 写入第一个文件创建初始提交，其余文件再合并为一次提交
+                initial = next((change for change in changes
+                                if not change.get('delete') and not change.get('error')), None)
+                if initial is None:
+                    raise
+                self._create_initial_commit(repo, initial, message, branch)
+                if progress_callback:
+                    progress_callback(1, total, initial['path'])
+                ref = repo.get_git_ref(f"heads/{branch}")
+            base_commit = repo.get_git_commit(ref.object.sha)
+            
+            elements = []
+            done = 0 if initial is None else 1
+            for change in changes:
+                if change is initial:
+                    continue
+                done += 1
+                if change.get('error') or (initial is not None and change.get('delete')):
+                    # 无法读取的文件不提交；新建的分支中只有初始提交的文件，没有可删除的路径
+                    if progress_callback:
+                        progress_callback(done, total, change['path'])
+                    continue
+                path = change['path'].replace('\\', '/').lstrip('/')
+                mode = change.get('mode', '100644')
+                
+                if change.get('delete'):
+                    # sha 为 None 表示从树中删除该路径
+                    elements.append(InputGitTreeElement(path, mode, 'blob', sha=None))
+                elif 'local_path' in change:
+                    try:
+                        elements.append(self._tree_element_for_file(repo, path, mode, change['local_path']))
+                    except OSError as e:
+                        # 检查之后文件被删除或锁定
+                        change['error'] = f"无法读取: {e}"
+                        if progress_callback:
+                            progress_callback(done, total, path)
+                        continue
+                else:
+                    content = change['content']
+                    if isinstance(content, str):
+                        # 文本内容直接内联到 tree 中，省去一次创建 blob 的请求
+                        elements.append(InputGitTreeElement(path, mode, 'blob', content=content))
+                    else:
+                        self._before_write()
+                        blob = repo.create_git_blob(base64.b64encode(content).decode('ascii'), 'base64')
+                        elements.append(InputGitTreeElement(path, mode, 'blob', sha=blob.sha))
+                
+                if progress_callback:
+                    progress_callback(done, total, path)
+            
+            if not elements:
+                if initial is None:
+                    raise Exception("所有文件都无法读取")
+                return base_commit.sha  # 只有初始提交中的一个文件
+            
+            self._before_write()
+            tree = repo.create_git_tree(elements, base_tree=base_commit.tree)
+            self._before_write()
+            commit = repo.create_git_commit(message, tree, [base_commit])
+            self._before_write()
+            ref.edit(commit.sha)
+            return commit.sha
+        except Exception as e:
+            raise Exception(f"批量提交失败: {e}")
+    
+    def _create_initial_commit(self, repo: Repository, change: Dict[str, Any], message: str, branch: str) -> str:
+        """用内容 API 写入一个文件，在空仓库中创建第一个提交（同时创建分支），返回提交 SHA"""
+        path = change['path'].replace('\\', '/').lstrip('/')
+        if 'local_path' in change:
+            with open(change['local_path'], 'rb') as f:
+                content = f.read()
+        else:
+            content = change['content']
+        self._before_write()
+        result = repo.create_file(path, message, content, branch=branch)
+        return result['commit'].sha
+    
+    def _tree_element_for_file(self, repo: Repository, path: str, mode: str,
+                               local_path: str) -> InputGitTreeElement:
+        """为本地文件生成 tree 条目：小的 UTF-8 文本内联，其余按原始字节创建 blob"""
+        if os.path.getsize(local_path) <= self.INLINE_TEXT_MAX_SIZE:
+            with open(local_path, 'rb') as f:
+                data = f.read()
+            try:
+                # UTF-8 文本在 JSON 中往返是逐字节一致的，可以直接内联
+                return InputGitTreeElement(path, mode, 'blob', content=data.decode('utf-8'))
+            except UnicodeDecodeError:
+                self._before_write()
+                blob = repo.create_git_blob(base64.b64encode(data).decode('ascii'), 'base64')
+                return InputGitTreeElement(path, mode, 'blob', sha=blob.sha)
+        return InputGitTreeElement(path, mode, 'blob', sha=self.create_blob_from_file(repo, local_path))
+    
+    def create_blob_from_file(self, repo: Repository, local_path: str) -> str:
+        """把本地文件流式上传为 blob，返回 blob SHA
+
+        请求体边读文件边做 base64 编码，不会把整个文件读入内存。
+        """
+        try:
+            body = _Base64JsonBody(local_path)
+            response = self.get_http_session().post(
+                f"{repo.url}/git/blobs",
+                data=body,
+                headers={'Content-Type': 'application/json', 'Content-Length': str(len(body))},
+                timeout=300
+            )
+            response.raise_for_status()
+            return response.json()['sha']
+        except Exception as e:
+            raise Exception(f"上传文件失败 {local_path}: {e}")
+    
     def create_directory(self, repo: Repository, dir_path: str, 
                         message: str = "Create directory") -> bool:
         """创建目录（通过创建 .gitkeep 文件）"""
@@ -178,6 +863,7 @@ class GitHubManager:
             # GitHub 不能直接创建空目录，需要在目录中创建一个文件
             # 使用 .gitkeep 是一个常见的约定
             gitkeep_path = f"{dir_path}/.gitkeep" if dir_path else ".gitkeep"
+            self._before_write()
             repo.create_file(gitkeep_path, message, "# 此文件用于保持目录结构\n# This file is used to maintain directory structure")
             return True
         except Exception as e:
@@ -185,19 +871,35 @@ class GitHubManager:
     
     def update_file(self, repo: Repository, path: str, content: str, 
                    sha: str, message: str = "Update file") -> bool:
-        """更新文件"""
+        """更新文件（sha 与远程不一致时报错，不覆盖远程版本）"""
         try:
-            repo.update_file(path, message, content, sha)
+            self._put_file(repo, path, content, message, sha)
             return True
         except Exception as e:
             raise Exception(f"更新文件失败: {e}")
     
     def delete_file(self, repo: Repository, path: str, 
-                   message: str = "Delete file") -> bool:
-        """删除文件"""
+                   message: str = "Delete file", sha: Optional[str] = None) -> bool:
+        """删除文件；已知 SHA（参数或本地缓存）时直接发出删除请求
+
+        给出 sha 时，远程文件已被修改则报错而不删除较新的版本；SHA 是猜测的
+        （本地缓存）时冲突后重新获取再重试。
+        """
         try:
-            file = repo.get_contents(path)
-            repo.delete_file(path, message, file.sha)
+            path = path.strip('/')
+            retry_on_conflict = sha is None
+            sha = sha or self._known_file_sha(repo, path) or self._fetch_file_sha(repo, path)
+            if not sha:
+                raise Exception("文件不存在")
+            
+            def write(expected_sha):
+                if not expected_sha:
+                    raise Exception("文件已被删除")
+                self._before_write()
+                repo.delete_file(path, message, expected_sha)
+                return None
+            
+            self._write_with_conflict_retry(repo, path, sha, write, retry_on_conflict)
             return True
         except Exception as e:
             raise Exception(f"删除文件失败: {e}")
@@ -226,6 +928,46 @@ class GitHubManager:
         except Exception as e:
             raise Exception(f"获取仓库信息失败: {e}")
     
+    def download_repository_git(self, repo: Repository, local_path: str, progress_callback=None) -> bool:
+        """用 git 协议下载仓库
+
+        本地已是 git 镜像时只浅获取默认分支的最新提交（packfile 增量）并检出；
+        否则浅克隆到暂存目录，再替换目标目录。清单直接由 ls-tree 生成，与 REST
+        下载的格式相同，之后仍可使用增量下载和新鲜度检查。
+        """
+        if not self.git_transport or not self.git_transport.available:
+            raise Exception("未找到 git 程序")
+        
+        local_path = os.path.normpath(local_path)
+        staging_path = local_path + '.staging'
+        
+        try:
+            if GitTransport.is_mirror(local_path):
+                if progress_callback:
+                    progress_callback(f"🔄 git fetch --depth=1 {repo.default_branch}")
+                head_sha = self.git_transport.fetch(local_path, repo.default_branch, progress_callback)
+            else:
+                os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+                if os.path.exists(staging_path) and not self.safe_remove_directory(staging_path):
+                    raise Exception(f"无法清理暂存目录: {staging_path}")
+                if progress_callback:
+                    progress_callback(f"📥 git clone --depth=1 {repo.full_name}")
+                head_sha = self.git_transport.clone(repo.clone_url, staging_path, repo.default_branch,
+                                                    progress_callback)
+                self.swap_directory(staging_path, local_path)
+            
+            files_sha = self.git_transport.list_blobs(local_path)
+            self.save_repo_cache_info(local_path, self.build_repo_cache_info(repo, 'git', files_sha, head_sha))
+            
+            if progress_callback:
+                progress_callback(f"✅ 已检出 {head_sha[:7]}，共 {len(files_sha)} 个文件")
+            return True
+            
+        except Exception as e:
+            if os.path.exists(staging_path):
+                self.safe_remove_directory(staging_path)
+            raise Exception(f"git 下载失败: {e}")
+    
     def download_repository(self, repo: Repository, local_path: str, progress_callback=None, force_full_download=False) -> bool:
         """智能下载仓库（自动选择增量或全量下载）"""
         try:
@@ -234,6 +976,23 @@ class GitHubManager:
                     progress_callback("🔄 强制全量下载...")
                 return self.download_repository_full(repo, local_path, progress_callback)
             
+            # 先检查镜像是否已是最新：分支头未变化时只需一次 304，不必下载
+            need_update, reason = self.should_update_repository(repo, local_path)
+            if not need_update:
+                if progress_callback:
+                    progress_callback(f"✅ {reason}")
+                return True
+            if progress_callback:
+                progress_callback(f"📋 {reason}")
+            
+            if self.git_transport and self.git_transport.available:
+                self._take_mirror_head(local_path)  # git 直接获取分支最新提交，不使用检查结果
+                try:
+                    return self.download_repository_git(repo, local_path, progress_callback)
+                except Exception as e:
+                    if progress_callback:
+                        progress_callback(f"⚠️ {e}，改用 REST 下载")
+            
             # 检查仓库大小，决定下载策略
             repo_size_mb = getattr(repo, 'size', 0) / 1024  # GitHub API 返回的 size 是 KB
             
@@ -275,19 +1034,45 @@ class GitHubManager:
             raise Exception(f"获取可执行文件列表失败: {e}")
     
     def get_repo_cache_info(self, local_path: str) -> Dict[str, Any]:
-        """获取本地仓库缓存信息"""
+        """获取本地仓库缓存信息（旧格式会自动升级）"""
         cache_file = os.path.join(local_path, '.repo_cache.json')
         if os.path.exists(cache_file):
             try:
                 with open(cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    cache_info = json.load(f)
             except:
                 return {}
+            if cache_info.get('manifest_version', 1) < self.MANIFEST_VERSION:
+                cache_info = self.migrate_repo_cache_info(local_path, cache_info)
+            return cache_info
         return {}
     
+    def migrate_repo_cache_info(self, local_path: str, cache_info: Dict[str, Any]) -> Dict[str, Any]:
+        """将旧格式缓存升级为 git blob SHA 清单
+
+        旧格式记录的是文件内容的普通 SHA-1，无法与远程 tree 比较。这里按本地
+        现有文件重新计算 blob SHA；本地已不存在的文件从清单中移除，之后增量
+        更新时会重新下载它们。
+        """
+        items = []
+        for rel_path in cache_info.get('files_sha', {}):
+            file_path = os.path.join(local_path, rel_path)
+            try:
+                items.append((rel_path, file_path, os.stat(file_path)))
+            except OSError:
+                continue
+        
+        hash_index = FileHashIndex(local_path)
+        files_sha = hash_index.hash_files(items, workers=self.hash_workers)
+        hash_index.save()
+        
+        cache_info['files_sha'] = {path: sha for path, sha in files_sha.items() if sha}
+        cache_info['manifest_version'] = self.MANIFEST_VERSION
+        self.save_repo_cache_info(local_path, cache_info)
+        return cache_info
+    
     def save_repo_cache_info(self, local_path: str, cache_info: Dict[str, Any]) -> None:
         """保存仓库缓存信息"""
-        import os
         cache_file = os.path.join(local_path, '.repo_cache.json')
         try:
             with open(cache_file, 'w', encoding='utf-8') as f:
@@ -295,11 +1080,30 @@ class GitHubManager:
         except Exception as e:
             print(f"保存缓存信息失败: {e}")
     
+    def build_repo_cache_info(self, repo: Repository, download_method: str,
+                              files_sha: Dict[str, str], commit_sha: Optional[str] = None) -> Dict[str, Any]:
+        """生成缓存清单（全量和增量下载共用同一格式）
+
+        commit_sha 为本地内容对应的提交，下次增量更新时从它开始比较。
+        """
+        return {
+            'manifest_version': self.MANIFEST_VERSION,
+            'download_method': download_method,
+            'last_update': datetime.now().isoformat(),
+            'commit_sha': commit_sha,
+            'files_sha': files_sha
+        }
+    
+    @staticmethod
+    def calculate_blob_sha(data: bytes) -> str:
+        """计算数据的 git blob SHA（sha1("blob <len>\\0" + content)）"""
+        header = f"blob {len(data)}\0".encode()
+        return hashlib.sha1(header + data).hexdigest()
+    
     def calculate_file_sha(self, file_path: str) -> str:
-        """计算文件的SHA1哈希值"""
+        """计算文件的 git blob SHA，与 GitHub tree 中的 sha 一致（分块读取）"""
         try:
-            with open(file_path, 'rb') as f:
-                return hashlib.sha1(f.read()).hexdigest()
+            return calculate_blob_sha_of_file(file_path)
         except:
             return ""
     
@@ -354,89 +1158,135 @@ class GitHubManager:
             return False
     
     def should_update_repository(self, repo: Repository, local_path: str) -> Tuple[bool, str]:
-        """检查是否需要更新仓库"""
+        """检查是否需要更新仓库
+
+        比较默认分支头的提交与清单记录的提交：只需一次条件请求（未变化时为 304），
+        不受描述、话题等元数据修改的影响。得到的分支头按镜像记录下来，随后的
+        下载直接使用，不再重复请求。
+        """
         if not os.path.exists(local_path):
             return True, "本地目录不存在，需要全量下载"
         
         cache_info = self.get_repo_cache_info(local_path)
         
-        # 检查仓库更新时间
-        repo_updated_at = repo.updated_at.isoformat()
-        cached_updated_at = cache_info.get('repo_updated_at', '')
-        
-        if repo_updated_at != cached_updated_at:
-            return True, f"仓库有更新 (本地: {cached_updated_at}, 远程: {repo_updated_at})"
-        
         # 检查是否有基本文件
         if not cache_info.get('files_sha'):
             return True, "缺少文件缓存信息，需要重新下载"
         
+        try:
+            head_sha = self.get_branch_head(repo)
+        except Exception as e:
+            return True, f"无法获取分支头提交，需要检查文件: {e}"
+        self._mirror_heads[os.path.abspath(local_path)] = (head_sha, time.monotonic())
+        
+        commit_sha = cache_info.get('commit_sha')
+        if not commit_sha:
+            return True, "本地清单没有记录提交，需要对比文件树"
+        if commit_sha != head_sha:
+            return True, f"分支有新提交 (本地: {commit_sha[:7]}, 远程: {head_sha[:7]})"
+        
         return False, "仓库已是最新版本"
     
+    def _take_mirror_head(self, local_path: str) -> Optional[str]:
+        """取出最近一次新鲜度检查得到的分支头（只使用一次，过期则返回 None）"""
+        checked = self._mirror_heads.pop(os.path.abspath(local_path), None)
+        if checked and time.monotonic() - checked[1] <= self.MIRROR_HEAD_MAX_AGE:
+            return checked[0]
+        return None
+    
     def download_repository_incremental(self, repo: Repository, local_path: str, progress_callback=None) -> bool:
-        """增量下载仓库"""
+        """增量下载仓库
+
+        清单记录了上次同步到的提交时，用 compare 接口只取两次提交之间变更的文件，
+        重命名和复制直接在本地完成；历史被改写或没有记录提交时对比完整文件树。
+        """
         import os
-        import requests
+        import shutil
         
         try:
-            # 检查是否需要更新
-            need_update, reason = self.should_update_repository(repo, local_path)
-            
-            if progress_callback:
-                if need_update:
-                    progress_callback(f"📋 {reason}")
-                else:
-                    progress_callback(f"✅ {reason}")
+            # 智能下载刚检查过新鲜度时直接使用得到的分支头，否则先检查是否需要更新
+            head_sha = self._take_mirror_head(local_path)
+            if head_sha is None:
+                need_update, reason = self.should_update_repository(repo, local_path)
+                if not need_update:
+                    if progress_callback:
+                        progress_callback(f"✅ {reason}")
                     return True
+                if progress_callback:
+                    progress_callback(f"📋 {reason}")
+                head_sha = self._take_mirror_head(local_path)
             
             # 安全创建本地目录
             if not self.safe_create_directory(local_path):
                 raise Exception(f"无法创建目录: {local_path}")
             
             cache_info = self.get_repo_cache_info(local_path)
+            local_files = cache_info.get('files_sha', {})
             
-            # 获取仓库文件树
-            if progress_callback:
-                progress_callback("🔍 获取仓库文件列表...")
+            # 先确定要同步到的提交，之后的比较和下载都以它为准
+            if head_sha is None:
+                head_sha = self.get_branch_head(repo)
+            base_sha = cache_info.get('commit_sha')
             
-            try:
-                tree = repo.get_git_tree(sha=repo.default_branch, recursive=True)
-            except Exception as e:
+            changes = None
+            if base_sha and local_files:
+                if base_sha == head_sha:
+                    if progress_callback:
+                        progress_callback("✅ 所有文件都是最新的")
+                    return True
                 if progress_callback:
-                    progress_callback(f"⚠️ 无法获取文件树，回退到全量下载: {e}")
-                return self.download_repository_full(repo, local_path, progress_callback)
-            
-            # 分析需要更新的文件
-            files_to_download = []
-            files_to_delete = []
-            
-            remote_files = {item.path: item.sha for item in tree.tree if item.type == 'blob'}
-            local_files = cache_info.get('files_sha', {})
+                    progress_callback(f"🔍 比较提交 {base_sha[:7]}...{head_sha[:7]}")
+                try:
+                    changes = self.compare_changes(repo, base_sha, head_sha)
+                except Exception as e:
+                    if progress_callback:
+                        progress_callback(f"⚠️ 比较提交失败: {e}")
+                if changes is None and progress_callback:
+                    progress_callback("⚠️ 无法按提交比较（历史被改写或变更过多），改为对比完整文件树")
             
-            # 找出需要下载的文件（新增或修改）
-            for file_path, remote_sha in remote_files.items():
-                local_file_path = os.path.join(local_path, file_path)
-                local_sha = local_files.get(file_path, '')
+            if changes is not None:
+                # 从上次同步的清单出发，只应用两次提交之间的变更
+                new_files_sha = dict(local_files)
+                reference_count = len(local_files)
+            else:
+                if progress_callback:
+                    progress_callback("🔍 获取仓库文件列表...")
                 
-                if remote_sha != local_sha:
-                    files_to_download.append((file_path, remote_sha))
-            
-            # 找出需要删除的文件（远程已删除）
-            for file_path in local_files:
-                if file_path not in remote_files:
-                    local_file_path = os.path.join(local_path, file_path)
-                    if os.path.exists(local_file_path):
-                        files_to_delete.append(file_path)
+                try:
+                    remote_tree = self.list_remote_tree(repo, ref=head_sha)
+                except Exception as e:
+                    if progress_callback:
+                        progress_callback(f"⚠️ 无法获取文件树，回退到全量下载: {e}")
+                    return self.download_repository_full(repo, local_path, progress_callback)
+                
+                remote_files = {path: entry['sha'] for path, entry in remote_tree.items()}
+                changes = {'download': [], 'delete': [], 'rename': [], 'copy': []}
+                
+                # 找出需要下载的文件（新增或修改）
+                for file_path, remote_sha in remote_files.items():
+                    if remote_sha != local_files.get(file_path, ''):
+                        changes['download'].append((file_path, remote_sha))
+                
+                # 找出需要删除的文件（远程已删除）
+                for file_path in local_files:
+                    if file_path not in remote_files:
+                        changes['delete'].append(file_path)
+                
+                # 清单以远程为准
+                new_files_sha = dict(remote_files)
+                reference_count = len(remote_files)
             
-            total_operations = len(files_to_download) + len(files_to_delete)
+            total_operations = sum(len(items) for items in changes.values())
             
             if total_operations == 0:
+                new_cache_info = self.build_repo_cache_info(repo, 'incremental', new_files_sha, head_sha)
+                self.save_repo_cache_info(local_path, new_cache_info)
                 if progress_callback:
                     progress_callback("✅ 所有文件都是最新的")
                 return True
             
             # 判断是否使用增量更新
-            file_change_ratio = total_operations / max(len(remote_files), 1)
+            file_change_ratio = total_operations / max(reference_count, 1)
             
             if file_change_ratio > 0.5:  # 超过50%的文件需要更新
                 if progress_callback:
@@ -444,11 +1294,46 @@ class GitHubManager:
                 return self.download_repository_full(repo, local_path, progress_callback)
             
             if progress_callback:
-                progress_callback(f"📊 增量更新: {len(files_to_download)} 个文件下载, {len(files_to_delete)} 个文件删除")
+                progress_callback(f"📊 增量更新: {len(changes['download'])} 个文件下载, "
+                                  f"{len(changes['delete'])} 个文件删除, "
+                                  f"{len(changes['rename']) + len(changes['copy'])} 个文件重命名/复制")
+            
+            files_to_download = list(changes['download'])
+            
+            # 重命名/复制：本地源文件内容与目标一致时直接在本地移动或复制，无需下载。
+            # 源路径同时是另一项的目标（链式或互换重命名）时，相关各项都改为下载
+            moves = changes['copy'] + changes['rename']
+            chained = {old for old, _, _ in moves} & {new for _, new, _ in moves}
+            for operation in ('copy', 'rename'):
+                for old_path, new_path, blob_sha in changes[operation]:
+                    old_file_path = os.path.join(local_path, old_path)
+                    new_file_path = os.path.join(local_path, new_path)
+                    if operation == 'rename':
+                        changes['delete'].append(old_path)
+                    try:
+                        if old_path in chained or new_path in chained:
+                            raise Exception("与其他重命名冲突")
+                        if local_files.get(old_path) != blob_sha or not os.path.exists(old_file_path):
+                            raise Exception("本地内容与远程不一致")
+                        os.makedirs(os.path.dirname(new_file_path), exist_ok=True)
+                        if operation == 'rename':
+                            os.replace(old_file_path, new_file_path)
+                        else:
+                            shutil.copy2(old_file_path, new_file_path)
+                        new_files_sha[new_path] = blob_sha
+                        if progress_callback:
+                            progress_callback(f"📝 {'重命名' if operation == 'rename' else '复制'}: {old_path} → {new_path}")
+                    except Exception as e:
+                        files_to_download.append((new_path, blob_sha))
+                        if progress_callback:
+                            progress_callback(f"⚠️ 无法在本地{'重命名' if operation == 'rename' else '复制'} {old_path}，改为下载: {e}")
             
             # 删除本地多余的文件
-            for file_path in files_to_delete:
+            for file_path in changes['delete']:
+                new_files_sha.pop(file_path, None)
                 local_file_path = os.path.join(local_path, file_path)
+                if not os.path.exists(local_file_path):
+                    continue
                 try:
                     os.remove(local_file_path)
                     if progress_callback:
@@ -457,47 +1342,19 @@ class GitHubManager:
                     if progress_callback:
                         progress_callback(f"⚠️ 删除文件失败 {file_path}: {e}")
             
-            # 下载需要更新的文件
-            completed = 0
-            for file_path, remote_sha in files_to_download:
-                try:
-                    # 使用 GitHub API 下载单个文件
-                    file_content = repo.get_contents(file_path)
-                    
-                    local_file_path = os.path.join(local_path, file_path)
-                    local_dir = os.path.dirname(local_file_path)
-                    
-                    # 创建目录
-                    if local_dir and not os.path.exists(local_dir):
-                        os.makedirs(local_dir)
-                    
-                    # 写入文件
-                    if hasattr(file_content, 'decoded_content'):
-                        with open(local_file_path, 'wb') as f:
-                            f.write(file_content.decoded_content)
-                    else:
-                        # 如果是文本文件
-                        content = base64.b64decode(file_content.content).decode('utf-8')
-                        with open(local_file_path, 'w', encoding='utf-8') as f:
-                            f.write(content)
-                    
-                    completed += 1
-                    if progress_callback:
-                        progress = (completed / len(files_to_download)) * 100
-                        progress_callback(f"📥 下载文件 ({completed}/{len(files_to_download)}) {progress:.1f}%: {file_path}")
-                        
-                except Exception as e:
-                    if progress_callback:
-                        progress_callback(f"❌ 下载文件失败 {file_path}: {e}")
-            
-            # 更新缓存信息
-            new_cache_info = {
-                'repo_updated_at': repo.updated_at.isoformat(),
-                'download_method': 'incremental',
-                'last_update': datetime.now().isoformat(),
-                'files_sha': remote_files
-            }
+            # 并发下载需要更新的文件；下载失败的文件保留旧记录，下次更新时会重试
+            for file_path, blob_sha in files_to_download:
+                new_files_sha[file_path] = blob_sha
+            failed_files = self.download_files_concurrently(repo, files_to_download, local_path, progress_callback)
+            for file_path in failed_files:
+                if local_files.get(file_path):
+                    new_files_sha[file_path] = local_files[file_path]
+                else:
+                    new_files_sha.pop(file_path, None)
             
+            # 更新缓存信息；有文件下载失败时不记录新的提交，下次对比完整文件树重试
+            new_cache_info = self.build_repo_cache_info(repo, 'incremental', new_files_sha,
+                                                        None if failed_files else head_sha)
             self.save_repo_cache_info(local_path, new_cache_info)
             
             if progress_callback:
@@ -510,18 +1367,108 @@ class GitHubManager:
                 progress_callback(f"❌ 增量更新失败，回退到全量下载: {e}")
             return self.download_repository_full(repo, local_path, progress_callback)
     
+    def compare_changes(self, repo: Repository, base_sha: str,
+                        head_sha: str) -> Optional[Dict[str, List[Any]]]:
+        """用 compare 接口（base...head）获取两个提交之间变更的文件
+
+        返回 {'download': [(path, sha)], 'delete': [path],
+              'rename': [(旧路径, 新路径, sha)], 'copy': [(源路径, 新路径, sha)]}。
+        base 不是 head 的祖先（历史被改写）、base 已不存在或变更文件数达到接口上限
+        时返回 None，调用方应改为对比完整文件树。
+        """
+        try:
+            # 两个提交 SHA 之间的比较结果不会变化
+            data, _ = self._cached_get(f"{repo.url}/compare/{base_sha}...{head_sha}", immutable=True)
+        except UnknownObjectException:
+            return None
+        if data.get('status') not in ('ahead', 'identical'):
+            return None
+        files = data.get('files') or []
+        if len(files) >= self.COMPARE_MAX_FILES:
+            return None
+        
+        changes = {'download': [], 'delete': [], 'rename': [], 'copy': []}
+        for file in files:
+            status = file['status']
+            if status == 'removed':
+                changes['delete'].append(file['filename'])
+            elif status == 'renamed':
+                changes['rename'].append((file['previous_filename'], file['filename'], file['sha']))
+            elif status == 'copied':
+                changes['copy'].append((file['previous_filename'], file['filename'], file['sha']))
+            elif status != 'unchanged':
+                changes['download'].append((file['filename'], file['sha']))
+        return changes
+    
+    def download_files_concurrently(self, repo: Repository, files: List[Tuple[str, str]], local_path: str,
+                                    progress_callback=None) -> List[str]:
+        """用有界线程池并发下载文件 [(path, blob_sha)]，返回下载失败的路径列表
+
+        每个文件通过 read_blob_to_file 流式写盘，所有请求共用一个 keep-alive 会话；
+        每个文件失败后单独重试。进度回调始终在调用线程中按完成顺序依次调用，
+        计数单调递增。
+        """
+        if not files:
+            return []
+        
+        total = len(files)
+        
+        def download_one(file_path, blob_sha):
+            local_file_path = os.path.join(local_path, file_path)
+            delay = 0.5
+            for attempt in range(1, self.DOWNLOAD_MAX_ATTEMPTS + 1):
+                try:
+                    self.read_blob_to_file(repo, local_file_path, sha=blob_sha)
+                    return None
+                except Exception as e:
+                    if attempt == self.DOWNLOAD_MAX_ATTEMPTS:
+                        return str(e)
+                    time.sleep(delay)
+                    delay *= 2
+        
+        failed = []
+        completed = 0
+        with ThreadPoolExecutor(max_workers=min(self.download_workers, total)) as executor:
+            futures = {executor.submit(download_one, file_path, blob_sha): file_path
+                       for file_path, blob_sha in files}
+            for future in as_completed(futures):
+                file_path = futures[future]
+                error = future.result()
+                completed += 1
+                if error:
+                    failed.append(file_path)
+                    if progress_callback:
+                        progress_callback(f"❌ 下载文件失败 {file_path}: {error}")
+                elif progress_callback:
+                    progress = (completed / total) * 100
+                    progress_callback(f"📥 下载文件 ({completed}/{total}) {progress:.1f}%: {file_path}")
+        
+        return failed
+    
     def download_repository_full(self, repo: Repository, local_path: str, progress_callback=None) -> bool:
-        """全量下载仓库（原有方法重命名）"""
-        import os
-        import zipfile
-        import tempfile
+        """全量下载仓库
+
+        tarball 边下载边解压：去掉归档根目录前缀后，每个文件只写入一次到目标目录
+        旁边的暂存目录，同时计算 blob SHA；完成后用重命名把暂存目录换成目标目录。
+        """
         import shutil
-        import requests
+        
+        local_path = os.path.normpath(local_path)
+        staging_path = local_path + '.staging'
         
         try:
-            # 安全创建本地目录
-            if not self.safe_create_directory(local_path):
-                raise Exception(f"无法创建目录: {local_path}")
+            os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+            if not self.safe_create_directory(staging_path, clear_existing=True):
+                raise Exception(f"无法创建暂存目录: {staging_path}")
+            
+            # 先确定分支头提交并下载该提交的归档，清单记录的提交与内容保持一致
+            head_sha = self._take_mirror_head(local_path)
+            if head_sha is None:
+                try:
+                    head_sha = self.get_branch_head(repo)
+                except Exception as e:
+                    if progress_callback:
+                        progress_callback(f"⚠️ 获取分支头提交失败，下次将对比完整文件树: {e}")
             
             # 使用 GitHub API 获取下载链接，这样更可靠
             if progress_callback:
@@ -529,7 +1476,7 @@ class GitHubManager:
             
             # 先尝试使用 PyGithub 获取 tarball URL（更可靠）
             try:
-                download_url = repo.get_archive_link("zipball")
+                download_url = repo.get_archive_link("tarball", ref=head_sha) if head_sha else repo.get_archive_link("tarball")
                 if progress_callback:
                     progress_callback("正在下载仓库...")
                 response = requests.get(download_url, stream=True, allow_redirects=True)
@@ -538,7 +1485,7 @@ class GitHubManager:
                 import urllib.parse
                 encoded_repo_name = urllib.parse.quote(repo.full_name, safe='/')
                 encoded_branch = urllib.parse.quote(repo.default_branch)
-                download_url = f"https://github.com/{encoded_repo_name}/archive/refs/heads/{encoded_branch}.zip"
+                download_url = f"https://github.com/{encoded_repo_name}/archive/refs/heads/{encoded_branch}.tar.gz"
                 
                 if progress_callback:
                     progress_callback(f"使用备用方式下载... URL: {download_url}")
@@ -551,7 +1498,7 @@ class GitHubManager:
                     for branch in common_branches:
                         if branch != repo.default_branch:
                             encoded_branch_alt = urllib.parse.quote(branch)
-                            alt_url = f"https://github.com/{encoded_repo_name}/archive/refs/heads/{encoded_branch_alt}.zip"
+                            alt_url = f"https://github.com/{encoded_repo_name}/archive/refs/heads/{encoded_branch_alt}.tar.gz"
                             if progress_callback:
                                 progress_callback(f"尝试分支 {branch}...")
                             response = requests.get(alt_url, stream=True)
@@ -561,76 +1508,22 @@ class GitHubManager:
             
             response.raise_for_status()
             
-            # 保存到临时文件
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_file:
-                temp_zip_path = temp_file.name
-                total_size = int(response.headers.get('content-length', 0))
-                downloaded = 0
-                
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        temp_file.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        if progress_callback and total_size > 0:
-                            progress = (downloaded / total_size) * 100
-                            progress_callback(f"下载进度: {progress:.1f}%")
-            
             if progress_callback:
-                progress_callback("正在解压文件...")
+                progress_callback("正在下载并解压文件...")
             
-            # 解压 ZIP 文件
-            with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-                # 获取ZIP中的根目录名
-                zip_contents = zip_ref.namelist()
-                root_folder = zip_contents[0].split('/')[0] if zip_contents else ""
-                
-                # 解压到临时目录
-                temp_extract_dir = tempfile.mkdtemp()
-                zip_ref.extractall(temp_extract_dir)
-                
-                # 移动文件到目标目录
-                if root_folder:
-                    source_dir = os.path.join(temp_extract_dir, root_folder)
-                    if os.path.exists(source_dir):
-                        # 安全清空目标目录（全量替换）
-                        if not self.safe_create_directory(local_path, clear_existing=True):
-                            raise Exception(f"无法清空并重建目录: {local_path}")
-                        
-                        for item in os.listdir(source_dir):
-                            source_item = os.path.join(source_dir, item)
-                            dest_item = os.path.join(local_path, item)
-                            
-                            if os.path.isdir(source_item):
-                                shutil.copytree(source_item, dest_item)
-                            else:
-                                shutil.copy2(source_item, dest_item)
-                
-                # 清理临时目录
-                shutil.rmtree(temp_extract_dir)
+            hash_index = FileHashIndex(staging_path)
+            with response:
+                files_sha = self.extract_tarball_stream(response.raw, staging_path, hash_index,
+                                                        int(response.headers.get('content-length', 0)),
+                                                        progress_callback)
+            hash_index.save()
             
-            # 删除临时ZIP文件
-            os.unlink(temp_zip_path)
+            # 用暂存目录替换目标目录
+            self.swap_directory(staging_path, local_path)
             
             # 保存缓存信息
             try:
-                # 计算所有文件的SHA
-                files_sha = {}
-                for root, dirs, files in os.walk(local_path):
-                    for file in files:
-                        if file == '.repo_cache.json':
-                            continue
-                        file_path = os.path.join(root, file)
-                        rel_path = os.path.relpath(file_path, local_path).replace('\\', '/')
-                        files_sha[rel_path] = self.calculate_file_sha(file_path)
-                
-                cache_info = {
-                    'repo_updated_at': repo.updated_at.isoformat(),
-                    'download_method': 'full',
-                    'last_update': datetime.now().isoformat(),
-                    'files_sha': files_sha
-                }
-                
+                cache_info = self.build_repo_cache_info(repo, 'full', files_sha, head_sha)
                 self.save_repo_cache_info(local_path, cache_info)
             except Exception as e:
                 if progress_callback:
@@ -642,12 +1535,157 @@ class GitHubManager:
             return True
             
         except Exception as e:
-            # 清理可能创建的临时文件
+            # 清理暂存目录
             try:
-                if 'temp_zip_path' in locals() and os.path.exists(temp_zip_path):
-                    os.unlink(temp_zip_path)
-                if 'temp_extract_dir' in locals() and os.path.exists(temp_extract_dir):
-                    shutil.rmtree(temp_extract_dir)
+                if os.path.exists(staging_path):
+                    shutil.rmtree(staging_path)
             except:
                 pass
-            raise Exception(f"下载仓库失败: {e}") 
\ No newline at end of file
+            raise Exception(f"下载仓库失败: {e}")
+    
+    def extract_tarball_stream(self, stream, target_dir: str, hash_index: FileHashIndex,
+                               total_size: int = 0, progress_callback=None) -> Dict[str, str]:
+        """从流中逐个解压 tar.gz 成员到 target_dir，返回 {相对路径: blob SHA}
+
+        去掉归档的根目录前缀（owner-repo-sha/），拒绝绝对路径和包含 .. 的成员。
+        文件内容在写入的同时计算 blob SHA，并以归档中的修改时间写入哈希索引。
+        """
+        import tarfile
+        
+        counter = _CountingReader(stream)
+        files_sha = {}
+        last_report = 0
+        
+        with tarfile.open(fileobj=counter, mode='r|gz') as tar:
+            for member in tar:
+                parts = member.name.split('/', 1)
+                if len(parts) < 2 or not parts[1].strip('/'):
+                    continue  # 根目录本身或 pax 全局头
+                rel_path = parts[1].rstrip('/')
+                if rel_path.startswith('/') or '..' in rel_path.split('/'):
+                    raise Exception(f"归档中包含不安全的路径: {member.name}")
+                dest_path = os.path.join(target_dir, *rel_path.split('/'))
+                
+                if member.isdir():
+                    os.makedirs(dest_path, exist_ok=True)
+                    continue
+                
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                if member.issym():
+                    # 符号链接的 blob 内容就是链接目标
+                    target = member.linkname.encode('utf-8')
+                    sha = self.calculate_blob_sha(target)
+                    try:
+                        os.symlink(member.linkname, dest_path)
+                    except (OSError, NotImplementedError):
+                        with open(dest_path, 'wb') as f:
+                            f.write(target)
+                    files_sha[rel_path] = sha
+                    continue
+                if not member.isfile():
+                    continue
+                
+                blob_sha = hashlib.sha1(f"blob {member.size}\0".encode())
+                source = tar.extractfile(member)
+                with open(dest_path, 'wb') as f:
+                    while True:
+                        chunk = source.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        blob_sha.update(chunk)
+                        f.write(chunk)
+                if member.mode & 0o111:
+                    os.chmod(dest_path, 0o755)
+                # 使用提交时间作为修改时间，使哈希索引可以立即缓存这些文件
+                os.utime(dest_path, (member.mtime, member.mtime))
+                
+                sha = blob_sha.hexdigest()
+                files_sha[rel_path] = sha
+                hash_index.update(rel_path, os.stat(dest_path), sha)
+                
+                if progress_callback and counter.bytes_read - last_report >= 1024 * 1024:
+                    last_report = counter.bytes_read
+                    if total_size > 0:
+                        progress = (counter.bytes_read / total_size) * 100
+                        progress_callback(f"下载进度: {progress:.1f}% ({len(files_sha)} 个文件)")
+                    else:
+                        progress_callback(f"已下载 {counter.bytes_read / 1024 / 1024:.1f} MB ({len(files_sha)} 个文件)")
+        
+        return files_sha
+    
+    def swap_directory(self, new_path: str, target_path: str) -> None:
+        """用 new_path 替换 target_path（两次重命名，失败时恢复原目录）"""
+        backup_path = target_path + '.old'
+        if os.path.exists(backup_path) and not self.safe_remove_directory(backup_path):
+            raise Exception(f"无法清理旧的备份目录: {backup_path}")
+        
+        if os.path.exists(target_path):
+            os.rename(target_path, backup_path)
+        try:
+            os.rename(new_path, target_path)
+        except Exception:
+            if os.path.exists(backup_path):
+                os.rename(backup_path, target_path)
+            raise
+        
+        if os.path.exists(backup_path):
+            self.safe_remove_directory(backup_path)
+
+
+class _CountingReader:
+    """包装文件对象，统计已读取的字节数（用于下载进度）"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+    
+    def read(self, size=-1) -> bytes:
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class _Base64JsonBody:
+    """以 {"encoding": "base64", "content": "..."} 形式流式读出文件的请求体
+
+    requests 通过 len() 得到 Content-Length，通过 read() 分块读取，避免整个文件
+    及其 base64 编码同时驻留内存。
+    """
+    
+    PREFIX = b'{"encoding":"base64","content":"'
+    SUFFIX = b'"}'
+    RAW_CHUNK_SIZE = 3 * 256 * 1024  # 3 的倍数，保证分块编码结果可以直接拼接
+    
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.file = open(file_path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.length = len(self.PREFIX) + 4 * ((size + 2) // 3) + len(self.SUFFIX)
+        self.buffer = self.PREFIX
+        self.finished = False
+    
+    def rewind(self) -> None:
+        """回到开头，供限流后重发请求使用"""
+        if not self.file.closed:
+            self.file.close()
+        self.file = open(self.file_path, 'rb')
+        self.buffer = self.PREFIX
+        self.finished = False
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def read(self, size=-1) -> bytes:
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            chunk = self.file.read(self.RAW_CHUNK_SIZE)
+            if chunk:
+                self.buffer += base64.b64encode(chunk)
+            else:
+                self.buffer += self.SUFFIX
+                self.finished = True
+                self.file.close()
+        if size < 0:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+DEFAULT_CACHE_DIR = '.http_cache'
+
+# 磁盘缓存总大小上限，超出后按最近最少使用顺序淘汰
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class HttpCache:
+    """GitHub API 响应的磁盘缓存（按 URL + Token 区分）
+
+    保存响应体及其 ETag / Last-Modified，请求时带上 If-None-Match /
+    If-Modified-Since。服务器返回 304 时直接使用缓存内容，且不计入 API 速率限制。
+    每个响应一个文件，文件的修改时间即最近访问时间（命中时更新），总大小超过
+    max_bytes 时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, int]" = OrderedDict()  # key -> 文件大小，越靠后越新
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def make_key(token: str, url: str, accept: str = "") -> str:
+        """缓存键：Token 只参与哈希，不写入磁盘"""
+        token_digest = hashlib.sha256(token.encode()).hexdigest()
+        return hashlib.sha256(f"{token_digest}\n{accept}\n{url}".encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def load(self) -> None:
+        """扫描缓存目录，按文件修改时间恢复访问顺序"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        found = []
+        for root, dirs, files in os.walk(self.cache_dir):
+            for file in files:
+                if not file.endswith('.json'):
+                    continue
+                try:
+                    stat_result = os.stat(os.path.join(root, file))
+                except OSError:
+                    continue
+                found.append((stat_result.st_mtime_ns, file[:-5], stat_result.st_size))
+        found.sort()
+        self.entries = OrderedDict((key, size) for _, key, size in found)
+        self.total_bytes = sum(self.entries.values())
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存条目 {url, etag, last_modified, body}，不存在时返回 None"""
+        with self._lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(entry_path)
+            return entry
+        except (json.JSONDecodeError, IOError):
+            self._discard(key)
+            return None
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """根据缓存条目生成条件请求头"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, key: str, url: str, etag: Optional[str], last_modified: Optional[str], body: Any) -> None:
+        """写入缓存条目；没有 ETag 和 Last-Modified 的响应无法重新验证，不缓存"""
+        if not etag and not last_modified:
+            return
+        entry = {'url': url, 'etag': etag, 'last_modified': last_modified,
+                 'stored_at': time.time(), 'body': body}
+        data = json.dumps(entry, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+
+        entry_path = self._entry_path(key)
+        temp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, entry_path)
+        except IOError as e:
+            print(f"写入 HTTP 缓存失败: {e}")
+            return
+
+        with self._lock:
+            self.total_bytes += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            evicted = []
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, old_size = self.entries.popitem(last=False)
+                self.total_bytes -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._remove_file(old_key)
+
+    def _discard(self, key: str) -> None:
+        with self._lock:
+            self.total_bytes -= self.entries.pop(key, 0)
+        self._remove_file(key)
+
+    def _remove_file(self, key: str) -> None:
+        try:
+            os.unlink(self._entry_path(key))
+        except OSError:
+            pass
+
+    def record(self, hit: bool) -> None:
+        """记录一次命中（304）或未命中（200）"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """命中/未命中次数及缓存占用"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(self.entries), 'bytes': self.total_bytes}
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            keys = list(self.entries)
+            self.entries.clear()
+            self.total_bytes = 0
+        for key in keys:
+            self._remove_file(key)
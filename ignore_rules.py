@@ -0,0 +1,155 @@
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Pattern, Tuple
+
+
+GITIGNORE_FILENAME = '.gitignore'
+
+# 扫描本地目录时总是跳过的目录（git 自己的数据，不会出现在远程仓库中）
+ALWAYS_PRUNED_DIRS = frozenset(['.git'])
+
+
+def _translate(pattern: str) -> str:
+    """把 gitignore 的通配符翻译成正则表达式（不含首尾锚定）"""
+    result = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                at_start = i == 0 or pattern[i - 1] == '/'
+                at_end = i + 2 == n or pattern[i + 2] == '/'
+                if at_start and at_end:
+                    if i + 2 == n:
+                        result.append('.*')  # 末尾的 "**"：其中的所有内容
+                    else:
+                        result.append('(?:.*/)?')  # "**/"：零个或多个目录
+                        i += 1  # 连同后面的 "/" 一起消耗
+                    i += 2
+                    continue
+                # 不在路径段边界上的 "**" 与 "*" 相同
+                i += 1
+            result.append('[^/]*')
+        elif c == '?':
+            result.append('[^/]')
+        elif c == '[':
+            j = i + 2 if pattern[i + 1:i + 2] in ('!', '^') else i + 1
+            end = pattern.find(']', j + 1)  # 紧跟在 "[" 后的 "]" 属于字符集本身
+            if end == -1:
+                result.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[0] in '!^':
+                    body = '^' + body[1:]
+                result.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            result.append(re.escape(pattern[i]))
+        else:
+            result.append(re.escape(c))
+        i += 1
+    return ''.join(result)
+
+
+class IgnoreMatcher:
+    """与 .gitignore 语义兼容的忽略规则匹配器
+
+    规则预先编译为正则表达式；支持注释、"!" 取反、"/" 锚定、"**"、以 "/" 结尾
+    的仅目录规则，后面的规则覆盖前面的规则。目录被忽略时其中的所有内容都被
+    忽略（与 git 相同，取反规则不能重新包含被忽略目录中的文件）。每组规则
+    有自己的基准目录，用于仓库中各级目录的 .gitignore。
+    """
+
+    def __init__(self, patterns: Iterable[str] = (), base: str = ""):
+        # (正则, 是否取反, 是否仅匹配目录, 基准目录前缀)
+        self.rules: List[Tuple[Pattern, bool, bool, str]] = []
+        self.add_patterns(patterns, base)
+
+    def add_patterns(self, patterns: Iterable[str], base: str = "") -> None:
+        """添加一组规则；base 为规则所在目录（相对仓库根目录），根目录为空字符串"""
+        prefix = base.strip('/') + '/' if base.strip('/') else ''
+        for line in patterns:
+            rule = self._compile(line)
+            if rule:
+                self.rules.append(rule + (prefix,))
+
+    def add_gitignore_file(self, file_path: str, base: str = "") -> None:
+        """读取 .gitignore 文件中的规则"""
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                self.add_patterns(f.read().splitlines(), base)
+        except IOError as e:
+            print(f"读取 {file_path} 失败: {e}")
+
+    @staticmethod
+    def _compile(line: str) -> Optional[Tuple[Pattern, bool, bool]]:
+        line = line.rstrip('\r\n')
+        # 行尾空格被忽略，除非用反斜杠转义
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        if not line or line.startswith('#'):
+            return None
+
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return None
+
+        # 含有 "/"（结尾除外）的规则相对于基准目录锚定，否则匹配任意层级的名称
+        anchored = '/' in line
+        line = line.lstrip('/')
+        regex = _translate(line)
+        if not anchored:
+            regex = '(?:.*/)?' + regex
+        return re.compile(f'^{regex}$', re.DOTALL), negate, dir_only
+
+    def match(self, path: str, is_dir: bool = False) -> bool:
+        """只按规则判断 path 本身（不检查上级目录），供逐层遍历时使用"""
+        ignored = False
+        for regex, negate, dir_only, prefix in self.rules:
+            if ignored == (not negate):
+                continue  # 这条规则不会改变结果
+            if dir_only and not is_dir:
+                continue
+            if prefix:
+                if not path.startswith(prefix):
+                    continue
+                relative = path[len(prefix):]
+            else:
+                relative = path
+            if regex.match(relative):
+                ignored = not negate
+        return ignored
+
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """判断仓库内路径（"/" 分隔）是否被忽略，包括位于被忽略目录中的情况"""
+        parts = path.strip('/').split('/')
+        for depth in range(1, len(parts)):
+            if parts[depth - 1] in ALWAYS_PRUNED_DIRS or self.match('/'.join(parts[:depth]), True):
+                return True
+        return self.match('/'.join(parts), is_dir)
+
+    def walk(self, root_dir: str, read_gitignore: bool = True) -> Iterator[Tuple[str, str, List[str]]]:
+        """遍历本地目录，返回 (目录绝对路径, 相对路径, 未被忽略的文件名列表)
+
+        被忽略的目录不会进入，其中的文件不会被 stat。read_gitignore 为 True 时
+        读取遇到的每个 .gitignore，其规则只作用于所在目录及其子目录。
+        """
+        for dirpath, dirs, files in os.walk(root_dir):
+            rel_dir = os.path.relpath(dirpath, root_dir).replace('\\', '/')
+            prefix = '' if rel_dir == '.' else rel_dir + '/'
+            if read_gitignore and GITIGNORE_FILENAME in files:
+                self.add_gitignore_file(os.path.join(dirpath, GITIGNORE_FILENAME), prefix)
+
+            dirs[:] = [d for d in dirs
+                       if d not in ALWAYS_PRUNED_DIRS and not self.match(prefix + d, True)]
+            yield dirpath, prefix.rstrip('/'), [f for f in files if not self.match(prefix + f)]
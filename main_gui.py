@@ -1,8 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, scrolledtext
 import threading
-import base64
-import hashlib
+import time
 from datetime import datetime
 from typing import Optional, List
 from github.Repository import Repository
@@ -10,6 +9,11 @@ from github.ContentFile import ContentFile
 
 from config import Config
 from github_manager import GitHubManager
+from file_index import FileHashIndex, INDEX_FILENAME
+from virtual_tree import VirtualTreeview
+from prefetcher import Prefetcher
+from progress_channel import ProgressChannel
+from ignore_rules import IgnoreMatcher
 
 
 class GitHubRepoManager:
@@ -20,9 +24,11 @@ class GitHubRepoManager:
         
         self.config = Config()
         self.github_manager: Optional[GitHubManager] = None
+        self.prefetcher: Optional[Prefetcher] = None
         self.current_repo: Optional[Repository] = None
         self.current_path = ""
         self.file_sha_cache = {}  # 缓存文件的 SHA 值
+        self._rate_label_pending = False
         
         self.setup_ui()
         self.check_token()
@@ -67,6 +73,63 @@ class GitHubRepoManager:
         
         # 刷新按钮
         ttk.Button(toolbar, text="刷新", command=self.refresh_repos).pack(side=tk.RIGHT)
+        
+        # API 缓存统计
+        self.cache_label = ttk.Label(toolbar, text="", foreground="gray")
+        self.cache_label.pack(side=tk.RIGHT, padx=(0, 10))
+        
+        # API 剩余额度
+        self.rate_label = ttk.Label(toolbar, text="", foreground="gray")
+        self.rate_label.pack(side=tk.RIGHT, padx=(0, 10))
+    
+    def create_github_manager(self, token: str) -> GitHubManager:
+        """创建 GitHubManager 并订阅 API 额度变化，同时创建文件浏览器的预取器"""
+        manager = GitHubManager(token,
+                                hash_workers=self.config.get_hash_workers(),
+                                download_workers=self.config.get_download_workers(),
+                                use_graphql=self.config.get_use_graphql(),
+                                use_git_transport=self.config.get_use_git_transport())
+        manager.rate_limiter.add_listener(self.on_rate_limit_change)
+        if self.prefetcher:
+            self.prefetcher.stop()
+        self.prefetcher = Prefetcher(manager)
+        return manager
+    
+    def on_rate_limit_change(self, status):
+        """额度变化回调（在请求线程中调用），合并后交给主线程刷新"""
+        if not self._rate_label_pending:
+            self._rate_label_pending = True
+            self.root.after(200, self.update_rate_limit_label)
+    
+    def update_rate_limit_label(self):
+        """显示 API 剩余额度；限流等待时显示倒计时"""
+        self._rate_label_pending = False
+        if not self.github_manager:
+            return
+        status = self.github_manager.get_rate_limit_status()
+        if status['waiting_until']:
+            seconds = max(0, int(status['waiting_until'] - time.time()))
+            self.rate_label.config(text=f"⏳ API 限流，{seconds} 秒后继续", foreground="red")
+            # 等待期间每秒刷新倒计时
+            self._rate_label_pending = True
+            self.root.after(1000, self.update_rate_limit_label)
+        elif status['remaining'] is not None:
+            reset_text = datetime.fromtimestamp(status['reset_at']).strftime("%H:%M") if status['reset_at'] else "-"
+            color = "orange" if status['limit'] and status['remaining'] < status['limit'] * 0.1 else "gray"
+            self.rate_label.config(text=f"API 额度 {status['remaining']}/{status['limit']} (重置 {reset_text})",
+                                   foreground=color)
+    
+    def update_cache_stats(self):
+        """更新 API 缓存命中统计"""
+        if self.github_manager:
+            stats = self.github_manager.get_http_cache_stats()
+            text = f"缓存命中 {stats['hits']} | 未命中 {stats['misses']} | {stats['entries']} 条"
+            if self.prefetcher:
+                prefetch_stats = self.prefetcher.get_stats()
+                lookups = prefetch_stats['hits'] + prefetch_stats['misses']
+                if lookups:
+                    text += f" | 预取命中 {prefetch_stats['hits']}/{lookups}"
+            self.cache_label.config(text=text)
     
     def create_repo_panel(self, parent):
         """创建仓库面板"""
@@ -103,14 +166,18 @@ class GitHubRepoManager:
         self.repo_tree.column('updated', width=100)
         
         # 滚动条
-        repo_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.repo_tree.yview)
-        self.repo_tree.configure(yscrollcommand=repo_scrollbar.set)
+        repo_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
         
         self.repo_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         repo_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 绑定选择事件
-        self.repo_tree.bind('<<TreeviewSelect>>', self.on_repo_select)
+        # 虚拟列表：只渲染可见行，选择变化时回调 on_repo_select
+        self.repo_list = VirtualTreeview(self.repo_tree, repo_scrollbar,
+                                         key_func=lambda repo: repo['full_name'],
+                                         render_func=self.render_repo_row,
+                                         on_select=self.on_repo_select)
+        self.repo_list.bind_heading_sort('#0', lambda repo: repo['name'].lower())
+        self.repo_list.bind_heading_sort('updated', lambda repo: repo['updated_at'] or '')
     
     def create_file_panel(self, parent):
         """创建文件面板"""
@@ -163,12 +230,18 @@ class GitHubRepoManager:
         self.file_tree.column('size', width=100)
         self.file_tree.column('modified', width=150)
         
-        file_scrollbar = ttk.Scrollbar(file_list_frame, orient=tk.VERTICAL, command=self.file_tree.yview)
-        self.file_tree.configure(yscrollcommand=file_scrollbar.set)
+        file_scrollbar = ttk.Scrollbar(file_list_frame, orient=tk.VERTICAL)
         
         self.file_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         file_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
+        self.file_list = VirtualTreeview(self.file_tree, file_scrollbar,
+                                         key_func=lambda file: file.path,
+                                         render_func=self.render_file_row,
+                                         on_select=self.on_file_select)
+        self.file_list.bind_heading_sort('#0', lambda file: (file.type != 'dir', file.name.lower()))
+        self.file_list.bind_heading_sort('size', lambda file: file.size or 0)
+        
         # 绑定双击事件
         self.file_tree.bind('<Double-1>', self.on_file_double_click)
         
@@ -193,24 +266,41 @@ class GitHubRepoManager:
     def check_token(self):
         """检查并验证 Token"""
         token = self.config.get_token()
-        if token:
+        if not token:
+            self.set_token()
+            return
+        
+        self.github_manager = self.create_github_manager(token)
+        
+        # 先显示上次保存的仓库列表，验证 Token 和刷新列表都在后台进行
+        cached_repos = self.github_manager.get_cached_repository_summaries()
+        if cached_repos:
+            self.update_repo_tree(cached_repos)
+            self.user_label.config(text="正在验证 Token...")
+        
+        def validate_token():
             try:
-                self.github_manager = GitHubManager(token)
                 user_info = self.github_manager.get_user_info()
-                self.user_label.config(text=f"欢迎，{user_info['name']} ({user_info['login']})")
-                self.refresh_repos()
+                self.root.after(0, lambda: self.user_label.config(text=f"欢迎，{user_info['name']} ({user_info['login']})"))
+                self.root.after(0, self.refresh_repos)
             except Exception as e:
-                messagebox.showerror("错误", f"Token 验证失败: {e}")
-                self.set_token()
-        else:
-            self.set_token()
+                error_msg = str(e)
+                self.root.after(0, lambda: self.on_token_invalid(error_msg))
+        
+        threading.Thread(target=validate_token, daemon=True).start()
+    
+    def on_token_invalid(self, error_msg: str):
+        """启动时 Token 验证失败"""
+        self.user_label.config(text="未登录")
+        messagebox.showerror("错误", f"Token 验证失败: {error_msg}")
+        self.set_token()
     
     def set_token(self):
         """设置 GitHub Token"""
         token = simpledialog.askstring("设置 Token", "请输入您的 GitHub Personal Access Token:", show='*')
         if token:
             try:
-                self.github_manager = GitHubManager(token)
+                self.github_manager = self.create_github_manager(token)
                 user_info = self.github_manager.get_user_info()
                 self.config.set_token(token)
                 self.user_label.config(text=f"欢迎，{user_info['name']} ({user_info['login']})")
@@ -276,7 +366,7 @@ class GitHubRepoManager:
         
         def load_repos():
             try:
-                repos = self.github_manager.list_repositories()
+                repos = self.github_manager.list_repository_summaries()
                 self.root.after(0, lambda: self.update_repo_tree(repos))
             except Exception as e:
                 error_msg = str(e)
@@ -284,31 +374,34 @@ class GitHubRepoManager:
         
         threading.Thread(target=load_repos, daemon=True).start()
     
-    def update_repo_tree(self, repos: List[Repository]):
-        """更新仓库树"""
-        # 清空现有项目
-        for item in self.repo_tree.get_children():
-            self.repo_tree.delete(item)
-        
-        # 添加仓库
-        for repo in repos:
-            self.repo_tree.insert('', tk.END, 
-                                text=repo.name,
-                                values=(
-                                    repo.full_name,
-                                    repo.description[:50] + "..." if repo.description and len(repo.description) > 50 else (repo.description or ""),
-                                    "是" if repo.private else "否",
-                                    repo.updated_at.strftime("%Y-%m-%d")
-                                ),
-                                tags=(repo.name,))
+    def update_repo_tree(self, repos: List[dict]):
+        """更新仓库列表，保留当前选择
+
+        repos 为 GitHubManager.summarize_repository 返回的摘要，按显示顺序排列。
+        """
+        self.repo_list.set_records(repos)
+        self.update_cache_stats()
+    
+    @staticmethod
+    def render_repo_row(repo: dict):
+        """仓库列表的一行：(text, values, tags)"""
+        description = repo['description']
+        values = (
+            repo['full_name'],
+            description[:50] + "..." if len(description) > 50 else description,
+            "是" if repo['private'] else "否",
+            repo['updated_at'][:10]
+        )
+        return repo['name'], values, (repo['name'],)
+    
+    def get_selected_repo_name(self) -> Optional[str]:
+        """仓库列表中选中的仓库名，未选择时返回 None"""
+        repo = self.repo_list.selected_record()
+        return repo['name'] if repo else None
     
-    def on_repo_select(self, event):
+    def on_repo_select(self, repo: dict):
         """仓库选择事件"""
-        selection = self.repo_tree.selection()
-        if selection:
-            item = selection[0]
-            repo_name = self.repo_tree.item(item, 'text')
-            self.load_repository(repo_name)
+        self.load_repository(repo['name'])
     
     def load_repository(self, repo_name: str):
         """加载仓库文件"""
@@ -317,10 +410,11 @@ class GitHubRepoManager:
         
         def load_repo():
             try:
-                self.current_repo = self.github_manager.get_repository(repo_name)
-                self.current_path = ""
-                self.config.add_recent_repo(self.current_repo.full_name)
-                files = self.github_manager.list_files(self.current_repo, self.current_path)
+                with self.prefetcher.user_request():
+                    self.current_repo = self.github_manager.get_repository(repo_name)
+                    self.current_path = ""
+                    self.config.add_recent_repo(self.current_repo.full_name)
+                    files = self.github_manager.list_files(self.current_repo, self.current_path, revalidate=True)
                 self.root.after(0, lambda: self.update_file_tree(files))
                 self.root.after(0, lambda: self.path_label.config(text="/"))
             except Exception as e:
@@ -330,41 +424,41 @@ class GitHubRepoManager:
         threading.Thread(target=load_repo, daemon=True).start()
     
     def update_file_tree(self, files: List[ContentFile]):
-        """更新文件树"""
-        # 清空现有项目
-        for item in self.file_tree.get_children():
-            self.file_tree.delete(item)
-        
-        # 添加文件和文件夹
-        for file in files:
-            if file.type == "dir":
-                icon = "📁"
-                size = "-"
-            else:
-                icon = "📄"
-                size = f"{file.size} bytes" if file.size else "0 bytes"
-            
-            self.file_tree.insert('', tk.END,
-                                text=f"{icon} {file.name}",
-                                values=(
-                                    file.type,
-                                    size,
-                                    "-"  # GitHub API 不提供文件修改时间
-                                ),
-                                tags=(file.path, file.type))
+        """更新文件树，并按新的目录列表安排预取"""
+        self.file_list.set_records(files)
+        if self.prefetcher and self.current_repo:
+            self.prefetcher.schedule(self.current_repo, files, self.file_list.selected_record())
+        self.update_cache_stats()
+    
+    @staticmethod
+    def render_file_row(file: ContentFile):
+        """文件列表的一行：(text, values, tags)"""
+        if file.type == "dir":
+            icon = "📁"
+            size = "-"
+        else:
+            icon = "📄"
+            size = f"{file.size} bytes" if file.size else "0 bytes"
+        values = (
+            file.type,
+            size,
+            "-"  # GitHub API 不提供文件修改时间
+        )
+        return f"{icon} {file.name}", values, (file.path, file.type)
+    
+    def on_file_select(self, file: ContentFile):
+        """文件选择事件：优先预取选中的文件或目录"""
+        if self.prefetcher and self.current_repo:
+            self.prefetcher.schedule(self.current_repo, self.file_list.records, file)
     
     def on_file_double_click(self, event):
         """文件双击事件"""
-        selection = self.file_tree.selection()
-        if selection:
-            item = selection[0]
-            file_path = self.file_tree.item(item, 'tags')[0]
-            file_type = self.file_tree.item(item, 'tags')[1]
-            
-            if file_type == "dir":
-                self.navigate_to_directory(file_path)
+        file = self.file_list.record_at(event.y)
+        if file:
+            if file.type == "dir":
+                self.navigate_to_directory(file.path)
             else:
-                self.load_file_content(file_path)
+                self.load_file_content(file.path, file.sha)
     
     def navigate_to_directory(self, path: str):
         """导航到目录"""
@@ -373,7 +467,10 @@ class GitHubRepoManager:
         
         def load_dir():
             try:
-                files = self.github_manager.list_files(self.current_repo, path)
+                files = self.prefetcher.get_listing(self.current_repo, path)
+                if files is None:
+                    with self.prefetcher.user_request():
+                        files = self.github_manager.list_files(self.current_repo, path)
                 self.current_path = path
                 self.root.after(0, lambda: self.update_file_tree(files))
                 self.root.after(0, lambda: self.path_label.config(text=f"/{path}"))
@@ -396,16 +493,22 @@ class GitHubRepoManager:
         
         self.navigate_to_directory(parent_path)
     
-    def load_file_content(self, file_path: str):
-        """加载文件内容"""
+    def load_file_content(self, file_path: str, sha: Optional[str] = None):
+        """加载文件内容；已知 blob SHA 时优先使用预取的内容"""
         if not self.current_repo:
             return
         
         def load_file():
             try:
-                content, sha = self.github_manager.get_file_content(self.current_repo, file_path)
-                self.file_sha_cache[file_path] = sha
+                content = self.prefetcher.get_content(self.current_repo, sha)
+                if content is None:
+                    with self.prefetcher.user_request():
+                        content, file_sha = self.github_manager.get_file_content(self.current_repo, file_path)
+                else:
+                    file_sha = sha
+                self.file_sha_cache[file_path] = file_sha
                 self.root.after(0, lambda: self.show_file_content(file_path, content))
+                self.root.after(0, self.update_cache_stats)
             except Exception as e:
                 error_msg = str(e)
                 self.root.after(0, lambda: messagebox.showerror("错误", f"加载文件失败: {error_msg}"))
@@ -430,11 +533,11 @@ class GitHubRepoManager:
         
         def save():
             try:
+                # 打开文件时记下的 SHA 直接用于写入，保存后更新为新的 SHA
                 sha = self.file_sha_cache.get(file_path)
-                if sha:
-                    self.github_manager.update_file(self.current_repo, file_path, content, sha, "Update file via GUI")
-                else:
-                    self.github_manager.create_file(self.current_repo, file_path, content, "Create file via GUI")
+                message = "Update file via GUI" if sha else "Create file via GUI"
+                self.file_sha_cache[file_path] = self.github_manager.put_file(
+                    self.current_repo, file_path, content, message, expected_sha=sha)
                 
                 self.root.after(0, lambda: messagebox.showinfo("成功", "文件保存成功"))
                 # 重新加载文件列表
@@ -656,14 +759,13 @@ class GitHubRepoManager:
     
     def delete_file(self):
         """删除选中的文件"""
-        selection = self.file_tree.selection()
-        if not selection:
+        selected = self.file_list.selected_record()
+        if not selected:
             messagebox.showwarning("警告", "请先选择文件")
             return
         
-        item = selection[0]
-        file_path = self.file_tree.item(item, 'tags')[0]
-        file_type = self.file_tree.item(item, 'tags')[1]
+        file_path = selected.path
+        file_type = selected.type
         
         if file_type == "dir":
             messagebox.showwarning("警告", "不能删除目录")
@@ -672,7 +774,7 @@ class GitHubRepoManager:
         if messagebox.askyesno("确认", f"确定要删除文件 {file_path} 吗？"):
             def delete():
                 try:
-                    self.github_manager.delete_file(self.current_repo, file_path, "Delete file via GUI")
+                    self.github_manager.delete_file(self.current_repo, file_path, "Delete file via GUI", sha=selected.sha)
                     self.root.after(0, lambda: messagebox.showinfo("成功", "文件删除成功"))
                     self.root.after(0, lambda: self.refresh_current_directory())
                 except Exception as e:
@@ -713,7 +815,62 @@ class GitHubRepoManager:
         self.show_upload_confirmation(file_paths)
     
     def show_upload_confirmation(self, file_paths):
-        """显示上传确认对话框"""
+        """预检待上传文件，完成后显示上传确认对话框
+
+        预检要获取远程目录树并计算每个本地文件的 blob SHA，在后台线程中进行，
+        完成后回到主线程打开对话框。
+        """
+        import os
+        
+        repo = self.current_repo
+        current_path = self.current_path
+        
+        # 准备文件信息
+        file_infos = []
+        uploads = []
+        for file_path in file_paths:
+            filename = os.path.basename(file_path)
+            target_path = f"{current_path}/{filename}" if current_path else filename
+            try:
+                # 按原始字节上传，这里只需要文件大小
+                file_size = os.path.getsize(file_path)
+                uploads.append({'path': target_path, 'local_path': file_path})
+                status = "待检查"
+            except Exception as e:
+                file_size = 0
+                status = f"读取失败: {str(e)[:20]}"
+            
+            file_infos.append({
+                'path': file_path,
+                'filename': filename,
+                'target_path': target_path,
+                'valid': False,
+                'size': file_size,
+                'status': status
+            })
+        
+        def preflight():
+            # 一次获取目标目录的 tree，按 blob SHA 判断新建/覆盖/相同
+            preflight_status = {}
+            try:
+                for upload in self.github_manager.preflight_uploads(repo, uploads, current_path):
+                    preflight_status[upload['path']] = upload
+            except Exception as e:
+                print(f"上传预检失败，所有文件将直接上传: {e}")
+            self.root.after(0, lambda: on_preflight_done(preflight_status))
+        
+        def on_preflight_done(preflight_status):
+            self.root.config(cursor='')
+            if self.current_repo is not repo or self.current_path != current_path:
+                messagebox.showwarning("警告", "预检期间切换了仓库或目录，已取消上传，请重新选择文件")
+                return
+            self._open_upload_confirmation(file_paths, file_infos, preflight_status)
+        
+        self.root.config(cursor='watch')
+        threading.Thread(target=preflight, daemon=True).start()
+    
+    def _open_upload_confirmation(self, file_paths, file_infos, preflight_status):
+        """显示上传确认对话框（预检结果已就绪）"""
         # 创建上传确认对话框
         dialog = tk.Toplevel(self.root)
         dialog.title(f"上传文件确认 - 共 {len(file_paths)} 个文件")
@@ -750,86 +907,39 @@ class GitHubRepoManager:
         file_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # 准备文件信息
-        file_infos = []
         total_size = 0
         valid_files = 0
-        
-        for file_path in file_paths:
-            try:
-                # 尝试读取文件
-                content = None
-                file_size = 0
-                status = "待上传"
+        status_names = {'new': "新建", 'overwrite': "覆盖现有", 'identical': "相同，跳过"}
+        skipped_files = 0
+        for file_info in file_infos:
+            if file_info['status'] == "待检查":
+                upload = preflight_status.get(file_info['target_path'])
+                if upload:
+                    file_info['status'] = status_names[upload['status']]
+                    file_info['mode'] = upload.get('mode')
+                    file_info['valid'] = upload['status'] != 'identical'
+                else:
+                    file_info['status'] = "待上传"
+                    file_info['valid'] = True
                 
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    file_size = len(content)
-                    
-                    # 检查是否会覆盖现有文件
-                    filename = file_path.split('/')[-1] if '/' in file_path else file_path.split('\\')[-1]
-                    target_path = f"{self.current_path}/{filename}" if self.current_path else filename
-                    
-                    # 检查文件是否已存在
-                    try:
-                        existing_file = self.github_manager.get_file_content(self.current_repo, target_path)
-                        status = "覆盖现有"
-                    except:
-                        status = "新建"
-                    
+                if file_info['valid']:
                     valid_files += 1
-                    total_size += file_size
-                except UnicodeDecodeError:
-                    try:
-                        with open(file_path, 'r', encoding='gbk') as f:
-                            content = f.read()
-                        file_size = len(content)
-                        
-                        # 检查是否会覆盖现有文件
-                        filename = file_path.split('/')[-1] if '/' in file_path else file_path.split('\\')[-1]
-                        target_path = f"{self.current_path}/{filename}" if self.current_path else filename
-                        
-                        try:
-                            existing_file = self.github_manager.get_file_content(self.current_repo, target_path)
-                            status = "覆盖现有(GBK)"
-                        except:
-                            status = "新建(GBK)"
-                        
-                        valid_files += 1
-                        total_size += file_size
-                    except UnicodeDecodeError:
-                        status = "编码错误"
-                except Exception as e:
-                    status = f"读取失败: {str(e)[:20]}"
-                
-                filename = file_path.split('/')[-1] if '/' in file_path else file_path.split('\\')[-1]
-                
-                file_infos.append({
-                    'path': file_path,
-                    'filename': filename,
-                    'content': content,
-                    'size': file_size,
-                    'status': status
-                })
-                
-                # 添加到树中
-                size_str = f"{file_size} 字符" if file_size > 0 else "0"
-                file_tree.insert('', tk.END,
-                               text=file_path,
-                               values=(filename, size_str, status))
-                
-            except Exception as e:
-                filename = file_path.split('/')[-1] if '/' in file_path else file_path.split('\\')[-1]
-                file_tree.insert('', tk.END,
-                               text=file_path,
-                               values=(filename, "0", f"错误: {e}"))
+                    total_size += file_info['size']
+                else:
+                    skipped_files += 1
+            
+            # 添加到树中
+            file_size = file_info['size']
+            size_str = f"{file_size} 字节" if file_size > 0 else "0"
+            file_tree.insert('', tk.END,
+                           text=file_info['path'],
+                           values=(file_info['filename'], size_str, file_info['status']))
         
         # 统计信息
         info_frame = ttk.Frame(dialog)
         info_frame.pack(fill=tk.X, padx=10, pady=5)
         
-        ttk.Label(info_frame, text=f"总计: {len(file_paths)} 个文件 | 有效: {valid_files} 个 | 总大小: {total_size} 字符").pack(side=tk.LEFT)
+        ttk.Label(info_frame, text=f"总计: {len(file_paths)} 个文件 | 需上传: {valid_files} 个 | 相同跳过: {skipped_files} 个 | 总大小: {total_size} 字节").pack(side=tk.LEFT)
         
         # 按钮框架
         button_frame = ttk.Frame(dialog)
@@ -838,13 +948,16 @@ class GitHubRepoManager:
         def start_upload():
             """开始上传"""
             if valid_files == 0:
-                messagebox.showwarning("警告", "没有可上传的有效文件")
+                if skipped_files:
+                    messagebox.showinfo("提示", "所有文件与远程完全相同，无需上传")
+                else:
+                    messagebox.showwarning("警告", "没有可上传的有效文件")
                 return
             
             # 确认上传
             result = messagebox.askyesno(
                 "确认上传", 
-                f"确定要上传 {valid_files} 个文件吗？\n\n总大小: {total_size} 字符\n目标位置: {current_location}\n\n⚠️ 如果文件已存在，将会被覆盖！"
+                f"确定要上传 {valid_files} 个文件吗？\n\n总大小: {total_size} 字节\n目标位置: {current_location}\n\n⚠️ 如果文件已存在，将会被覆盖！"
             )
             
             if result:
@@ -886,67 +999,67 @@ class GitHubRepoManager:
         log_text = scrolledtext.ScrolledText(log_frame, height=8)
         log_text.pack(fill=tk.BOTH, expand=True)
         
-        # 关闭按钮（初始禁用）
-        close_button = ttk.Button(progress_dialog, text="关闭", command=progress_dialog.destroy, state=tk.DISABLED)
-        close_button.pack(pady=10)
+        # 后台线程把进度和日志写入通道，主线程按固定帧率刷新
+        channel = ProgressChannel(log_text, progress_var, current_file_label, stats_label)
+        
+        # 导出日志和关闭按钮（关闭按钮初始禁用）
+        button_frame = ttk.Frame(progress_dialog)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="导出日志", command=lambda: channel.export_with_dialog(progress_dialog)).pack(side=tk.LEFT, padx=5)
+        close_button = ttk.Button(button_frame, text="关闭", command=progress_dialog.destroy, state=tk.DISABLED)
+        close_button.pack(side=tk.LEFT, padx=5)
         
         def upload_files_thread():
             """上传文件的后台线程"""
-            total_files = len([f for f in file_infos if f['content'] is not None])
+            total_files = len([f for f in file_infos if f['valid']])
             uploaded = 0
             failed = 0
             
             def update_progress(current, total, filename, status):
-                progress = (current / total) * 100
-                self.root.after(0, lambda: progress_var.set(progress))
-                self.root.after(0, lambda: current_file_label.config(text=f"当前: {filename}"))
-                self.root.after(0, lambda: stats_label.config(text=f"进度: {current}/{total} | 成功: {uploaded} | 失败: {failed}"))
-                self.root.after(0, lambda: log_text.insert(tk.END, f"{status}\n"))
-                self.root.after(0, lambda: log_text.see(tk.END))
+                channel.update(progress=(current / total) * 100, current=f"当前: {filename}",
+                               stats=f"进度: {current}/{total} | 成功: {uploaded} | 失败: {failed}")
+                channel.log(status)
             
             try:
-                current = 0
+                changes = []
                 for file_info in file_infos:
-                    if file_info['content'] is None:
+                    if not file_info['valid']:
                         continue  # 跳过无效文件
                     
-                    current += 1
-                    filename = file_info['filename']
-                    
-                    # 构建目标路径
-                    if self.current_path:
-                        target_path = f"{self.current_path}/{filename}"
-                    else:
-                        target_path = filename
-                    
-                    update_progress(current, total_files, filename, f"正在上传 {filename}...")
-                    
-                    try:
-                        self.github_manager.create_or_update_file(
-                            self.current_repo, 
-                            target_path, 
-                            file_info['content'], 
-                            f"Upload {filename} via GUI (batch upload)"
-                        )
-                        uploaded += 1
-                        update_progress(current, total_files, filename, f"✅ {filename} 上传成功")
-                    except Exception as e:
-                        failed += 1
-                        error_msg = str(e)
-                        update_progress(current, total_files, filename, f"❌ {filename} 上传失败: {error_msg}")
+                    change = {'path': file_info['target_path'], 'local_path': file_info['path']}
+                    if file_info.get('mode'):
+                        change['mode'] = file_info['mode']
+                    changes.append(change)
+                
+                def on_blob_ready(current, total, path):
+                    update_progress(current, total, path, f"📦 已准备 {path}")
+                
+                # 所有文件合并为一次提交
+                try:
+                    commit_sha = self.github_manager.commit_batch(
+                        self.current_repo,
+                        changes,
+                        f"Upload {len(changes)} files via GUI (batch upload)",
+                        progress_callback=on_blob_ready
+                    )
+                    failed = self._report_unreadable_uploads(changes, update_progress, total_files)
+                    uploaded = len(changes) - failed
+                    update_progress(total_files, total_files, "", f"✅ 已提交 {uploaded} 个文件 (commit {commit_sha[:7]})")
+                except Exception as e:
+                    failed = len(changes)
+                    error_msg = str(e)
+                    update_progress(total_files, total_files, "", f"❌ 上传失败: {error_msg}")
                 
                 # 上传完成
-                self.root.after(0, lambda: current_file_label.config(text="上传完成"))
-                self.root.after(0, lambda: progress_var.set(100))
-                self.root.after(0, lambda: log_text.insert(tk.END, f"\n🎉 批量上传完成！成功: {uploaded}, 失败: {failed}\n"))
-                self.root.after(0, lambda: log_text.see(tk.END))
-                self.root.after(0, lambda: close_button.config(state=tk.NORMAL))
+                channel.update(progress=100, current="上传完成")
+                channel.log(f"\n🎉 批量上传完成！成功: {uploaded}, 失败: {failed}")
+                channel.call(lambda: close_button.config(state=tk.NORMAL))
                 self.root.after(0, lambda: self.refresh_current_directory())
                 
             except Exception as e:
                 error_msg = str(e)
-                self.root.after(0, lambda: log_text.insert(tk.END, f"\n💥 批量上传失败: {error_msg}\n"))
-                self.root.after(0, lambda: close_button.config(state=tk.NORMAL))
+                channel.log(f"\n💥 批量上传失败: {error_msg}")
+                channel.call(lambda: close_button.config(state=tk.NORMAL))
         
         # 启动上传线程
         threading.Thread(target=upload_files_thread, daemon=True).start()
@@ -1021,9 +1134,15 @@ class GitHubRepoManager:
         log_text = scrolledtext.ScrolledText(log_frame, height=8)
         log_text.pack(fill=tk.BOTH, expand=True)
         
-        # 关闭按钮（初始禁用）
-        close_button = ttk.Button(progress_dialog, text="关闭", command=progress_dialog.destroy, state=tk.DISABLED)
-        close_button.pack(pady=10)
+        # 后台线程把进度和日志写入通道，主线程按固定帧率刷新
+        channel = ProgressChannel(log_text, progress_var, current_file_label, stats_label)
+        
+        # 导出日志和关闭按钮（关闭按钮初始禁用）
+        button_frame = ttk.Frame(progress_dialog)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="导出日志", command=lambda: channel.export_with_dialog(progress_dialog)).pack(side=tk.LEFT, padx=5)
+        close_button = ttk.Button(button_frame, text="关闭", command=progress_dialog.destroy, state=tk.DISABLED)
+        close_button.pack(side=tk.LEFT, padx=5)
         
         def upload_directory_thread():
             """上传文件夹的后台线程"""
@@ -1032,30 +1151,15 @@ class GitHubRepoManager:
             total_files = len(file_paths)
             
             def update_progress(current, total, filename, status):
-                progress = (current / total) * 100
-                self.root.after(0, lambda: progress_var.set(progress))
-                self.root.after(0, lambda: current_file_label.config(text=f"当前: {filename}"))
-                self.root.after(0, lambda: stats_label.config(text=f"进度: {current}/{total} | 成功: {uploaded} | 失败: {failed}"))
-                self.root.after(0, lambda: log_text.insert(tk.END, f"{status}\n"))
-                self.root.after(0, lambda: log_text.see(tk.END))
+                channel.update(progress=(current / total) * 100, current=f"当前: {filename}",
+                               stats=f"进度: {current}/{total} | 成功: {uploaded} | 失败: {failed}")
+                channel.log(status)
             
             try:
+                changes = []
                 for i, file_path in enumerate(file_paths, 1):
+                    filename = os.path.basename(file_path)
                     try:
-                        # 读取文件内容
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                        except UnicodeDecodeError:
-                            try:
-                                with open(file_path, 'r', encoding='gbk') as f:
-                                    content = f.read()
-                            except UnicodeDecodeError:
-                                failed += 1
-                                filename = os.path.basename(file_path)
-                                update_progress(i, total_files, filename, f"❌ {filename} 编码错误，跳过")
-                                continue
-                        
                         # 计算相对路径，保持目录结构
                         rel_path = os.path.relpath(file_path, base_path)
                         rel_path = rel_path.replace('\\', '/')  # 转换为 Unix 路径格式
@@ -1066,51 +1170,70 @@ class GitHubRepoManager:
                         else:
                             target_path = f"{folder_name}/{rel_path}"
                         
-                        filename = os.path.basename(file_path)
-                        update_progress(i, total_files, filename, f"正在上传 {rel_path}...")
-                        
-                        # 上传文件
-                        self.github_manager.create_or_update_file(
-                            self.current_repo, 
-                            target_path, 
-                            content, 
-                            f"Upload {rel_path} from folder {folder_name} via GUI"
-                        )
-                        uploaded += 1
-                        update_progress(i, total_files, filename, f"✅ {rel_path} 上传成功")
+                        # 按原始字节上传，文本和二进制文件一视同仁
+                        changes.append({'path': target_path, 'local_path': file_path})
+                        update_progress(i, total_files, filename, f"📦 已准备 {rel_path}")
                         
                     except Exception as e:
                         failed += 1
-                        filename = os.path.basename(file_path)
                         error_msg = str(e)
-                        update_progress(i, total_files, filename, f"❌ {filename} 上传失败: {error_msg}")
+                        update_progress(i, total_files, filename, f"❌ {filename} 读取失败: {error_msg}")
+                
+                # 预检：与远程内容相同的文件不再上传
+                skipped = 0
+                if changes:
+                    remote_dir = f"{self.current_path}/{folder_name}" if self.current_path else folder_name
+                    try:
+                        self.github_manager.preflight_uploads(self.current_repo, changes, remote_dir)
+                        skipped = sum(1 for change in changes if change['status'] == 'identical')
+                        changes = [change for change in changes if change['status'] != 'identical']
+                        update_progress(total_files, total_files, folder_name, f"🔍 预检完成: 需上传 {len(changes)} 个，相同跳过 {skipped} 个")
+                    except Exception as e:
+                        error_msg = str(e)
+                        update_progress(total_files, total_files, folder_name, f"⚠️ 预检失败，将上传全部文件: {error_msg}")
+                
+                # 整个文件夹合并为一次提交
+                if changes:
+                    update_progress(total_files, total_files, folder_name, f"正在提交 {len(changes)} 个文件...")
+                    try:
+                        commit_sha = self.github_manager.commit_batch(
+                            self.current_repo,
+                            changes,
+                            f"Upload folder {folder_name} ({len(changes)} files) via GUI"
+                        )
+                        unreadable = self._report_unreadable_uploads(changes, update_progress, total_files)
+                        failed += unreadable
+                        uploaded = len(changes) - unreadable
+                        update_progress(total_files, total_files, folder_name, f"✅ 已提交 {uploaded} 个文件 (commit {commit_sha[:7]})")
+                    except Exception as e:
+                        failed += len(changes)
+                        error_msg = str(e)
+                        update_progress(total_files, total_files, folder_name, f"❌ 文件夹提交失败: {error_msg}")
                 
                 # 上传完成
-                self.root.after(0, lambda: current_file_label.config(text="上传完成"))
-                self.root.after(0, lambda: progress_var.set(100))
-                self.root.after(0, lambda: log_text.insert(tk.END, f"\n🎉 文件夹上传完成！成功: {uploaded}, 失败: {failed}\n"))
-                self.root.after(0, lambda: log_text.see(tk.END))
-                self.root.after(0, lambda: close_button.config(state=tk.NORMAL))
+                channel.update(progress=100, current="上传完成")
+                channel.log(f"\n🎉 文件夹上传完成！成功: {uploaded}, 跳过: {skipped}, 失败: {failed}")
+                channel.call(lambda: close_button.config(state=tk.NORMAL))
                 self.root.after(0, lambda: self.refresh_current_directory())
                 
             except Exception as e:
                 error_msg = str(e)
-                self.root.after(0, lambda: log_text.insert(tk.END, f"\n💥 文件夹上传失败: {error_msg}\n"))
-                self.root.after(0, lambda: close_button.config(state=tk.NORMAL))
+                channel.log(f"\n💥 文件夹上传失败: {error_msg}")
+                channel.call(lambda: close_button.config(state=tk.NORMAL))
         
         # 启动上传线程
         threading.Thread(target=upload_directory_thread, daemon=True).start()
     
     def download_file(self):
         """下载选中的文件"""
-        selection = self.file_tree.selection()
-        if not selection:
+        selected = self.file_list.selected_record()
+        if not selected:
             messagebox.showwarning("警告", "请先选择文件")
             return
         
-        item = selection[0]
-        file_path = self.file_tree.item(item, 'tags')[0]
-        file_type = self.file_tree.item(item, 'tags')[1]
+        file_path = selected.path
+        file_sha = selected.sha
+        file_type = selected.type
         
         if file_type == "dir":
             messagebox.showwarning("警告", "不能下载目录")
@@ -1122,9 +1245,7 @@ class GitHubRepoManager:
         if save_path:
             def download():
                 try:
-                    content, _ = self.github_manager.get_file_content(self.current_repo, file_path)
-                    with open(save_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
+                    self.github_manager.read_blob_to_file(self.current_repo, save_path, sha=file_sha)
                     self.root.after(0, lambda: messagebox.showinfo("成功", "文件下载成功"))
                 except Exception as e:
                     error_msg = str(e)
@@ -1137,7 +1258,9 @@ class GitHubRepoManager:
         if self.current_repo:
             def refresh():
                 try:
-                    files = self.github_manager.list_files(self.current_repo, self.current_path)
+                    # 分支头移动（例如刚提交了修改）时重新加载目录列表
+                    self.prefetcher.invalidate_listings()
+                    files = self.github_manager.list_files(self.current_repo, self.current_path, revalidate=True)
                     self.root.after(0, lambda: self.update_file_tree(files))
                 except Exception as e:
                     error_msg = str(e)
@@ -1208,14 +1331,11 @@ class GitHubRepoManager:
     
     def delete_repo(self):
         """删除选中的仓库"""
-        selection = self.repo_tree.selection()
-        if not selection:
+        repo_name = self.get_selected_repo_name()
+        if not repo_name:
             messagebox.showwarning("警告", "请先选择仓库")
             return
         
-        item = selection[0]
-        repo_name = self.repo_tree.item(item, 'text')
-        
         if messagebox.askyesno("确认", f"确定要删除仓库 {repo_name} 吗？\n注意：此操作不可恢复！"):
             def delete():
                 try:
@@ -1230,14 +1350,11 @@ class GitHubRepoManager:
     
     def edit_repo(self):
         """编辑选中的仓库"""
-        selection = self.repo_tree.selection()
-        if not selection:
+        repo_name = self.get_selected_repo_name()
+        if not repo_name:
             messagebox.showwarning("警告", "请先选择仓库")
             return
         
-        item = selection[0]
-        repo_name = self.repo_tree.item(item, 'text')
-        
         # 获取当前仓库信息
         try:
             repo = self.github_manager.get_repository(repo_name)
@@ -1289,8 +1406,8 @@ class GitHubRepoManager:
     
     def execute_code(self):
         """执行选中仓库的代码"""
-        selection = self.repo_tree.selection()
-        if not selection:
+        repo_name = self.get_selected_repo_name()
+        if not repo_name:
             messagebox.showwarning("警告", "请先选择一个仓库")
             return
         
@@ -1298,9 +1415,6 @@ class GitHubRepoManager:
             messagebox.showerror("错误", "请先设置 GitHub Token")
             return
         
-        item = selection[0]
-        repo_name = self.repo_tree.item(item, 'text')
-        
         try:
             repo = self.github_manager.get_repository(repo_name)
             self.show_execute_dialog(repo)
@@ -1775,8 +1889,8 @@ Python版本: {platform.python_version()}
     
     def sync_local_code(self):
         """同步本地代码到GitHub仓库"""
-        selection = self.repo_tree.selection()
-        if not selection:
+        repo_name = self.get_selected_repo_name()
+        if not repo_name:
             messagebox.showwarning("警告", "请先选择一个仓库")
             return
         
@@ -1784,9 +1898,6 @@ Python版本: {platform.python_version()}
             messagebox.showerror("错误", "请先设置 GitHub Token")
             return
         
-        item = selection[0]
-        repo_name = self.repo_tree.item(item, 'text')
-        
         try:
             repo = self.github_manager.get_repository(repo_name)
             self.show_sync_dialog(repo)
@@ -1897,6 +2008,8 @@ Python版本: {platform.python_version()}
         ignore_text = scrolledtext.ScrolledText(ignore_frame, height=4, width=70)
         ignore_text.pack(fill=tk.X, padx=5, pady=5)
         ignore_text.insert(tk.END, default_ignore)
+        ttk.Label(ignore_frame, text="规则语法与 .gitignore 相同（支持 !、**、/ 锚定），仓库中的 .gitignore 也会生效",
+                 font=("TkDefaultFont", 8)).pack(anchor=tk.W, padx=5, pady=(0, 5))
         
         # 扫描和预览区域
         scan_frame = ttk.LabelFrame(main_frame, text="文件扫描结果")
@@ -1909,6 +2022,9 @@ Python版本: {platform.python_version()}
         scan_button = ttk.Button(scan_button_frame, text="🔍 扫描文件")
         scan_button.pack(side=tk.LEFT, padx=(0, 10))
         
+        cancel_scan_button = ttk.Button(scan_button_frame, text="⏹ 取消扫描", state=tk.DISABLED)
+        cancel_scan_button.pack(side=tk.LEFT, padx=(0, 10))
+        
         # 文件选择控制按钮
         select_all_button = ttk.Button(scan_button_frame, text="✅ 全选")
         select_all_button.pack(side=tk.RIGHT, padx=(0, 5))
@@ -1922,6 +2038,13 @@ Python版本: {platform.python_version()}
         scan_status = ttk.Label(scan_button_frame, text="点击扫描按钮开始检测文件")
         scan_status.pack(side=tk.LEFT)
         
+        # 按路径过滤扫描结果
+        filter_frame = ttk.Frame(scan_frame)
+        filter_frame.pack(fill=tk.X, padx=10)
+        ttk.Label(filter_frame, text="过滤路径:").pack(side=tk.LEFT)
+        filter_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=filter_var, width=40).pack(side=tk.LEFT, padx=(5, 0))
+        
         # 文件列表 - 添加勾选框和双向比较
         file_tree = ttk.Treeview(scan_frame, columns=('selected', 'sync_direction', 'status', 'size', 'modified'), show='tree headings', height=6)
         file_tree.heading('#0', text='文件路径')
@@ -1939,20 +2062,42 @@ Python版本: {platform.python_version()}
         file_tree.column('modified', width=120)
         
         # 添加滚动条
-        tree_scrollbar = ttk.Scrollbar(scan_frame, orient=tk.VERTICAL, command=file_tree.yview)
-        file_tree.configure(yscrollcommand=tree_scrollbar.set)
+        tree_scrollbar = ttk.Scrollbar(scan_frame, orient=tk.VERTICAL)
         
         file_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(10, 0), pady=5)
         tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y, padx=(0, 10), pady=5)
         
+        def render_result_row(file_data):
+            """扫描结果的一行：勾选状态保存在 file_data['checked'] 中"""
+            display_size = file_data['size']
+            size_str = f"{display_size} bytes" if display_size < 1024 else f"{display_size/1024:.1f} KB"
+            values = ("✅" if file_data['checked'] else "❌", file_data['sync_direction'],
+                      file_data['status'], size_str, file_data['mtime'])
+            return file_data['relative_path'], values, ()
+        
+        # 虚拟列表：扫描结果保存在模型中，控件只显示可见的行
+        result_list = VirtualTreeview(file_tree, tree_scrollbar,
+                                      key_func=lambda file_data: file_data['relative_path'],
+                                      render_func=render_result_row)
+        result_list.bind_heading_sort('#0', lambda file_data: file_data['relative_path'])
+        result_list.bind_heading_sort('status', lambda file_data: file_data['status'])
+        result_list.bind_heading_sort('size', lambda file_data: file_data['size'])
+        
+        def apply_filter(*args):
+            """只显示路径包含过滤文本的文件（不区分大小写）"""
+            text = filter_var.get().strip().lower()
+            result_list.set_filter((lambda file_data: text in file_data['relative_path'].lower()) if text else None)
+            update_selection_count()
+        
+        filter_var.trace('w', apply_filter)
+        
         # 绑定双击事件来切换选择状态
         def toggle_file_selection(event):
             """双击切换文件选择状态"""
-            item = file_tree.selection()[0] if file_tree.selection() else None
-            if item:
-                current_selected = file_tree.set(item, 'selected')
-                new_selected = "❌" if current_selected == "✅" else "✅"
-                file_tree.set(item, 'selected', new_selected)
+            file_data = result_list.record_at(event.y)
+            if file_data:
+                file_data['checked'] = not file_data['checked']
+                result_list.refresh()
                 update_selection_count()
         
         file_tree.bind('<Double-1>', toggle_file_selection)
@@ -1960,19 +2105,33 @@ Python版本: {platform.python_version()}
         # 关闭按钮
         close_frame = ttk.Frame(main_frame)
         close_frame.pack(fill=tk.X, pady=(5, 0))
-        ttk.Button(close_frame, text="❌ 关闭", command=dialog.destroy).pack(side=tk.RIGHT, padx=10)
+        
+        def close_dialog():
+            """关闭对话框，同时停止后台扫描"""
+            if scan_cancel_event:
+                scan_cancel_event.set()
+            dialog.destroy()
+        
+        ttk.Button(close_frame, text="❌ 关闭", command=close_dialog).pack(side=tk.RIGHT, padx=10)
+        dialog.protocol("WM_DELETE_WINDOW", close_dialog)
         
         # 存储扫描结果
         scan_results = []
+        # 与同步方向无关的原始扫描数据，切换方向时只需重新分类，无需重新扫描
+        scanned_files = {}
+        scan_cancel_event = None  # 扫描进行中时为 threading.Event
+        SCAN_PROGRESS_EVERY = 100  # 每处理多少个本地文件汇报一次进度
         
         def update_selection_count():
             """更新选择数量统计"""
             try:
-                total_files = len(file_tree.get_children())
-                selected_files = len([item for item in file_tree.get_children() 
-                                    if file_tree.set(item, 'selected') == "✅"])
+                total_files = len(scan_results)
+                selected_files = sum(1 for file_data in scan_results if file_data['checked'])
                 
-                scan_status.config(text=f"✅ 扫描完成：共 {total_files} 个文件，已选择 {selected_files} 个")
+                summary = f"✅ 扫描完成：共 {total_files} 个文件，已选择 {selected_files} 个"
+                if len(result_list) != total_files:
+                    summary += f"，显示 {len(result_list)} 个"
+                scan_status.config(text=summary)
                 
                 if selected_files > 0:
                     sync_status_label.config(text=f"已选择 {selected_files} 个文件进行同步", foreground="blue")
@@ -1982,25 +2141,25 @@ Python版本: {platform.python_version()}
                 pass
         
         def select_all_files():
-            """全选文件"""
-            for item in file_tree.get_children():
-                file_tree.set(item, 'selected', "✅")
+            """全选文件（只作用于当前过滤后显示的文件）"""
+            for file_data in result_list.view:
+                file_data['checked'] = True
+            result_list.refresh()
             update_selection_count()
         
         def select_none_files():
             """取消全选"""
-            for item in file_tree.get_children():
-                file_tree.set(item, 'selected', "❌")
+            for file_data in result_list.view:
+                file_data['checked'] = False
+            result_list.refresh()
             update_selection_count()
         
         def select_modified_files():
             """只选择已修改的文件"""
-            for item in file_tree.get_children():
-                status = file_tree.set(item, 'status')
-                if status.startswith("🔄") or status.startswith("➕"):
-                    file_tree.set(item, 'selected', "✅")
-                else:
-                    file_tree.set(item, 'selected', "❌")
+            for file_data in result_list.view:
+                status = file_data['status']
+                file_data['checked'] = status.startswith("🔄") or status.startswith("➕")
+            result_list.refresh()
             update_selection_count()
         
         # 绑定按钮事件
@@ -2008,203 +2167,251 @@ Python版本: {platform.python_version()}
         select_none_button.config(command=select_none_files)
         select_modified_button.config(command=select_modified_files)
         
-        def should_ignore_file(file_path, ignore_patterns):
-            """检查文件是否应该被忽略"""
-            import fnmatch
-            
-            patterns = [p.strip() for p in ignore_patterns.split('\n') if p.strip()]
-            filename = os.path.basename(file_path)
-            
-            for pattern in patterns:
-                if fnmatch.fnmatch(filename, pattern) or fnmatch.fnmatch(file_path, pattern):
-                    return True
-                # 检查目录匹配
-                if pattern.endswith('/') and pattern[:-1] in file_path:
-                    return True
-            return False
+        def post_to_ui(callback, cancel_event):
+            """从扫描线程把回调交给 Tk 主线程；对话框已关闭时停止扫描"""
+            try:
+                dialog.after(0, callback)
+            except (tk.TclError, RuntimeError):
+                cancel_event.set()
         
-        def scan_files():
-            """扫描并比较本地和远程文件"""
-            nonlocal scan_results
+        def scan_worker(cancel_event, ignore_patterns):
+            """后台线程：获取远程列表、扫描并哈希本地文件，不触碰任何控件"""
+            def report(message):
+                post_to_ui(lambda: scan_status.config(text=message), cancel_event)
             
             try:
-                scan_status.config(text="🔍 正在扫描和比较文件...")
-                scan_button.config(state=tk.DISABLED)
-                
-                # 清空之前的结果
-                for item in file_tree.get_children():
-                    file_tree.delete(item)
-                scan_results = []
-                
-                ignore_patterns = ignore_text.get(1.0, tk.END).strip()
-                sync_direction = sync_direction_var.get()
-                
-                # 获取远程文件列表
-                remote_files = {}
+                # 获取远程文件列表（一次递归 tree 请求）
                 remote_file_details = {}
                 try:
-                    scan_status.config(text="🔍 获取远程文件列表...")
-                    def get_all_files(repo, path=""):
-                        """递归获取所有远程文件"""
-                        contents = repo.get_contents(path)
-                        if not isinstance(contents, list):
-                            contents = [contents]
-                        
-                        for content in contents:
-                            if content.type == "dir":
-                                get_all_files(repo, content.path)
-                            else:
-                                remote_files[content.path] = content.sha
-                                remote_file_details[content.path] = {
-                                    'size': content.size,
-                                    'sha': content.sha
-                                }
-                    
-                    get_all_files(repo)
+                    report("🔍 获取远程文件列表...")
+                    remote_file_details = self.github_manager.list_remote_tree(repo)
                 except Exception as e:
                     print(f"获取远程文件列表失败: {e}")
                 
-                scan_status.config(text="🔍 扫描本地文件...")
+                if cancel_event.is_set():
+                    post_to_ui(on_scan_cancelled, cancel_event)
+                    return
+                
+                report(f"🔍 扫描本地文件... (远程 {len(remote_file_details)} 个)")
                 
                 # 存储所有文件信息（本地+远程）
                 all_files = {}
                 
-                # 扫描本地文件
+                # 扫描本地文件：忽略规则（对话框中的规则加上仓库自己的 .gitignore）
+                # 只编译一次，被忽略的目录不会进入
+                ignore_matcher = IgnoreMatcher(ignore_patterns.split('\n'))
+                local_candidates = []
+                last_reported = 0
                 if os.path.exists(local_repo_path):
-                    for root, dirs, files in os.walk(local_repo_path):
+                    for root, rel_dir, files in ignore_matcher.walk(local_repo_path):
+                        if cancel_event.is_set():
+                            post_to_ui(on_scan_cancelled, cancel_event)
+                            return
+                        
                         for file in files:
                             local_file_path = os.path.join(root, file)
-                            relative_path = os.path.relpath(local_file_path, local_repo_path)
-                            relative_path = relative_path.replace('\\', '/')
+                            relative_path = f"{rel_dir}/{file}" if rel_dir else file
                             
-                            # 检查是否应该忽略
-                            if should_ignore_file(relative_path, ignore_patterns):
+                            # 跳过本工具自己的缓存文件
+                            if relative_path in ('.repo_cache.json', INDEX_FILENAME):
                                 continue
                             
                             try:
-                                file_stat = os.stat(local_file_path)
-                                file_size = file_stat.st_size
-                                file_mtime = datetime.fromtimestamp(file_stat.st_mtime).strftime("%Y-%m-%d %H:%M")
-                                
-                                # 计算本地文件SHA
-                                try:
-                                    with open(local_file_path, 'rb') as f:
-                                        content = f.read()
-                                    local_sha = hashlib.sha1(f"blob {len(content)}\0".encode() + content).hexdigest()
-                                except Exception:
-                                    local_sha = None
-                                
-                                all_files[relative_path] = {
-                                    'local_path': local_file_path,
-                                    'local_size': file_size,
-                                    'local_mtime': file_mtime,
-                                    'local_sha': local_sha,
-                                    'remote_sha': remote_files.get(relative_path),
-                                    'remote_size': remote_file_details.get(relative_path, {}).get('size', 0),
-                                    'exists_local': True,
-                                    'exists_remote': relative_path in remote_files
-                                }
+                                local_candidates.append((relative_path, local_file_path, os.stat(local_file_path)))
                             except Exception as e:
                                 print(f"处理本地文件 {relative_path} 时出错: {e}")
+                        
+                        if len(local_candidates) - last_reported >= SCAN_PROGRESS_EVERY:
+                            last_reported = len(local_candidates)
+                            report(f"🔍 已发现本地文件 {last_reported} 个...")
+                
+                # 并行计算 SHA，stat 信息未变的文件直接使用索引中的 SHA
+                hash_index = FileHashIndex(local_repo_path)
+                
+                def on_hash_progress(done, total):
+                    if done % SCAN_PROGRESS_EVERY == 0 or done == total:
+                        report(f"🔍 计算文件哈希 {done}/{total} (缓存命中 {hash_index.hits})...")
+                
+                local_shas = hash_index.hash_files(local_candidates,
+                                                   workers=self.github_manager.hash_workers,
+                                                   cancel_event=cancel_event,
+                                                   progress_callback=on_hash_progress)
+                hash_index.prune(local_shas)
+                hash_index.save()
+                
+                if cancel_event.is_set():
+                    post_to_ui(on_scan_cancelled, cancel_event)
+                    return
+                
+                for relative_path, local_file_path, file_stat in local_candidates:
+                    remote_entry = remote_file_details.get(relative_path, {})
+                    all_files[relative_path] = {
+                        'local_path': local_file_path,
+                        'local_size': file_stat.st_size,
+                        'local_mtime': datetime.fromtimestamp(file_stat.st_mtime).strftime("%Y-%m-%d %H:%M"),
+                        'local_sha': local_shas.get(relative_path),
+                        'remote_sha': remote_entry.get('sha'),
+                        'remote_size': remote_entry.get('size', 0),
+                        'remote_mode': remote_entry.get('mode'),
+                        'exists_local': True,
+                        'exists_remote': bool(remote_entry)
+                    }
                 
                 # 添加只存在于远程的文件
-                for remote_path in remote_files:
-                    if remote_path not in all_files and not should_ignore_file(remote_path, ignore_patterns):
+                for remote_path, remote_entry in remote_file_details.items():
+                    if remote_path not in all_files and not ignore_matcher.is_ignored(remote_path):
                         all_files[remote_path] = {
                             'local_path': os.path.join(local_repo_path, remote_path),
                             'local_size': 0,
                             'local_mtime': '',
                             'local_sha': None,
-                            'remote_sha': remote_files[remote_path],
-                            'remote_size': remote_file_details.get(remote_path, {}).get('size', 0),
+                            'remote_sha': remote_entry['sha'],
+                            'remote_size': remote_entry.get('size', 0),
+                            'remote_mode': remote_entry.get('mode'),
                             'exists_local': False,
                             'exists_remote': True
                         }
                 
-                scan_status.config(text="🔍 分析文件差异...")
+                post_to_ui(lambda: on_scan_finished(all_files, cancel_event), cancel_event)
                 
-                # 分析每个文件的状态和建议的同步方向
-                for relative_path, file_info in all_files.items():
-                    exists_local = file_info['exists_local']
-                    exists_remote = file_info['exists_remote']
-                    local_sha = file_info['local_sha']
-                    remote_sha = file_info['remote_sha']
-                    
-                    # 确定文件状态和同步方向
-                    if exists_local and exists_remote:
-                        if local_sha == remote_sha:
-                            status = "✅ 相同"
-                            suggested_direction = "="
-                        else:
-                            status = "🔄 已修改"
-                            if sync_direction == "local_to_remote":
-                                suggested_direction = "↑"
-                            elif sync_direction == "remote_to_local":
-                                suggested_direction = "↓"
-                            else:  # bidirectional
-                                suggested_direction = "↕"
-                    elif exists_local and not exists_remote:
-                        status = "➕ 仅本地"
-                        suggested_direction = "↑" if sync_direction != "remote_to_local" else "×"
-                    elif not exists_local and exists_remote:
-                        status = "📥 仅远程"
-                        suggested_direction = "↓" if sync_direction != "local_to_remote" else "×"
-                    else:
-                        continue  # 不应该发生
-                    
-                    # 确定显示的文件大小和修改时间
-                    if exists_local:
-                        display_size = file_info['local_size']
-                        display_mtime = file_info['local_mtime']
-                    else:
-                        display_size = file_info['remote_size']
-                        display_mtime = "远程文件"
-                    
-                    # 添加到结果
-                    file_data = {
-                        'relative_path': relative_path,
-                        'local_path': file_info['local_path'],
-                        'status': status,
-                        'sync_direction': suggested_direction,
-                        'size': display_size,
-                        'mtime': display_mtime,
-                        'exists_local': exists_local,
-                        'exists_remote': exists_remote,
-                        'local_sha': local_sha,
-                        'remote_sha': remote_sha
-                    }
+            except Exception as e:
+                error_msg = str(e)
+                post_to_ui(lambda: on_scan_failed(error_msg), cancel_event)
+        
+        def classify_file(relative_path, file_info, sync_direction):
+            """根据本地/远程状态和同步方向确定文件状态与建议方向"""
+            exists_local = file_info['exists_local']
+            exists_remote = file_info['exists_remote']
+            local_sha = file_info['local_sha']
+            remote_sha = file_info['remote_sha']
+            
+            # 确定文件状态和同步方向
+            if exists_local and exists_remote:
+                if local_sha == remote_sha:
+                    status = "✅ 相同"
+                    suggested_direction = "="
+                else:
+                    status = "🔄 已修改"
+                    if sync_direction == "local_to_remote":
+                        suggested_direction = "↑"
+                    elif sync_direction == "remote_to_local":
+                        suggested_direction = "↓"
+                    else:  # bidirectional
+                        suggested_direction = "↕"
+            elif exists_local and not exists_remote:
+                status = "➕ 仅本地"
+                suggested_direction = "↑" if sync_direction != "remote_to_local" else "×"
+            elif not exists_local and exists_remote:
+                status = "📥 仅远程"
+                suggested_direction = "↓" if sync_direction != "local_to_remote" else "×"
+            else:
+                return None  # 不应该发生
+            
+            # 确定显示的文件大小和修改时间
+            if exists_local:
+                display_size = file_info['local_size']
+                display_mtime = file_info['local_mtime']
+            else:
+                display_size = file_info['remote_size']
+                display_mtime = "远程文件"
+            
+            return {
+                'relative_path': relative_path,
+                'local_path': file_info['local_path'],
+                'status': status,
+                # 默认选择状态：相同的文件不选择，其他的选择
+                'checked': not status.startswith("✅"),
+                'sync_direction': suggested_direction,
+                'size': display_size,
+                'mtime': display_mtime,
+                'exists_local': exists_local,
+                'exists_remote': exists_remote,
+                'local_sha': local_sha,
+                'remote_sha': remote_sha,
+                'remote_mode': file_info.get('remote_mode')
+            }
+        
+        def rebuild_results():
+            """按当前同步方向对缓存的扫描数据重新分类，并分批并入结果列表"""
+            nonlocal scan_results
+            result_list.clear()
+            
+            sync_direction = sync_direction_var.get()
+            scan_results = []
+            for relative_path, file_info in scanned_files.items():
+                file_data = classify_file(relative_path, file_info, sync_direction)
+                if file_data:
                     scan_results.append(file_data)
-                    
-                    # 添加到树视图
-                    size_str = f"{display_size} bytes" if display_size < 1024 else f"{display_size/1024:.1f} KB"
-                    
-                    # 默认选择状态：相同的文件不选择，其他的选择
-                    default_selected = "❌" if status.startswith("✅") else "✅"
-                    
-                    item = file_tree.insert('', tk.END,
-                                           text=relative_path,
-                                           values=(default_selected, suggested_direction, status, size_str, display_mtime))
-                
-                # 更新统计信息
+            
+            def on_progress(done, total):
+                scan_status.config(text=f"📋 正在显示结果 {done}/{total}...")
+            
+            def on_done():
+                # 更新统计信息，始终启用同步按钮
                 update_selection_count()
-                
-                # 始终启用同步按钮
                 sync_button.config(state=tk.NORMAL)
-                scan_button.config(state=tk.NORMAL)
-                
-                # 扫描完成
-                files_to_sync = [f for f in scan_results if not f['status'].startswith("✅")]
-                
-            except Exception as e:
-                scan_status.config(text="❌ 扫描失败")
-                scan_button.config(state=tk.NORMAL)
-                messagebox.showerror("错误", f"扫描文件失败: {e}")
+            
+            result_list.extend_in_batches(scan_results, on_progress=on_progress, on_done=on_done)
         
-        # 当同步方向改变时重新扫描
+        def finish_scan():
+            """恢复扫描相关按钮状态"""
+            nonlocal scan_cancel_event
+            scan_cancel_event = None
+            scan_button.config(state=tk.NORMAL)
+            cancel_scan_button.config(state=tk.DISABLED)
+        
+        def on_scan_finished(all_files, cancel_event):
+            """扫描线程完成（主线程）"""
+            nonlocal scanned_files
+            if cancel_event.is_set():
+                on_scan_cancelled()
+                return
+            finish_scan()
+            scanned_files = all_files
+            scan_status.config(text="🔍 分析文件差异...")
+            rebuild_results()
+        
+        def on_scan_cancelled():
+            """扫描已取消（主线程）"""
+            finish_scan()
+            scan_status.config(text="⏹ 扫描已取消")
+        
+        def on_scan_failed(error_msg):
+            """扫描失败（主线程）"""
+            finish_scan()
+            scan_status.config(text="❌ 扫描失败")
+            messagebox.showerror("错误", f"扫描文件失败: {error_msg}")
+        
+        def scan_files():
+            """在后台线程中扫描并比较本地和远程文件"""
+            nonlocal scan_results, scanned_files, scan_cancel_event
+            if scan_cancel_event is not None:
+                return  # 已有扫描在进行
+            
+            scan_status.config(text="🔍 正在扫描和比较文件...")
+            scan_button.config(state=tk.DISABLED)
+            cancel_scan_button.config(state=tk.NORMAL)
+            
+            # 清空之前的结果
+            result_list.clear()
+            scan_results = []
+            scanned_files = {}
+            
+            ignore_patterns = ignore_text.get(1.0, tk.END).strip()
+            scan_cancel_event = threading.Event()
+            threading.Thread(target=scan_worker, args=(scan_cancel_event, ignore_patterns), daemon=True).start()
+        
+        def cancel_scan():
+            """取消正在进行的扫描"""
+            if scan_cancel_event is not None:
+                scan_cancel_event.set()
+                scan_status.config(text="⏹ 正在取消扫描...")
+        
+        # 当同步方向改变时，只对已缓存的扫描结果重新分类
         def on_direction_change():
             """同步方向改变时的处理"""
-            if scan_results:  # 如果已经扫描过，重新分析
-                scan_files()
+            if scanned_files and scan_cancel_event is None:
+                rebuild_results()
         
         sync_direction_var.trace('w', lambda *args: on_direction_change())
         
@@ -2215,15 +2422,7 @@ Python版本: {platform.python_version()}
                 return
             
             # 获取选中的文件
-            selected_files = []
-            for item in file_tree.get_children():
-                if file_tree.set(item, 'selected') == "✅":
-                    file_path = file_tree.item(item, 'text')
-                    # 从扫描结果中找到对应的文件信息
-                    for file_data in scan_results:
-                        if file_data['relative_path'] == file_path:
-                            selected_files.append(file_data)
-                            break
+            selected_files = [file_data for file_data in scan_results if file_data['checked']]
             
             if not selected_files:
                 messagebox.showwarning("警告", "请选择要同步的文件")
@@ -2272,6 +2471,7 @@ Python版本: {platform.python_version()}
         
         # 绑定事件
         scan_button.config(command=scan_files)
+        cancel_scan_button.config(command=cancel_scan)
         sync_button.config(command=start_sync)
         
         # 自动扫描文件
@@ -2432,9 +2632,15 @@ Python版本: {platform.python_version()}
         log_text = scrolledtext.ScrolledText(log_frame, height=10)
         log_text.pack(fill=tk.BOTH, expand=True)
         
-        # 关闭按钮（初始禁用）
-        close_button = ttk.Button(progress_dialog, text="关闭", command=progress_dialog.destroy, state=tk.DISABLED)
-        close_button.pack(pady=10)
+        # 后台线程把进度和日志写入通道，主线程按固定帧率刷新
+        channel = ProgressChannel(log_text, progress_var, current_file_label, stats_label)
+        
+        # 导出日志和关闭按钮（关闭按钮初始禁用）
+        button_frame = ttk.Frame(progress_dialog)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="导出日志", command=lambda: channel.export_with_dialog(progress_dialog)).pack(side=tk.LEFT, padx=5)
+        close_button = ttk.Button(button_frame, text="关闭", command=progress_dialog.destroy, state=tk.DISABLED)
+        close_button.pack(side=tk.LEFT, padx=5)
         
         def sync_files_thread():
             """同步文件的后台线程"""
@@ -2443,56 +2649,38 @@ Python版本: {platform.python_version()}
             total_files = len(files_to_sync)
             
             def update_progress(current, total, filename, status):
-                progress = (current / total) * 100
-                self.root.after(0, lambda: progress_var.set(progress))
-                self.root.after(0, lambda: current_file_label.config(text=f"当前: {filename}"))
-                self.root.after(0, lambda: stats_label.config(text=f"进度: {current}/{total} | 成功: {uploaded} | 失败: {failed}"))
-                self.root.after(0, lambda: log_text.insert(tk.END, f"{status}\n"))
-                self.root.after(0, lambda: log_text.see(tk.END))
+                channel.update(progress=(current / total) * 100, current=f"当前: {filename}",
+                               stats=f"进度: {current}/{total} | 成功: {uploaded} | 失败: {failed}")
+                channel.log(status)
             
             try:
+                changes = []
                 for i, file_info in enumerate(files_to_sync, 1):
-                    try:
-                        relative_path = file_info['relative_path']
-                        local_file_path = file_info['local_path']
-                        
-                        update_progress(i, total_files, relative_path, f"正在同步 {relative_path}...")
-                        
-                        # 读取文件内容
-                        try:
-                            with open(local_file_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                        except UnicodeDecodeError:
-                            try:
-                                with open(local_file_path, 'r', encoding='gbk') as f:
-                                    content = f.read()
-                            except UnicodeDecodeError:
-                                # 尝试二进制模式读取并转换为base64
-                                with open(local_file_path, 'rb') as f:
-                                    content = base64.b64encode(f.read()).decode('utf-8')
-                                    update_progress(i, total_files, relative_path, f"⚠️ {relative_path} 使用二进制模式上传")
-                        
-                        # 上传文件
-                        self.github_manager.create_or_update_file(
-                            repo, 
-                            relative_path, 
-                            content, 
-                            f"Sync {relative_path} from local via GUI"
-                        )
-                        uploaded += 1
-                        update_progress(i, total_files, relative_path, f"✅ {relative_path} 同步成功")
-                        
-                    except Exception as e:
-                        failed += 1
-                        error_msg = str(e)
-                        update_progress(i, total_files, relative_path, f"❌ {relative_path} 同步失败: {error_msg}")
+                    relative_path = file_info['relative_path']
+                    # 按原始字节上传，不做编码猜测；覆盖远程文件时沿用其文件模式
+                    changes.append(self._upload_change(relative_path, file_info['local_path'],
+                                                       file_info.get('remote_mode')))
+                    update_progress(i, total_files, relative_path, f"📦 {relative_path} 已加入上传批次")
+                
+                # 所有文件合并为一次提交
+                try:
+                    commit_sha = self.github_manager.commit_batch(
+                        repo,
+                        changes,
+                        f"Sync {len(changes)} files from local via GUI"
+                    )
+                    failed = self._report_unreadable_uploads(changes, update_progress, total_files)
+                    uploaded = len(changes) - failed
+                    update_progress(total_files, total_files, repo.name, f"✅ 已提交 {uploaded} 个文件 (commit {commit_sha[:7]})")
+                except Exception as e:
+                    failed = len(changes)
+                    error_msg = str(e)
+                    update_progress(total_files, total_files, repo.name, f"❌ 同步提交失败: {error_msg}")
                 
                 # 同步完成
-                self.root.after(0, lambda: current_file_label.config(text="同步完成"))
-                self.root.after(0, lambda: progress_var.set(100))
-                self.root.after(0, lambda: log_text.insert(tk.END, f"\n🎉 代码同步完成！成功: {uploaded}, 失败: {failed}\n"))
-                self.root.after(0, lambda: log_text.see(tk.END))
-                self.root.after(0, lambda: close_button.config(state=tk.NORMAL))
+                channel.update(progress=100, current="同步完成")
+                channel.log(f"\n🎉 代码同步完成！成功: {uploaded}, 失败: {failed}")
+                channel.call(lambda: close_button.config(state=tk.NORMAL))
                 
                 # 刷新当前目录显示
                 if self.current_repo and self.current_repo.name == repo.name:
@@ -2500,8 +2688,8 @@ Python版本: {platform.python_version()}
                 
             except Exception as e:
                 error_msg = str(e)
-                self.root.after(0, lambda: log_text.insert(tk.END, f"\n💥 同步失败: {error_msg}\n"))
-                self.root.after(0, lambda: close_button.config(state=tk.NORMAL))
+                channel.log(f"\n💥 同步失败: {error_msg}")
+                channel.call(lambda: close_button.config(state=tk.NORMAL))
         
         # 启动同步线程
         threading.Thread(target=sync_files_thread, daemon=True).start()
@@ -2545,9 +2733,15 @@ Python版本: {platform.python_version()}
         log_text = scrolledtext.ScrolledText(log_frame, height=12)
         log_text.pack(fill=tk.BOTH, expand=True)
         
-        # 关闭按钮（初始禁用）
-        close_button = ttk.Button(progress_dialog, text="关闭", command=progress_dialog.destroy, state=tk.DISABLED)
-        close_button.pack(pady=10)
+        # 后台线程把进度和日志写入通道，主线程按固定帧率刷新
+        channel = ProgressChannel(log_text, progress_var, current_file_label, stats_label)
+        
+        # 导出日志和关闭按钮（关闭按钮初始禁用）
+        button_frame = ttk.Frame(progress_dialog)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="导出日志", command=lambda: channel.export_with_dialog(progress_dialog)).pack(side=tk.LEFT, padx=5)
+        close_button = ttk.Button(button_frame, text="关闭", command=progress_dialog.destroy, state=tk.DISABLED)
+        close_button.pack(side=tk.LEFT, padx=5)
         
         def enhanced_sync_thread():
             """增强的同步线程"""
@@ -2557,14 +2751,12 @@ Python版本: {platform.python_version()}
             downloaded = 0
             failed = 0
             total_files = len(files_to_sync)
+            pending_uploads = []  # 待上传的文件，最后合并为一次提交
             
             def update_progress(current, total, filename, status):
-                progress = (current / total) * 100
-                self.root.after(0, lambda: progress_var.set(progress))
-                self.root.after(0, lambda: current_file_label.config(text=f"当前: {filename}"))
-                self.root.after(0, lambda: stats_label.config(text=f"进度: {current}/{total} | 上传: {uploaded} | 下载: {downloaded} | 失败: {failed}"))
-                self.root.after(0, lambda: log_text.insert(tk.END, f"{status}\n"))
-                self.root.after(0, lambda: log_text.see(tk.END))
+                channel.update(progress=(current / total) * 100, current=f"当前: {filename}",
+                               stats=f"进度: {current}/{total} | 上传: {uploaded} | 下载: {downloaded} | 失败: {failed}")
+                channel.log(status)
             
             try:
                 for i, file_info in enumerate(files_to_sync, 1):
@@ -2580,15 +2772,14 @@ Python版本: {platform.python_version()}
                         if sync_direction == "local_to_remote":
                             # 本地到远程：上传文件
                             if exists_local:
-                                self._upload_file_to_remote(repo, relative_path, local_file_path, update_progress, i, total_files)
-                                uploaded += 1
+                                pending_uploads.append(self._upload_file_to_remote(repo, relative_path, local_file_path, update_progress, i, total_files, file_info.get('remote_mode')))
                             else:
                                 update_progress(i, total_files, relative_path, f"⚠️ {relative_path} 本地文件不存在，跳过")
                         
                         elif sync_direction == "remote_to_local":
                             # 远程到本地：下载文件
                             if exists_remote:
-                                self._download_file_from_remote(repo, relative_path, local_file_path, update_progress, i, total_files)
+                                self._download_file_from_remote(repo, relative_path, local_file_path, update_progress, i, total_files, file_info.get('remote_sha'))
                                 downloaded += 1
                             else:
                                 update_progress(i, total_files, relative_path, f"⚠️ {relative_path} 远程文件不存在，跳过")
@@ -2599,17 +2790,15 @@ Python版本: {platform.python_version()}
                                 # 都存在，比较修改时间或让用户选择
                                 if file_info['status'].startswith("🔄"):
                                     # 默认上传本地版本（可以后续增加更智能的判断）
-                                    self._upload_file_to_remote(repo, relative_path, local_file_path, update_progress, i, total_files)
-                                    uploaded += 1
+                                    pending_uploads.append(self._upload_file_to_remote(repo, relative_path, local_file_path, update_progress, i, total_files, file_info.get('remote_mode')))
                                 else:
                                     update_progress(i, total_files, relative_path, f"✅ {relative_path} 文件相同，无需同步")
                             elif exists_local and not exists_remote:
                                 # 只有本地，上传
-                                self._upload_file_to_remote(repo, relative_path, local_file_path, update_progress, i, total_files)
-                                uploaded += 1
+                                pending_uploads.append(self._upload_file_to_remote(repo, relative_path, local_file_path, update_progress, i, total_files, file_info.get('remote_mode')))
                             elif not exists_local and exists_remote:
                                 # 只有远程，下载
-                                self._download_file_from_remote(repo, relative_path, local_file_path, update_progress, i, total_files)
+                                self._download_file_from_remote(repo, relative_path, local_file_path, update_progress, i, total_files, file_info.get('remote_sha'))
                                 downloaded += 1
                         
                     except Exception as e:
@@ -2617,12 +2806,28 @@ Python版本: {platform.python_version()}
                         error_msg = str(e)
                         update_progress(i, total_files, relative_path, f"❌ {relative_path} 同步失败: {error_msg}")
                 
+                # 所有上传合并为一次提交
+                if pending_uploads:
+                    update_progress(total_files, total_files, repo.name, f"正在提交 {len(pending_uploads)} 个文件...")
+                    try:
+                        commit_sha = self.github_manager.commit_batch(
+                            repo,
+                            pending_uploads,
+                            f"Sync {len(pending_uploads)} files from local via enhanced sync"
+                        )
+                        unreadable = self._report_unreadable_uploads(pending_uploads, update_progress, total_files)
+                        failed += unreadable
+                        uploaded = len(pending_uploads) - unreadable
+                        update_progress(total_files, total_files, repo.name, f"📤 已提交 {uploaded} 个文件 (commit {commit_sha[:7]})")
+                    except Exception as e:
+                        failed += len(pending_uploads)
+                        error_msg = str(e)
+                        update_progress(total_files, total_files, repo.name, f"❌ 上传提交失败: {error_msg}")
+                
                 # 同步完成
-                self.root.after(0, lambda: current_file_label.config(text="同步完成"))
-                self.root.after(0, lambda: progress_var.set(100))
-                self.root.after(0, lambda: log_text.insert(tk.END, f"\n🎉 同步完成！上传: {uploaded}, 下载: {downloaded}, 失败: {failed}\n"))
-                self.root.after(0, lambda: log_text.see(tk.END))
-                self.root.after(0, lambda: close_button.config(state=tk.NORMAL))
+                channel.update(progress=100, current="同步完成")
+                channel.log(f"\n🎉 同步完成！上传: {uploaded}, 下载: {downloaded}, 失败: {failed}")
+                channel.call(lambda: close_button.config(state=tk.NORMAL))
                 
                 # 刷新当前目录显示
                 if self.current_repo and self.current_repo.name == repo.name:
@@ -2630,50 +2835,41 @@ Python版本: {platform.python_version()}
                 
             except Exception as e:
                 error_msg = str(e)
-                self.root.after(0, lambda: log_text.insert(tk.END, f"\n💥 同步失败: {error_msg}\n"))
-                self.root.after(0, lambda: close_button.config(state=tk.NORMAL))
+                channel.log(f"\n💥 同步失败: {error_msg}")
+                channel.call(lambda: close_button.config(state=tk.NORMAL))
         
         # 启动同步线程
         threading.Thread(target=enhanced_sync_thread, daemon=True).start()
     
-    def _upload_file_to_remote(self, repo, relative_path, local_file_path, update_progress, current, total):
-        """上传文件到远程"""
-        try:
-            with open(local_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            try:
-                with open(local_file_path, 'r', encoding='gbk') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                with open(local_file_path, 'rb') as f:
-                    content = base64.b64encode(f.read()).decode('utf-8')
-                    update_progress(current, total, relative_path, f"⚠️ {relative_path} 使用二进制模式上传")
-        
-        self.github_manager.create_or_update_file(
-            repo, 
-            relative_path, 
-            content, 
-            f"Upload {relative_path} via enhanced sync"
-        )
-        update_progress(current, total, relative_path, f"📤 {relative_path} 上传成功")
+    def _upload_file_to_remote(self, repo, relative_path, local_file_path, update_progress, current, total,
+                               remote_mode=None):
+        """返回供 commit_batch 使用的上传条目（按原始字节上传，不做编码猜测）"""
+        update_progress(current, total, relative_path, f"📦 {relative_path} 已加入上传批次")
+        return self._upload_change(relative_path, local_file_path, remote_mode)
+    
+    @staticmethod
+    def _upload_change(relative_path, local_file_path, remote_mode=None):
+        """commit_batch 上传条目；覆盖普通/可执行文件时沿用远程的文件模式，不清除可执行位"""
+        change = {'path': relative_path, 'local_path': local_file_path}
+        if remote_mode in ('100644', '100755'):
+            change['mode'] = remote_mode
+        return change
     
-    def _download_file_from_remote(self, repo, relative_path, local_file_path, update_progress, current, total):
+    def _report_unreadable_uploads(self, changes, update_progress, total) -> int:
+        """记录 commit_batch 中因无法读取而未提交的文件，返回其数量"""
+        unreadable = [change for change in changes if change.get('error')]
+        for change in unreadable:
+            update_progress(total, total, change['path'], f"❌ {change['path']} {change['error']}")
+        return len(unreadable)
+    
+    def _download_file_from_remote(self, repo, relative_path, local_file_path, update_progress, current, total, file_sha=None):
         """从远程下载文件"""
-        import os
-        
         try:
-            # 获取远程文件内容
-            content, _ = self.github_manager.get_file_content(repo, relative_path)
-            
-            # 确保本地目录存在
-            local_dir = os.path.dirname(local_file_path)
-            if local_dir and not os.path.exists(local_dir):
-                os.makedirs(local_dir, exist_ok=True)
-            
-            # 写入本地文件
-            with open(local_file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # 按原始字节流式写入本地文件（二进制和大文件均可）
+            if file_sha:
+                self.github_manager.read_blob_to_file(repo, local_file_path, sha=file_sha)
+            else:
+                self.github_manager.read_blob_to_file(repo, local_file_path, path=relative_path)
             
             update_progress(current, total, relative_path, f"📥 {relative_path} 下载成功")
             
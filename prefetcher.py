@@ -0,0 +1,206 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from github.ContentFile import ContentFile
+from github.Repository import Repository
+
+
+# 每个仓库的预取预算：请求数和下载字节数
+PREFETCH_MAX_REQUESTS = 20
+PREFETCH_MAX_BYTES = 2 * 1024 * 1024
+
+# 只预取不超过该大小的文件
+PREFETCH_MAX_FILE_SIZE = 64 * 1024
+
+# 每个目录列表最多排队的预取项
+PREFETCH_MAX_ITEMS = 12
+
+# 用户打开概率较高、优先预取的文件名前缀（小写）
+README_PREFIXES = ('readme', 'license', 'changelog', 'contributing')
+
+# 按扩展名判断的二进制文件，不预取
+BINARY_EXTENSIONS = frozenset([
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.pdf', '.zip', '.gz', '.tgz',
+    '.bz2', '.xz', '.7z', '.rar', '.jar', '.exe', '.dll', '.so', '.dylib', '.bin', '.pyc',
+    '.whl', '.mp3', '.mp4', '.wav', '.ttf', '.otf', '.woff', '.woff2',
+])
+
+
+class Prefetcher:
+    """文件浏览器的低优先级后台预取
+
+    根据当前目录列表和选中项，预先获取子目录列表和小文本文件内容，使双击
+    打开时不必等待网络。文件内容按 blob SHA 保存（内容寻址，与提交无关）。
+    预取在单个后台线程中逐个进行；用户发起的请求（user_request）进行期间
+    暂停，并受每个仓库的请求数和字节数预算限制。
+    """
+
+    def __init__(self, manager, max_requests: int = PREFETCH_MAX_REQUESTS,
+                 max_bytes: int = PREFETCH_MAX_BYTES, max_file_size: int = PREFETCH_MAX_FILE_SIZE):
+        self.manager = manager
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+
+        self.repo_name: Optional[str] = None
+        self.contents: Dict[str, str] = {}  # blob SHA -> 文本内容
+        self.listings: Dict[str, List[ContentFile]] = {}  # 目录路径 -> 列表
+        self.requests = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._queue: List[Tuple[Repository, ContentFile]] = []
+        self._user_active = 0
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def _reset_locked(self, repo_name: Optional[str]) -> None:
+        self.repo_name = repo_name
+        self.contents = {}
+        self.listings = {}
+        self.requests = 0
+        self.bytes = 0
+        self._queue = []
+
+    def schedule(self, repo: Repository, files: List[ContentFile],
+                 selected: Optional[ContentFile] = None) -> None:
+        """按当前目录列表（和选中项）重新安排预取队列，替换尚未执行的旧任务
+
+        顺序：选中项、README 类文件、子目录、其他小文本文件。切换仓库时清空
+        已预取的内容并重置预算。
+        """
+        readmes, dirs, others = [], [], []
+        for file in files:
+            if file.type == 'dir':
+                dirs.append(file)
+            elif self._is_prefetchable_file(file):
+                if file.name.lower().startswith(README_PREFIXES):
+                    readmes.append(file)
+                else:
+                    others.append(file)
+        candidates = readmes + dirs + others
+        if selected is not None and (selected.type == 'dir' or self._is_prefetchable_file(selected)):
+            candidates = [selected] + [file for file in candidates if file.path != selected.path]
+
+        with self._condition:
+            if repo.full_name != self.repo_name:
+                self._reset_locked(repo.full_name)
+            self._queue = [(repo, file) for file in candidates[:PREFETCH_MAX_ITEMS]]
+            self._ensure_thread()
+            self._condition.notify_all()
+
+    def _is_prefetchable_file(self, file: ContentFile) -> bool:
+        return (file.type == 'file' and (file.size or 0) <= self.max_file_size
+                and os.path.splitext(file.name)[1].lower() not in BINARY_EXTENSIONS)
+
+    def invalidate_listings(self) -> None:
+        """分支头可能已移动：丢弃预取的目录列表（文件内容按 SHA 保存，仍然有效）"""
+        with self._condition:
+            self.listings = {}
+
+    def stop(self) -> None:
+        """停止后台线程"""
+        with self._condition:
+            self._stopped = True
+            self._queue = []
+            self._condition.notify_all()
+
+    @contextmanager
+    def user_request(self):
+        """包裹用户发起的请求：期间预取暂停，不与用户争抢连接和额度"""
+        with self._condition:
+            self._user_active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._user_active -= 1
+                self._condition.notify_all()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._queue or self._user_active):
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                if self.requests >= self.max_requests or self.bytes >= self.max_bytes:
+                    self._queue = []  # 预算用尽
+                    continue
+                repo, file = self._queue.pop(0)
+                if repo.full_name != self.repo_name:
+                    continue
+            try:
+                self._prefetch(repo, file)
+            except Exception as e:
+                print(f"预取 {file.path} 失败: {e}")
+
+    def _prefetch(self, repo: Repository, file: ContentFile) -> None:
+        if file.type == 'dir':
+            # 按提交缓存了整个仓库树时，目录列表本来就不需要请求
+            if self.manager.get_cached_directory_listings(repo) is not None:
+                return
+            with self._condition:
+                if file.path in self.listings:
+                    return
+                self.requests += 1
+            listing = self.manager.list_files(repo, file.path)
+            with self._condition:
+                if repo.full_name == self.repo_name:
+                    self.listings[file.path] = listing
+            return
+
+        with self._condition:
+            if file.sha in self.contents or (file.size or 0) > self.max_bytes - self.bytes:
+                return
+            self.requests += 1
+        data = self.manager.read_blob(repo, sha=file.sha)
+        with self._condition:
+            self.bytes += len(data)
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError:
+            return  # 二进制文件，编辑器无法打开
+        with self._condition:
+            if repo.full_name == self.repo_name:
+                self.contents[file.sha] = text
+
+    def get_content(self, repo: Repository, sha: Optional[str]) -> Optional[str]:
+        """取出预取的文件内容，未预取时返回 None；计入命中率"""
+        with self._condition:
+            text = self.contents.get(sha) if sha and repo.full_name == self.repo_name else None
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return text
+
+    def get_listing(self, repo: Repository, path: str) -> Optional[List[ContentFile]]:
+        """取出预取的目录列表，未预取时返回 None
+
+        按提交缓存了整个仓库树时目录列表总是即时可得，不计入命中率。
+        """
+        if self.manager.get_cached_directory_listings(repo) is not None:
+            return None
+        with self._condition:
+            listing = self.listings.get(path) if repo.full_name == self.repo_name else None
+            if listing is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return listing
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中/未命中次数、已用的请求数和字节数"""
+        with self._condition:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'requests': self.requests, 'bytes': self.bytes}
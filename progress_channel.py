@@ -0,0 +1,145 @@
+import threading
+import tkinter as tk
+from collections import deque
+from datetime import datetime
+from tkinter import filedialog, messagebox
+from typing import Callable, Dict, List, Optional
+
+
+# 界面刷新间隔（毫秒），即每秒约 20 帧
+FRAME_INTERVAL_MS = 50
+
+# 日志框中最多保留的行数，更早的行只保存在环形缓冲区中
+MAX_VISIBLE_LOG_LINES = 1000
+
+# 环形缓冲区保存的日志行数（导出日志时写出这些行）
+LOG_BUFFER_LINES = 100000
+
+
+class ProgressChannel:
+    """长时间任务对话框的进度/日志通道
+
+    后台线程调用 update / log / call 把事件放入队列（线程安全，不触碰控件），
+    Tk 主线程按固定帧率取出并合并：进度条、当前文件和统计信息只显示最新值，
+    一帧内的所有日志一次性插入。日志框只保留最近 max_visible_lines 行，完整
+    日志保存在环形缓冲区中，可通过 export 导出到文件。
+
+    必须在 Tk 主线程中创建；对话框关闭后自动停止刷新。
+    """
+
+    def __init__(self, log_text, progress_var=None, current_label=None, stats_label=None,
+                 max_visible_lines: int = MAX_VISIBLE_LOG_LINES, buffer_lines: int = LOG_BUFFER_LINES):
+        self.log_text = log_text
+        self.progress_var = progress_var
+        self.current_label = current_label
+        self.stats_label = stats_label
+        self.max_visible_lines = max_visible_lines
+
+        self.log_buffer = deque(maxlen=buffer_lines)
+        self.dropped_lines = 0  # 因缓冲区已满被丢弃的最早日志行数
+        self._visible_lines = 0
+        self._state: Dict[str, object] = {}  # 尚未显示的最新进度状态
+        self._pending_logs: List[str] = []
+        self._pending_calls: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+        self.log_text.after(FRAME_INTERVAL_MS, self._drain)
+
+    # ---- 后台线程调用 ----
+
+    def update(self, progress: Optional[float] = None, current: Optional[str] = None,
+               stats: Optional[str] = None) -> None:
+        """更新进度（百分比）、当前项和统计文字；同一帧内只显示最后一次的值"""
+        with self._lock:
+            if progress is not None:
+                self._state['progress'] = progress
+            if current is not None:
+                self._state['current'] = current
+            if stats is not None:
+                self._state['stats'] = stats
+
+    def log(self, message: str) -> None:
+        """追加一行日志（message 可包含换行）"""
+        lines = message.split('\n')
+        with self._lock:
+            self._pending_logs.append(message)
+            overflow = len(self.log_buffer) + len(lines) - self.log_buffer.maxlen
+            if overflow > 0:
+                self.dropped_lines += overflow
+            self.log_buffer.extend(lines)
+
+    def call(self, callback: Callable[[], None]) -> None:
+        """在下一帧、本帧的进度和日志显示之后，于主线程中执行 callback"""
+        with self._lock:
+            self._pending_calls.append(callback)
+
+    # ---- 主线程 ----
+
+    def _drain(self) -> None:
+        with self._lock:
+            state, self._state = self._state, {}
+            logs, self._pending_logs = self._pending_logs, []
+            calls, self._pending_calls = self._pending_calls, []
+
+        try:
+            if 'progress' in state and self.progress_var is not None:
+                self.progress_var.set(state['progress'])
+            if 'current' in state and self.current_label is not None:
+                self.current_label.config(text=state['current'])
+            if 'stats' in state and self.stats_label is not None:
+                self.stats_label.config(text=state['stats'])
+            if logs:
+                self._append_visible(logs)
+        except tk.TclError:
+            return  # 对话框已关闭
+
+        # 每个回调单独执行：一个回调出错只记入日志，不影响其余回调和之后的刷新
+        for callback in calls:
+            try:
+                callback()
+            except tk.TclError:
+                pass  # 回调操作的控件已销毁
+            except Exception as e:
+                self.log(f"❌ 界面更新出错: {e}")
+
+        try:
+            self.log_text.after(FRAME_INTERVAL_MS, self._drain)
+        except tk.TclError:
+            pass  # 对话框已关闭
+
+    def _append_visible(self, logs: List[str]) -> None:
+        text = '\n'.join(logs) + '\n'
+        self.log_text.insert(tk.END, text)
+        self._visible_lines += text.count('\n')
+        excess = self._visible_lines - self.max_visible_lines
+        if excess > 0:
+            self.log_text.delete('1.0', f'{excess + 1}.0')
+            self._visible_lines -= excess
+        self.log_text.see(tk.END)
+
+    def export(self, file_path: str) -> None:
+        """把缓冲区中的完整日志写入文件"""
+        with self._lock:
+            lines = list(self.log_buffer)
+            dropped = self.dropped_lines
+        with open(file_path, 'w', encoding='utf-8') as f:
+            if dropped:
+                f.write(f"(更早的 {dropped} 行日志已超出缓冲区，未保存)\n")
+            f.write('\n'.join(lines) + '\n')
+
+    def export_with_dialog(self, parent=None) -> None:
+        """选择文件并导出日志"""
+        file_path = filedialog.asksaveasfilename(
+            parent=parent,
+            title="导出日志",
+            defaultextension=".log",
+            initialfile=f"log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log",
+            filetypes=[("日志文件", "*.log"), ("文本文件", "*.txt"), ("所有文件", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            self.export(file_path)
+            messagebox.showinfo("成功", f"日志已导出到:\n{file_path}", parent=parent)
+        except IOError as e:
+            messagebox.showerror("错误", f"导出日志失败: {e}", parent=parent)
@@ -0,0 +1,218 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+
+# GitHub 次级限流：创建内容的请求每分钟不超过 80 个，这里按该速率平滑写请求，
+# 允许少量突发
+WRITE_REQUESTS_PER_MINUTE = 80
+WRITE_BURST = 10
+
+# 等到重置时间后再多等一点，避免本地时钟与服务器的微小偏差
+RESET_MARGIN = 1.0
+
+# 限流响应既没有 Retry-After 也没有重置时间时的等待秒数（GitHub 文档建议至少 1 分钟）
+DEFAULT_RETRY_AFTER = 60.0
+
+# 单个请求因限流重试的最多次数
+MAX_RATE_LIMIT_RETRIES = 5
+
+WRITE_METHODS = frozenset(['POST', 'PUT', 'PATCH', 'DELETE'])
+
+
+class RateLimitScheduler:
+    """GitHub API 请求调度器
+
+    从每个响应的 X-RateLimit-* 头记录剩余额度（core、graphql 等资源分别计数）；
+    额度耗尽时在发出下一个请求前精确睡眠到重置时间，而不是让请求失败。写请求
+    按令牌桶平滑发送，避免触发次级限流。状态变化通过 add_listener 注册的回调
+    发布（回调在请求线程中调用）。
+    """
+
+    def __init__(self, writes_per_minute: int = WRITE_REQUESTS_PER_MINUTE, write_burst: int = WRITE_BURST):
+        self.write_interval = 60.0 / writes_per_minute
+        self.write_burst = write_burst
+        self.budgets: Dict[str, Dict[str, Any]] = {}  # resource -> {limit, remaining, reset_at}
+        self.waiting_until: Optional[float] = None
+        self._write_tokens = float(write_burst)
+        self._write_refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """注册额度变化回调 callback(status)"""
+        self._listeners.append(callback)
+
+    def get_status(self, resource: str = 'core') -> Dict[str, Any]:
+        """指定资源的额度：limit / remaining / reset_at（Unix 时间），以及 waiting_until"""
+        with self._lock:
+            budget = self.budgets.get(resource, {})
+            return {'resource': resource, 'limit': budget.get('limit'), 'remaining': budget.get('remaining'),
+                    'reset_at': budget.get('reset_at'), 'waiting_until': self.waiting_until}
+
+    def _notify(self) -> None:
+        status = self.get_status()
+        for callback in list(self._listeners):
+            try:
+                callback(status)
+            except Exception as e:
+                print(f"速率限制回调出错: {e}")
+
+    def update(self, headers) -> None:
+        """根据响应头更新剩余额度"""
+        remaining = headers.get('X-RateLimit-Remaining')
+        if remaining is None:
+            return
+        try:
+            budget = {'remaining': int(remaining),
+                      'limit': int(headers.get('X-RateLimit-Limit', 0)),
+                      'reset_at': float(headers.get('X-RateLimit-Reset', 0))}
+        except ValueError:
+            return
+        with self._lock:
+            self.budgets[headers.get('X-RateLimit-Resource', 'core')] = budget
+        self._notify()
+
+    def retry_delay(self, status_code: int, headers) -> Optional[float]:
+        """判断响应是否为限流；是则返回应等待的秒数，否则返回 None"""
+        if status_code not in (403, 429):
+            return None
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                return DEFAULT_RETRY_AFTER
+        if headers.get('X-RateLimit-Remaining') == '0':
+            try:
+                return max(float(headers.get('X-RateLimit-Reset', 0)) - time.time(), 0.0) + RESET_MARGIN
+            except ValueError:
+                return DEFAULT_RETRY_AFTER
+        # 403 也可能只是权限不足，只有 429 才按限流处理
+        return DEFAULT_RETRY_AFTER if status_code == 429 else None
+
+    def sleep(self, seconds: float) -> None:
+        """限流等待，期间对外发布等待截止时间"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.waiting_until = time.time() + seconds
+        self._notify()
+        try:
+            time.sleep(seconds)
+        finally:
+            with self._lock:
+                self.waiting_until = None
+            self._notify()
+
+    def wait_for_budget(self, resource: str = 'core') -> None:
+        """该资源的额度已耗尽时睡眠到重置时间"""
+        with self._lock:
+            budget = self.budgets.get(resource)
+            exhausted = budget and budget['remaining'] <= 0 and budget['reset_at']
+            delay = budget['reset_at'] - time.time() + RESET_MARGIN if exhausted else 0
+        if delay > 0:
+            self.sleep(delay)
+            with self._lock:
+                # 重置后的额度未知，等下一个响应更新
+                budget = self.budgets.get(resource)
+                if budget and budget['reset_at'] <= time.time():
+                    del self.budgets[resource]
+
+    def acquire_write(self) -> None:
+        """令牌桶：写请求之间保持平均间隔，桶内有令牌时允许突发"""
+        with self._write_lock:
+            now = time.monotonic()
+            self._write_tokens = min(self.write_burst,
+                                     self._write_tokens + (now - self._write_refilled_at) / self.write_interval)
+            self._write_refilled_at = now
+            if self._write_tokens < 1:
+                time.sleep((1 - self._write_tokens) * self.write_interval)
+                self._write_tokens = 1
+                self._write_refilled_at = time.monotonic()
+            self._write_tokens -= 1
+
+    def before_request(self, method: str, resource: str = 'core') -> None:
+        """发出请求前调用：等待额度恢复，REST 写请求还要按速率排队
+
+        GraphQL 查询虽然使用 POST，但不创建内容，不参与写请求排队。
+        """
+        self.wait_for_budget(resource)
+        if resource == 'core' and method.upper() in WRITE_METHODS:
+            self.acquire_write()
+
+
+class ScheduledSession(requests.Session):
+    """所有请求都经过 RateLimitScheduler 的 requests 会话
+
+    限流响应（Retry-After、额度耗尽的 403、429）会在等待后自动重发；请求体
+    为流式对象时需要提供 rewind() 才能重发，否则直接返回限流响应。
+    """
+
+    def __init__(self, scheduler: RateLimitScheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    def request(self, method, url, *args, **kwargs):
+        data = kwargs.get('data')
+        resource = 'graphql' if url.rstrip('/').endswith('/graphql') else 'core'
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self.scheduler.before_request(method, resource)
+            response = super().request(method, url, *args, **kwargs)
+            self.scheduler.update(response.headers)
+
+            delay = self.scheduler.retry_delay(response.status_code, response.headers)
+            if delay is None or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+            if data is not None and not isinstance(data, (bytes, str, dict)):
+                if not hasattr(data, 'rewind'):
+                    return response
+                data.rewind()
+            response.close()
+            self.scheduler.sleep(delay)
+        return response
+
+
+class RateLimitRetry(Retry):
+    """供 PyGithub 使用的 urllib3 重试策略：只重试限流响应，等待时间由调度器决定
+
+    PyGithub 的请求不经过 ScheduledSession，通过它把限流等待和额度记录接入
+    同一个调度器。非限流的 403 不重试，原样交给 PyGithub 抛出异常。
+    """
+
+    def __init__(self, *args, scheduler: Optional[RateLimitScheduler] = None, **kwargs):
+        kwargs.setdefault('total', MAX_RATE_LIMIT_RETRIES)
+        kwargs.setdefault('connect', 0)
+        kwargs.setdefault('read', 0)
+        kwargs.setdefault('redirect', 0)
+        kwargs.setdefault('status_forcelist', (403, 429))
+        kwargs.setdefault('allowed_methods', None)  # 限流的写请求未被执行，可以安全重发
+        kwargs.setdefault('raise_on_status', False)
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.scheduler = self.scheduler
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and self.scheduler is not None:
+            self.scheduler.update(response.headers)
+            if self.scheduler.retry_delay(response.status, response.headers) is None:
+                # 不是限流（例如权限不足的 403），不重试
+                raise MaxRetryError(_pool, url, error)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+    def sleep(self, response=None):
+        if response is not None and self.scheduler is not None:
+            delay = self.scheduler.retry_delay(response.status, response.headers)
+            if delay is not None:
+                self.scheduler.sleep(delay)
+                return
+        super().sleep(response)
@@ -0,0 +1,319 @@
+from tkinter import ttk
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# 每个空闲回调最多并入模型的记录数
+DEFAULT_BATCH_SIZE = 2000
+
+# 无法从控件测得行高/表头高度时使用的估计值
+DEFAULT_ROW_HEIGHT = 20
+DEFAULT_HEADER_HEIGHT = 24
+
+# 鼠标滚轮每格滚动的行数
+WHEEL_ROWS = 3
+
+
+class VirtualTreeview:
+    """在 ttk.Treeview 上只渲染可见行的虚拟列表
+
+    数据保存在内存模型中（任意记录对象，用 key_func 唯一标识），过滤和排序都在
+    模型上完成。Treeview 里只保留与可见行数相同的一组固定行（槽位），滚动时
+    改写这些行的内容，控件中的行数与数据量无关。
+
+    render_func(record) 返回 (text, values, tags)。选中状态按记录的 key 保存在
+    模型中，滚动后依然有效；on_select(record) 只在用户改变选择时调用。
+    """
+
+    def __init__(self, tree: ttk.Treeview, scrollbar: ttk.Scrollbar,
+                 key_func: Callable[[Any], str],
+                 render_func: Callable[[Any], Tuple[str, Sequence[Any], Sequence[str]]],
+                 on_select: Optional[Callable[[Any], None]] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.key_func = key_func
+        self.render_func = render_func
+        self.on_select = on_select
+        self.batch_size = batch_size
+
+        self.records: List[Any] = []  # 全部记录
+        self.view: List[Any] = []  # 过滤、排序后的记录
+        self._filter: Optional[Callable[[Any], bool]] = None
+        self._sort_key: Optional[Callable[[Any], Any]] = None
+        self._sort_reverse = False
+        self._view_positions: Optional[Dict[str, int]] = None
+
+        self.offset = 0  # 第一个可见行在 view 中的位置
+        self.visible_rows = 1
+        self.slots: List[str] = []
+        self.selected_key: Optional[str] = None
+        self._rendered_selection: Tuple[str, ...] = ()
+
+        self._pending: List[Any] = []
+        self._batch_generation = 0
+        self._batch_scheduled = False
+
+        tree.configure(selectmode='browse')
+        scrollbar.configure(command=self.yview)
+        tree.bind('<Configure>', self._on_configure, add='+')
+        tree.bind('<<TreeviewSelect>>', self._on_tree_select, add='+')
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            tree.bind(sequence, self._on_mousewheel)
+        for sequence in ('<Up>', '<Down>', '<Prior>', '<Next>', '<Home>', '<End>'):
+            tree.bind(sequence, self._on_key)
+
+    # ---- 模型 ----
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+    def set_records(self, records: List[Any]) -> None:
+        """替换全部记录；已选中的记录仍在列表中时保持选中"""
+        self._cancel_batches()
+        self.records = list(records)
+        self._rebuild_view()
+        self.render()
+
+    def clear(self) -> None:
+        """清空记录，并丢弃尚未并入的批次"""
+        self.selected_key = None
+        self.offset = 0
+        self.set_records([])
+
+    def extend_in_batches(self, records: List[Any], on_progress: Optional[Callable[[int, int], None]] = None,
+                          on_done: Optional[Callable[[], None]] = None) -> None:
+        """分批把记录并入模型：每个空闲回调最多处理 batch_size 条，处理后只重绘可见行
+
+        on_progress(done, total) 在每批之后调用，on_done() 在全部并入后调用；
+        期间调用 set_records / clear 会取消剩余批次。
+        """
+        self._pending.extend(records)
+        total = len(self.records) + len(self._pending)
+        generation = self._batch_generation
+
+        def apply_batch():
+            if generation != self._batch_generation:
+                return
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            self.records.extend(batch)
+            if self._sort_key is None:
+                self.view.extend(record for record in batch if self._filter is None or self._filter(record))
+                self._view_positions = None
+            else:
+                self._rebuild_view()
+            self.render()
+
+            if self._pending:
+                if on_progress:
+                    on_progress(len(self.records), total)
+                self.tree.after_idle(apply_batch)
+            else:
+                self._batch_scheduled = False
+                if on_done:
+                    on_done()
+
+        if not self._batch_scheduled:
+            self._batch_scheduled = True
+            self.tree.after_idle(apply_batch)
+
+    def _cancel_batches(self) -> None:
+        self._batch_generation += 1
+        self._batch_scheduled = False
+        self._pending = []
+
+    def set_filter(self, predicate: Optional[Callable[[Any], bool]]) -> None:
+        """只显示 predicate(record) 为真的记录；None 表示显示全部"""
+        self._filter = predicate
+        self._rebuild_view()
+        self.offset = 0
+        self.render()
+
+    def sort_by(self, key: Optional[Callable[[Any], Any]], reverse: bool = False) -> None:
+        """按 key(record) 排序显示；None 表示保持记录的原始顺序"""
+        self._sort_key = key
+        self._sort_reverse = reverse
+        self._rebuild_view()
+        self.render()
+
+    def bind_heading_sort(self, column: str, key: Callable[[Any], Any]) -> None:
+        """点击表头按该列排序，再次点击切换升序/降序"""
+        def on_heading_click():
+            reverse = self._sort_key is key and not self._sort_reverse
+            self.sort_by(key, reverse)
+        self.tree.heading(column, command=on_heading_click)
+
+    def _rebuild_view(self) -> None:
+        view = [record for record in self.records if self._filter is None or self._filter(record)]
+        if self._sort_key is not None:
+            view.sort(key=self._sort_key, reverse=self._sort_reverse)
+        self.view = view
+        self._view_positions = None
+
+    def _position_of(self, key: Optional[str]) -> Optional[int]:
+        if key is None:
+            return None
+        if self._view_positions is None:
+            self._view_positions = {self.key_func(record): i for i, record in enumerate(self.view)}
+        return self._view_positions.get(key)
+
+    def get(self, key: str) -> Optional[Any]:
+        """按 key 查找当前显示的记录"""
+        position = self._position_of(key)
+        return self.view[position] if position is not None else None
+
+    def selected_record(self) -> Optional[Any]:
+        """当前选中的记录（滚动到可见区域之外也有效）"""
+        self._adopt_user_selection()
+        return self.get(self.selected_key)
+
+    def record_at(self, y: int) -> Optional[Any]:
+        """鼠标纵坐标下的记录"""
+        slot = self.tree.identify_row(y)
+        return self._record_for_slot(slot) if slot else None
+
+    def _record_for_slot(self, slot: str) -> Optional[Any]:
+        try:
+            position = self.offset + self.slots.index(slot)
+        except ValueError:
+            return None
+        return self.view[position] if position < len(self.view) else None
+
+    # ---- 渲染 ----
+
+    def refresh(self) -> None:
+        """记录内容被修改后重绘可见行"""
+        self.render()
+
+    def render(self) -> None:
+        """把 view[offset:offset + 可见行数] 写入槽位，并同步选中状态和滚动条"""
+        self._adopt_user_selection()
+
+        total = len(self.view)
+        count = min(self.visible_rows, total)
+        self.offset = max(0, min(self.offset, total - count))
+
+        while len(self.slots) < count:
+            slot = f"slot{len(self.slots)}"
+            self.tree.insert('', 'end', iid=slot)
+            self.slots.append(slot)
+        while len(self.slots) > count:
+            self.tree.delete(self.slots.pop())
+
+        selected_slot = None
+        for i, slot in enumerate(self.slots):
+            record = self.view[self.offset + i]
+            text, values, tags = self.render_func(record)
+            self.tree.item(slot, text=text, values=values, tags=tags)
+            if self.key_func(record) == self.selected_key:
+                selected_slot = slot
+
+        expected = (selected_slot,) if selected_slot else ()
+        if self.tree.selection() != expected:
+            self.tree.selection_set(expected)
+        self._rendered_selection = expected
+
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + count) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _measure_rows(self, height: int) -> int:
+        """根据控件高度计算能完整显示的行数（不渲染半行，避免控件自行滚动）"""
+        row_height = DEFAULT_ROW_HEIGHT
+        header_height = DEFAULT_HEADER_HEIGHT if 'headings' in str(self.tree.cget('show')) else 0
+        bbox = self.tree.bbox(self.slots[0]) if self.slots else None
+        if bbox:
+            header_height, row_height = bbox[1], bbox[3]
+        else:
+            style_height = ttk.Style(self.tree).lookup(self.tree.cget('style') or 'Treeview', 'rowheight')
+            if style_height:
+                row_height = int(style_height)
+        return max(1, (height - header_height) // max(row_height, 1))
+
+    def _on_configure(self, event) -> None:
+        visible_rows = self._measure_rows(event.height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.render()
+
+    # ---- 交互 ----
+
+    def yview(self, *args) -> None:
+        """滚动条回调：moveto 比例，或按行/页滚动"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * len(self.view))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= max(1, self.visible_rows - 1)
+            self.offset += amount
+        self.render()
+
+    def _on_mousewheel(self, event):
+        if event.num == 4:
+            rows = -WHEEL_ROWS
+        elif event.num == 5:
+            rows = WHEEL_ROWS
+        elif abs(event.delta) >= 120:
+            rows = -(event.delta // 120) * WHEEL_ROWS  # Windows：每格 120
+        else:
+            rows = -event.delta  # macOS：delta 为滚动的行数
+        self.offset += rows
+        self.render()
+        return "break"
+
+    def _on_key(self, event):
+        if not self.view:
+            return "break"
+        position = self._position_of(self.selected_key)
+        page = max(1, self.visible_rows - 1)
+        if position is None:
+            position = self.offset
+        elif event.keysym == 'Up':
+            position -= 1
+        elif event.keysym == 'Down':
+            position += 1
+        elif event.keysym == 'Prior':
+            position -= page
+        elif event.keysym == 'Next':
+            position += page
+        if event.keysym == 'Home':
+            position = 0
+        elif event.keysym == 'End':
+            position = len(self.view) - 1
+        position = max(0, min(position, len(self.view) - 1))
+
+        # 保证新选中的行可见
+        if position < self.offset:
+            self.offset = position
+        elif position >= self.offset + self.visible_rows:
+            self.offset = position - self.visible_rows + 1
+
+        record = self.view[position]
+        changed = self.key_func(record) != self.selected_key
+        self.selected_key = self.key_func(record)
+        self.render()
+        if changed and self.on_select:
+            self.on_select(record)
+        return "break"
+
+    def _adopt_user_selection(self) -> None:
+        """上次渲染之后用户改变了选择、而选择事件还没处理时，先接受用户的选择"""
+        if self.tree.selection() != self._rendered_selection:
+            self._on_tree_select()
+
+    def _on_tree_select(self, event=None) -> None:
+        """用户点击改变了选择时记录选中的 key；渲染引起的选择变化直接忽略"""
+        selection = self.tree.selection()
+        if selection == self._rendered_selection:
+            return
+        self._rendered_selection = selection
+        record = self._record_for_slot(selection[0]) if selection else None
+        if record is None:
+            return
+        self.selected_key = self.key_func(record)
+        if self.on_select:
+            self.on_select(record)